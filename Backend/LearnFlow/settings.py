@@ -35,9 +35,170 @@ ALLOWED_HOSTS = ["*"]
 GEMINI_API_KEYS = [os.environ.get('GEMINI_API_KEY_1'), os.environ.get('GEMINI_API_KEY_2'), os.environ.get('GEMINI_API_KEY_3'), os.environ.get('GEMINI_API_KEY_4')]
 # print(f"GEMINI_API_KEYS: {GEMINI_API_KEYS}") #Add this line.
 
+# Max keep-alive connections held open per Gemini API key
+GEMINI_HTTP_POOL_SIZE = int(os.environ.get('GEMINI_HTTP_POOL_SIZE', 10))
+
 YOUTUBE_API_KEYS = [os.environ.get('YOUTUBE_API_KEY_1'), os.environ.get('YOUTUBE_API_KEY_2'), os.environ.get('YOUTUBE_API_KEY_3'), os.environ.get('YOUTUBE_API_KEY_4')]
 # print(f"YOUTUBE_API_KEY: {YOUTUBE_API_KEYS}") #Add this line.
 
+# 'google' calls the real Gemini and YouTube APIs; 'fake' routes both to the
+# local stand-in started with `python manage.py run_fake_backend`
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'google')
+FAKE_BACKEND_URL = os.environ.get('FAKE_BACKEND_URL', 'http://127.0.0.1:8765')
+if MODEL_BACKEND == 'fake':
+    # Never send real keys to the fake backend
+    GEMINI_API_KEYS = [f'fake-gemini-key-{i}' for i in range(1, 5)]
+    YOUTUBE_API_KEYS = [f'fake-youtube-key-{i}' for i in range(1, 5)]
+
+# Seconds a request waits for another worker's in-flight generation of the
+# same topic/quiz/resource before generating on its own
+GENERATION_LOCK_TIMEOUT = 120
+GENERATION_LOCK_POLL_INTERVAL = 0.25
+
+# API key scheduling per provider. Keys are benched on 429s, exhausted quota
+# and repeated errors, and calls fail over to another key with backoff.
+# daily_budget is in quota units (YouTube charges 101 units per search).
+KEY_SCHEDULER = {
+    'gemini': {
+        'max_attempts': 3,
+        'cooldown': 30,
+        'max_cooldown': 900,
+    },
+    'youtube': {
+        'max_attempts': 3,
+        'daily_budget': 10000,
+        'cooldown': 60,
+        'max_cooldown': 3600,
+    },
+}
+
+# LLM response cache: in-process LRU in front of the LLMResponse table.
+# TTLs are in seconds per endpoint; 0 disables caching for that endpoint.
+# quiz_bank calls ask for questions a bucket does not hold yet, which a
+# cached response would only repeat.
+LLM_CACHE = {
+    'max_memory_entries': 512,
+    'max_rows': 20000,
+    'prune_every': 50,
+    'ttl': {
+        'topic': 30 * 24 * 3600,
+        'quiz': 3600,
+        'quiz_bank': 0,
+        'articles': 7 * 24 * 3600,
+        'documentation': 7 * 24 * 3600,
+        'default': 24 * 3600,
+    },
+}
+
+# Extra model calls allowed to request the items missing from a truncated or
+# partly invalid response (quiz questions, articles, documentation, topics)
+OUTPUT_REPAIR_ATTEMPTS = int(os.environ.get('OUTPUT_REPAIR_ATTEMPTS', 1))
+
+# Most questions requested from the model in one batched quiz call
+QUIZ_BATCH_MAX_QUESTIONS = int(os.environ.get('QUIZ_BATCH_MAX_QUESTIONS', 60))
+
+# Most stored questions of a bucket listed in a prompt as questions not to
+# repeat, when asking the model for questions the bank does not hold yet
+QUIZ_AVOID_QUESTIONS = int(os.environ.get('QUIZ_AVOID_QUESTIONS', 50))
+
+# Background prefetch of resources for the first subtopics of a newly
+# generated topic. Prefetch jobs wait while interactive generations are in
+# flight in the same process, for at most max_defer seconds.
+PREFETCH = {
+    'enabled': os.environ.get('PREFETCH_RESOURCES', 'false').lower() == 'true',
+    'subtopics': int(os.environ.get('PREFETCH_SUBTOPICS', 3)),
+    'workers': 2,
+    'include_topic': True,
+    'max_defer': 10.0,
+}
+
+# Fuzzy matching of searched topic names against stored topics (pg_trgm on
+# Postgres, an in-process trigram index elsewhere). A stored topic whose
+# trigram similarity reaches serve_threshold, and whose name has the same
+# numbers, is served instead of generating a new one; matches scoring at
+# least suggest_threshold are offered as "did you mean".
+FUZZY_MATCH = {
+    'enabled': os.environ.get('FUZZY_TOPIC_MATCH', 'true').lower() == 'true',
+    'candidate_threshold': 0.2,
+    'serve_threshold': float(os.environ.get('FUZZY_SERVE_THRESHOLD', 0.8)),
+    'suggest_threshold': float(os.environ.get('FUZZY_SUGGEST_THRESHOLD', 0.5)),
+    'candidates': 20,
+    'suggestions': 5,
+    'refresh_interval': 30.0,
+}
+
+# Hedged Gemini calls: a call still unanswered after the percentile of the
+# endpoint's recent latencies is sent again on another key and the first
+# answer wins. budget is the most hedges per call an endpoint may issue over
+# time (endpoint_budgets overrides it per endpoint), which bounds the extra
+# quota hedging can use.
+HEDGING = {
+    'enabled': os.environ.get('HEDGE_REQUESTS', 'false').lower() == 'true',
+    'percentile': float(os.environ.get('HEDGE_PERCENTILE', 95)),
+    'min_samples': 20,
+    'window': 200,
+    'min_delay': 0.5,
+    'budget': 0.05,
+    'burst': 5,
+    'endpoint_budgets': {
+        'topic': 0.1,
+    },
+    'workers': 16,
+}
+
+# Cache-Control for the GET reads of stored topics and resources. Generated
+# content does not change, so browsers keep it for max_age and shared caches
+# (CDN, reverse proxy) for s_maxage, then revalidate with the ETag. Resource
+# lists that are still missing a kind are cached for incomplete_max_age.
+HTTP_CACHE = {
+    'max_age': int(os.environ.get('HTTP_CACHE_MAX_AGE', 24 * 3600)),
+    's_maxage': int(os.environ.get('HTTP_CACHE_S_MAXAGE', 7 * 24 * 3600)),
+    'stale_while_revalidate': 24 * 3600,
+    'incomplete_max_age': 60,
+    'search_max_age': 60,
+}
+
+# Random sampling of stored quiz questions from in-memory id lists, one per
+# (subtopic, question type) bucket. Questions other workers added are read
+# every refresh_interval seconds, and each list is re-read in full every
+# reload_interval seconds. At most max_buckets lists are kept.
+QUESTION_SAMPLER = {
+    'refresh_interval': 30.0,
+    'reload_interval': 600.0,
+    'max_buckets': 10000,
+}
+
+# Deduplication of generated quiz questions. Copies of a stored question are
+# recognized by the hash of its normalized text. Rewordings are recognized by
+# MinHash over shingle_size-word shingles: num_perm hashes cut into bands for
+# candidate lookup, and an estimated Jaccard similarity of at least threshold
+# to a question of the same bucket. At most max_signatures signatures are
+# cached.
+QUESTION_INGEST = {
+    'threshold': 0.8,
+    'num_perm': 64,
+    'bands': 16,
+    'shingle_size': 3,
+    'max_signatures': 100000,
+}
+
+# Where quizzes come from. A quiz is served from the question bank when its
+# bucket holds enough questions the user has not answered, and generated
+# otherwise. While serving, a bucket with fewer than min_pool unanswered
+# questions, or one that has served max_reuse times its size since its last
+# top-up, gets top_up_size more questions in the background. Buckets of
+# max_pool questions are not topped up.
+QUIZ_SOURCING = {
+    'min_pool': 30,
+    'max_pool': 300,
+    'top_up_size': 20,
+    'max_reuse': 5.0,
+    'workers': 2,
+}
+
+# Serve the generation endpoints from search_app.async_views (use with LearnFlow.asgi)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'false').lower() == 'true'
+
 
 # Application definition
 
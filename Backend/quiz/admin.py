@@ -9,4 +9,5 @@ class QuizAttemptAdmin(admin.ModelAdmin):
 @admin.register(QuestionAttempt)
 class QuestionAttemptAdmin(admin.ModelAdmin):
     list_display = ('quiz_attempt', 'question', 'time_taken', 'is_correct', 'is_partial', 'score')
+    list_filter = ('is_correct', 'is_partial')
     readonly_fields = ('is_correct', 'is_partial', 'score')
\ No newline at end of file
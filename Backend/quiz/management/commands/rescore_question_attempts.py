@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from quiz.models import QuestionAttempt
+from quiz.scoring import rescore
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored is_correct, is_partial and score of question attempts, "
+        "e.g. after the scoring rules changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help="Only rescore this user's attempts")
+        parser.add_argument('--batch-size', type=int, default=500, help="Attempts read and updated per query")
+
+    def handle(self, *args, **options):
+        question_attempts = QuestionAttempt.objects.all()
+        if options['user_id'] is not None:
+            question_attempts = question_attempts.filter(quiz_attempt__user_id=options['user_id'])
+        updated = rescore(question_attempts, options['batch_size'])
+        self.stdout.write(f"Rescored {updated} question attempts")
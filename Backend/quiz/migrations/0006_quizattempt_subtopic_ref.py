@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from search_app.migrations._normalization import canonicalize_subtopic
+
+
+def backfill_subtopics(apps, schema_editor):
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    Subtopic = apps.get_model('search_app', 'Subtopic')
+    for topic_id, name in QuizAttempt.objects.values_list('topic_id', 'subtopic').distinct():
+        subtopic, _ = Subtopic.objects.get_or_create(
+            topic_id=topic_id, canonical_name=canonicalize_subtopic(name), defaults={'name': name},
+        )
+        QuizAttempt.objects.filter(topic_id=topic_id, subtopic=name).update(subtopic_ref=subtopic)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_alter_quizattempt_topic_and_more'),
+        ('search_app', '0018_subtopic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='subtopic_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to='search_app.subtopic'),
+        ),
+        migrations.RunPython(backfill_subtopics, migrations.RunPython.noop),
+    ]
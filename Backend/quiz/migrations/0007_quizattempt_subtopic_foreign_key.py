@@ -0,0 +1,19 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_quizattempt_subtopic_ref'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='quizattempt', name='subtopic'),
+        migrations.RenameField(model_name='quizattempt', old_name='subtopic_ref', new_name='subtopic'),
+        migrations.AlterField(
+            model_name='quizattempt',
+            name='subtopic',
+            field=models.ForeignKey(help_text='Subtopic of the quiz', on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to='search_app.subtopic'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.6 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+def score_answer(question_type, correct_answers, attempted_options, negative_marking):
+    """The scoring rules as of this migration, on the JSON option lists stored then."""
+    if not attempted_options:
+        return False, False, 0
+    if question_type == 'multiple-correct':
+        correct_options = set(correct_answers)
+        attempted = set(attempted_options)
+        correct_selections = len(correct_options & attempted)
+        incorrect_selections = len(attempted - correct_options)
+        is_correct = correct_options == attempted
+        is_partial = bool(correct_selections) and not incorrect_selections
+        if negative_marking and incorrect_selections:
+            return is_correct, is_partial, -2
+        if correct_selections == len(correct_options):
+            return is_correct, is_partial, 4
+        return is_correct, is_partial, correct_selections
+    if attempted_options == correct_answers:
+        return True, False, 4
+    return False, False, -1 if negative_marking else 0
+
+
+def backfill_scores(apps, schema_editor):
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+    rows = QuestionAttempt.objects.select_related('question', 'quiz_attempt').order_by('id')
+    batch = []
+    for row in rows.iterator(chunk_size=500):
+        row.is_correct, row.is_partial, row.score = score_answer(
+            row.question.question_type, row.question.correct_answers, row.attempted_options,
+            row.quiz_attempt.is_negative_marking,
+        )
+        batch.append(row)
+        if len(batch) >= 500:
+            QuestionAttempt.objects.bulk_update(batch, ['is_correct', 'is_partial', 'score'])
+            batch = []
+    QuestionAttempt.objects.bulk_update(batch, ['is_correct', 'is_partial', 'score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_quizattempt_subtopic_foreign_key'),
+        ('search_app', '0021_quizquestion_unique_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionattempt',
+            name='is_correct',
+            field=models.BooleanField(default=False, help_text='Whether the answer is completely correct'),
+        ),
+        migrations.AddField(
+            model_name='questionattempt',
+            name='is_partial',
+            field=models.BooleanField(default=False, help_text='Whether some correct options and no incorrect ones were selected'),
+        ),
+        migrations.AddField(
+            model_name='questionattempt',
+            name='score',
+            field=models.SmallIntegerField(default=0, help_text='Points for this answer, negative marking applied'),
+        ),
+        migrations.AddIndex(
+            model_name='questionattempt',
+            index=models.Index(fields=['question', 'is_correct'], name='quiz_questi_questio_b0ccce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='questionattempt',
+            index=models.Index(fields=['quiz_attempt', 'is_correct'], name='quiz_questi_quiz_at_b0ef77_idx'),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-18 00:03
+
+from django.db import migrations, models
+
+
+def options_to_mask(options):
+    """Bitmask of the valid option indexes in a stored JSON list; anything else is dropped."""
+    mask = 0
+    for index in options if isinstance(options, list) else []:
+        if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < 15:
+            mask |= 1 << index
+    return mask
+
+
+def fill_attempted_mask(apps, schema_editor):
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+    batch = []
+    for row in QuestionAttempt.objects.only('id', 'attempted_options').order_by('id').iterator(chunk_size=500):
+        row.attempted_mask = options_to_mask(row.attempted_options)
+        batch.append(row)
+        if len(batch) >= 500:
+            QuestionAttempt.objects.bulk_update(batch, ['attempted_mask'])
+            batch = []
+    QuestionAttempt.objects.bulk_update(batch, ['attempted_mask'])
+
+
+def fill_attempted_options(apps, schema_editor):
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+    batch = []
+    for row in QuestionAttempt.objects.only('id', 'attempted_mask').order_by('id').iterator(chunk_size=500):
+        row.attempted_options = [index for index in range(15) if row.attempted_mask >> index & 1]
+        batch.append(row)
+        if len(batch) >= 500:
+            QuestionAttempt.objects.bulk_update(batch, ['attempted_options'])
+            batch = []
+    QuestionAttempt.objects.bulk_update(batch, ['attempted_options'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_questionattempt_scoring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionattempt',
+            name='attempted_mask',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Options selected by the user, bit i for option i'),
+        ),
+        # A default lets the column be re-added when migrating backwards
+        migrations.AlterField(
+            model_name='questionattempt',
+            name='attempted_options',
+            field=models.JSONField(default=list, help_text='Options selected by the user'),
+        ),
+        migrations.RunPython(fill_attempted_mask, fill_attempted_options),
+        migrations.RemoveField(
+            model_name='questionattempt',
+            name='attempted_options',
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from authentication.models import User
-from search_app.models import QuizQuestion, Topic
+from search_app.models import QuizQuestion, Subtopic, Topic, mask_options
 from django.utils import timezone
 
+from .scoring import score_question_attempts
+
 # Create your models here.
 class QuizAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -15,7 +17,8 @@ class QuizAttempt(models.Model):
     unattempted = models.IntegerField()
     is_negative_marking = models.BooleanField(default=False, help_text="Whether negative marking was enabled for this quiz")
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='quiz_attempts')
-    subtopic = models.CharField(max_length=255, help_text="Subtopic of the quiz", blank=True)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE, related_name='quiz_attempts',
+                                 help_text="Subtopic of the quiz")
 
     class Meta:
         ordering = ['-created_at']
@@ -25,7 +28,7 @@ class QuizAttempt(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.name}'s attempt on {self.topic.name} - {self.subtopic} at {self.created_at}"
+        return f"{self.user.name}'s attempt on {self.topic.name} - {self.subtopic.name} at {self.created_at}"
 
     @property
     def total_questions(self):
@@ -48,68 +51,26 @@ class QuestionAttempt(models.Model):
     quiz_attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='question_attempts')
     question = models.ForeignKey(QuizQuestion, on_delete=models.CASCADE)
     time_taken = models.IntegerField(help_text="Time taken for this question in seconds")
-    attempted_options = models.JSONField(help_text="Options selected by the user")
-
-    @property
-    def is_correct(self):
-        """Check if the attempt is completely correct"""
-        if not self.attempted_options:
-            return False
-        
-        if self.question.question_type == 'multiple-correct':
-            # For multiple correct, all correct options must be selected and no incorrect options
-            correct_options = set(self.question.correct_answers)
-            attempted = set(self.attempted_options)
-            return correct_options == attempted
-        else:
-            # For MCQ and True/False, check if the selected option matches the correct answer
-            return self.attempted_options == self.question.correct_answers
+    attempted_mask = models.PositiveSmallIntegerField(default=0, help_text="Options selected by the user, bit i for option i")
+    # Set from attempted_mask when the attempt is saved, see scoring.py
+    is_correct = models.BooleanField(default=False, help_text="Whether the answer is completely correct")
+    is_partial = models.BooleanField(default=False, help_text="Whether some correct options and no incorrect ones were selected")
+    score = models.SmallIntegerField(default=0, help_text="Points for this answer, negative marking applied")
 
-    @property
-    def is_partial(self):
-        """Check if the attempt is partially correct (only for multiple correct type)"""
-        if self.question.question_type != 'multiple-correct' or not self.attempted_options:
-            return False
-        
-        correct_options = set(self.question.correct_answers)
-        attempted = set(self.attempted_options)
-        
-        # Check if at least one correct option is selected and no incorrect options
-        return bool(correct_options.intersection(attempted)) and not (attempted - correct_options)
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'is_correct']),
+            models.Index(fields=['quiz_attempt', 'is_correct']),
+        ]
 
     @property
-    def score(self):
-        """Calculate score for this question attempt based on question type and negative marking"""
-        if not self.attempted_options:
-            return 0
+    def attempted_options(self):
+        """Selected option indexes, the list the API sends and receives"""
+        return mask_options(self.attempted_mask)
 
-        if self.question.question_type == 'multiple-correct':
-            correct_options = set(self.question.correct_answers)
-            attempted = set(self.attempted_options)
-            
-            # Check for incorrect selections
-            incorrect_selections = len(attempted - correct_options)
-            
-            # If any incorrect option is selected, return -2
-            if self.quiz_attempt.is_negative_marking and incorrect_selections > 0:
-                return -2
-            
-            # Count correct selections
-            correct_selections = len(correct_options.intersection(attempted))
-            
-            # If all correct options are selected, return 4
-            if correct_selections == len(correct_options):
-                return 4
-            
-            # Otherwise, return 1 point per correct option
-            return correct_selections
-        else:
-            # For MCQ and True/False
-            if self.is_correct:
-                return 4
-            elif self.quiz_attempt.is_negative_marking:
-                return -1  # -1 mark for incorrect answer
-            return 0
+    def save(self, *args, **kwargs):
+        score_question_attempts([self], self.quiz_attempt.is_negative_marking)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Attempt for question {self.question.id} in quiz attempt {self.quiz_attempt.id}"
\ No newline at end of file
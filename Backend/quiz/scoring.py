@@ -0,0 +1,83 @@
+"""
+Scoring of quiz answers.
+
+Each answer is scored once, when its QuestionAttempt is written, and the
+result is stored on the row (is_correct, is_partial, score). Reading quiz
+history is then a column fetch, and correctness can be filtered in SQL.
+After changing these rules, run rescore_question_attempts to update the
+stored attempts.
+
+Selected and correct options are compared as bitmasks, bit i for option i
+(QuestionAttempt.attempted_mask, QuizQuestion.correct_mask), so the same
+checks also work in queries, e.g. the correct options a user picked are
+F('attempted_mask').bitand(F('question__correct_mask')).
+"""
+
+FULL_SCORE = 4
+
+
+def score_answer(question_type, correct_mask, attempted_mask, negative_marking):
+    """
+    Return (is_correct, is_partial, score) for one answer to a question.
+    Correct and selected options are bitmasks, bit i for option i.
+    """
+    if not attempted_mask:
+        return False, False, 0
+
+    if question_type == 'multiple-correct':
+        correct_selections = attempted_mask & correct_mask
+        incorrect_selections = attempted_mask & ~correct_mask
+
+        # All correct options must be selected and no incorrect ones
+        is_correct = attempted_mask == correct_mask
+        # At least one correct option is selected and no incorrect ones
+        is_partial = bool(correct_selections) and not incorrect_selections
+
+        if negative_marking and incorrect_selections:
+            return is_correct, is_partial, -2
+        if correct_selections == correct_mask:
+            return is_correct, is_partial, FULL_SCORE
+        # Otherwise 1 point per correct option
+        return is_correct, is_partial, correct_selections.bit_count()
+
+    # For MCQ and True/False, the selected option must match the correct answer.
+    # As masks these compare as sets: the JSON lists compared before also had
+    # to agree in order and repeats, which a single selection cannot differ in
+    if attempted_mask == correct_mask:
+        return True, False, FULL_SCORE
+    return False, False, -1 if negative_marking else 0
+
+
+def score_question_attempts(question_attempts, negative_marking):
+    """Set is_correct, is_partial and score on the QuestionAttempts of one quiz attempt."""
+    for question_attempt in question_attempts:
+        question = question_attempt.question
+        question_attempt.is_correct, question_attempt.is_partial, question_attempt.score = score_answer(
+            question.question_type, question.correct_mask, question_attempt.attempted_mask, negative_marking
+        )
+    return question_attempts
+
+
+def rescore(question_attempts, batch_size=500):
+    """
+    Recompute the stored scores of a QuestionAttempt queryset in batches of
+    batch_size rows, and return the number of rows whose scores changed.
+    """
+    model = question_attempts.model
+    rows = question_attempts.select_related('question', 'quiz_attempt').only(
+        'attempted_mask', 'is_correct', 'is_partial', 'score',
+        'question__question_type', 'question__correct_mask', 'quiz_attempt__is_negative_marking',
+    ).order_by('id')
+    changed = []
+    updated = 0
+    for question_attempt in rows.iterator(chunk_size=batch_size):
+        stored = (question_attempt.is_correct, question_attempt.is_partial, question_attempt.score)
+        score_question_attempts([question_attempt], question_attempt.quiz_attempt.is_negative_marking)
+        if (question_attempt.is_correct, question_attempt.is_partial, question_attempt.score) != stored:
+            changed.append(question_attempt)
+        if len(changed) >= batch_size:
+            model.objects.bulk_update(changed, ['is_correct', 'is_partial', 'score'])
+            updated += len(changed)
+            changed = []
+    model.objects.bulk_update(changed, ['is_correct', 'is_partial', 'score'])
+    return updated + len(changed)
@@ -1,3 +1,127 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
-# Create your tests here.
+from authentication.models import User
+from search_app.models import QuizQuestion, Subtopic, Topic, mask_options, option_mask
+
+from .models import QuestionAttempt, QuizAttempt
+from .scoring import rescore, score_answer
+from .views import save_quiz_attempts
+
+
+class ScoreAnswerTests(SimpleTestCase):
+
+    def score(self, question_type, correct, attempted, negative_marking=False):
+        return score_answer(question_type, option_mask(correct), option_mask(attempted), negative_marking)
+
+    def test_single_answer(self):
+        for question_type in ('mcq', 'true-false'):
+            with self.subTest(question_type=question_type):
+                self.assertEqual(self.score(question_type, [1], [1]), (True, False, 4))
+                self.assertEqual(self.score(question_type, [1], [0]), (False, False, 0))
+                self.assertEqual(self.score(question_type, [1], [0], negative_marking=True), (False, False, -1))
+
+    def test_multiple_correct(self):
+        cases = [
+            ([0, 2], [2, 0], False, (True, True, 4)),
+            ([0, 2, 3], [0, 3], False, (False, True, 2)),
+            ([0, 2], [0, 1], False, (False, False, 1)),
+            ([0, 2], [0, 1], True, (False, False, -2)),
+            ([0, 2], [0, 1, 2], False, (False, False, 4)),
+        ]
+        for correct, attempted, negative_marking, expected in cases:
+            with self.subTest(correct=correct, attempted=attempted, negative_marking=negative_marking):
+                self.assertEqual(self.score('multiple-correct', correct, attempted, negative_marking), expected)
+
+    def test_empty_selection(self):
+        for question_type in ('mcq', 'true-false', 'multiple-correct'):
+            with self.subTest(question_type=question_type):
+                self.assertEqual(self.score(question_type, [0], [], negative_marking=True), (False, False, 0))
+
+    def test_out_of_range_indexes_are_rejected(self):
+        for indexes in ([15], [-1], [True], ['0'], [0.0]):
+            with self.subTest(indexes=indexes):
+                with self.assertRaises(ValueError):
+                    option_mask(indexes)
+
+
+class OptionMaskTests(TestCase):
+
+    def test_round_trip(self):
+        for indexes in ([], [0], [1, 3], list(range(15))):
+            with self.subTest(indexes=indexes):
+                self.assertEqual(mask_options(option_mask(indexes)), indexes)
+                self.assertEqual(QuestionAttempt(attempted_mask=option_mask(indexes)).attempted_options, indexes)
+
+    def test_questions_store_their_correct_mask(self):
+        topic = Topic.objects.create(name='Rust', content='')
+        question = QuizQuestion.objects.create(
+            topic=topic, subtopic=Subtopic.objects.create(topic=topic, name=''), question_type='multiple-correct',
+            question='Which are traits?', options=['Copy', 'Vec', 'Clone'], correct_answers=[2, 0], explanation='',
+        )
+        self.assertEqual(QuizQuestion.objects.get(id=question.id).correct_mask, 0b101)
+
+
+class RescoreTests(TestCase):
+
+    def setUp(self):
+        topic = Topic.objects.create(name='Rust', content='')
+        subtopic = Subtopic.objects.create(topic=topic, name='')
+        user = User.objects.create(name='u', email='u@example.com', password='')
+        question = QuizQuestion.objects.create(
+            topic=topic, subtopic=subtopic, question_type='multiple-correct', question='Which are traits?',
+            options=['Copy', 'Vec', 'Clone'], correct_answers=[0, 2], explanation='',
+        )
+        quiz_attempt = QuizAttempt.objects.create(
+            user=user, topic=topic, subtopic=subtopic, total_time_taken=10, score=0, correct_attempts=0,
+            incorrect_attempts=0, partial_attempts=1, unattempted=0, is_negative_marking=True,
+        )
+        self.question_attempt = QuestionAttempt.objects.create(
+            quiz_attempt=quiz_attempt, question=question, time_taken=10, attempted_mask=option_mask([0]),
+        )
+
+    def test_only_stale_scores_are_rewritten(self):
+        self.assertEqual(rescore(QuestionAttempt.objects.all()), 0)
+        QuestionAttempt.objects.update(is_correct=True, is_partial=False, score=4)
+        self.assertEqual(rescore(QuestionAttempt.objects.all(), batch_size=1), 1)
+        self.question_attempt.refresh_from_db()
+        self.assertEqual(
+            (self.question_attempt.is_correct, self.question_attempt.is_partial, self.question_attempt.score),
+            (False, True, 1),
+        )
+
+
+class SaveQuizAttemptsTests(TestCase):
+
+    def setUp(self):
+        self.topic = Topic.objects.create(name='Rust', content='')
+        subtopic = Subtopic.objects.create(topic=self.topic, name='')
+        self.user = User.objects.create(name='u', email='u@example.com', password='')
+        self.question = QuizQuestion.objects.create(
+            topic=self.topic, subtopic=subtopic, question_type='mcq', question='Which is a trait?',
+            options=['Copy', 'Vec'], correct_answers=[0], explanation='',
+        )
+
+    def attempt(self, subtopic, attempted_options):
+        return {
+            'user_id': self.user.id, 'total_time_taken': 5, 'score': 4, 'correct_attempts': 1,
+            'incorrect_attempts': 0, 'partial_attempts': 0, 'unattempted': 0,
+            'topic': 'Rust', 'subtopic': subtopic,
+            'question_attempts': [
+                {'question_id': str(self.question.id), 'time_taken': 5, 'attempted_options': attempted_options},
+            ],
+        }
+
+    def test_batch_is_saved_with_scores(self):
+        quiz_attempts = save_quiz_attempts([self.attempt('', [0]), self.attempt('Ownership', [1])])
+        self.assertEqual(len(quiz_attempts), 2)
+        self.assertEqual(
+            list(QuestionAttempt.objects.order_by('quiz_attempt_id').values_list('quiz_attempt__subtopic__name', 'score')),
+            [('', 4), ('Ownership', 0)],
+        )
+
+    def test_bad_item_rolls_back_the_batch(self):
+        with self.assertRaises(ValueError):
+            save_quiz_attempts([self.attempt('Ownership', [0]), self.attempt('', [99])])
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertFalse(QuestionAttempt.objects.exists())
+        self.assertFalse(Subtopic.objects.filter(name='Ownership').exists())
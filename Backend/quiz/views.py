@@ -2,12 +2,91 @@ import json
 from django.http import JsonResponse
 from django.shortcuts import render
 from .models import QuizAttempt, QuestionAttempt
-from search_app.models import QuizQuestion, Topic
+from .scoring import score_question_attempts
+from search_app.models import QuizQuestion, Topic, option_mask
+from search_app.subtopics import get_subtopics
+from search_app.views import get_topic
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
 from authentication.models import User
 
 # Create your views here.
+QUIZ_ATTEMPT_FIELDS = ['user_id', 'total_time_taken', 'score', 'correct_attempts',
+                       'incorrect_attempts', 'partial_attempts', 'unattempted',
+                       'topic', 'subtopic', 'question_attempts']
+
+def build_quiz_attempts(attempts):
+    """
+    Return unsaved (QuizAttempt, [QuestionAttempt]) pairs for attempt payloads.
+
+    Topics and subtopics are resolved once per name, and all questions with
+    one in_bulk query. Question attempts for unknown questions are skipped.
+    Raises Topic.DoesNotExist for an unknown topic.
+    """
+    topics = {}
+    for data in attempts:
+        if data['topic'] not in topics:
+            topics[data['topic']] = get_topic(data['topic'])
+    subtopics = {}
+    for topic_name, topic in topics.items():
+        names = {data['subtopic'] for data in attempts if data['topic'] == topic_name}
+        for name, subtopic in get_subtopics(topic, names).items():
+            subtopics[(topic_name, name)] = subtopic
+
+    questions = QuizQuestion.objects.in_bulk({
+        int(question_data['question_id']) for data in attempts for question_data in data['question_attempts']
+    })
+
+    built = []
+    for data in attempts:
+        quiz_attempt = QuizAttempt(
+            user_id=data['user_id'],
+            total_time_taken=data['total_time_taken'],
+            score=data['score'],
+            correct_attempts=data['correct_attempts'],
+            incorrect_attempts=data['incorrect_attempts'],
+            partial_attempts=data['partial_attempts'],
+            unattempted=data['unattempted'],
+            is_negative_marking=data.get('is_negative_marking', False),
+            topic=topics[data['topic']],
+            subtopic=subtopics[(data['topic'], data['subtopic'])]
+        )
+        question_attempts = [
+            QuestionAttempt(
+                question=questions[int(question_data['question_id'])],
+                time_taken=question_data['time_taken'],
+                attempted_mask=option_mask(question_data['attempted_options'])
+            )
+            # Skip questions that don't exist
+            for question_data in data['question_attempts']
+            if int(question_data['question_id']) in questions
+        ]
+        score_question_attempts(question_attempts, quiz_attempt.is_negative_marking)
+        built.append((quiz_attempt, question_attempts))
+    return built
+
+def save_quiz_attempts(attempts):
+    """
+    Save attempt payloads with one insert for the quiz attempts and one for
+    their questions. Nothing is saved, not even new subtopics, if any fails.
+    """
+    with transaction.atomic():
+        built = build_quiz_attempts(attempts)
+        quiz_attempts = QuizAttempt.objects.bulk_create([quiz_attempt for quiz_attempt, _ in built])
+        question_attempts = []
+        for quiz_attempt, attempts_of_quiz in built:
+            for question_attempt in attempts_of_quiz:
+                question_attempt.quiz_attempt = quiz_attempt
+                question_attempts.append(question_attempt)
+        QuestionAttempt.objects.bulk_create(question_attempts)
+    return quiz_attempts
+
 def save_quiz_attempt(request):
+    """
+    Save one quiz attempt, or a list of them sent as {"attempts": [...]} by
+    clients syncing attempts made offline. A list is saved all or nothing.
+    """
     # Check if request method is POST
     if request.method != 'POST':
         return JsonResponse({
@@ -17,62 +96,42 @@ def save_quiz_attempt(request):
 
     try:
         data = json.loads(request.body)
-        
+        batch = isinstance(data, dict) and 'attempts' in data
+        attempts = data['attempts'] if batch else [data]
+        if not isinstance(attempts, list) or not all(isinstance(attempt, dict) for attempt in attempts):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'attempts must be a list of quiz attempts'
+            }, status=400)
+
         # Validate required fields
-        required_fields = ['user_id', 'total_time_taken', 'score', 'correct_attempts', 
-                            'incorrect_attempts', 'partial_attempts', 'unattempted', 
-                            'topic', 'subtopic', 'question_attempts']
-        
-        for field in required_fields:
-            if field not in data:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': f'Missing required field: {field}'
-                }, status=400)
-        
-        # Get or create the Topic object
-        topic_name = data['topic']
+        for index, attempt in enumerate(attempts):
+            for field in QUIZ_ATTEMPT_FIELDS:
+                if field not in attempt:
+                    return JsonResponse({
+                        'status': 'error',
+                        'message': f'Missing required field: {field}' + (f' in attempt {index}' if batch else '')
+                    }, status=400)
+
         try:
-            topic = Topic.objects.get(name=topic_name)
+            quiz_attempts = save_quiz_attempts(attempts)
         except Topic.DoesNotExist:
             return JsonResponse({
                 'status': 'error',
                 'message': 'Topic not found'
             }, status=404)
-        
-        # Create the quiz attempt
-        quiz_attempt = QuizAttempt.objects.create(
-            user_id=data['user_id'],
-            total_time_taken=data['total_time_taken'],
-            score=data['score'],
-            correct_attempts=data['correct_attempts'],
-            incorrect_attempts=data['incorrect_attempts'],
-            partial_attempts=data['partial_attempts'],
-            unattempted=data['unattempted'],
-            is_negative_marking=data.get('is_negative_marking', False),
-            topic=topic,
-            subtopic=data['subtopic']
-        )
-        
-        # Create question attempts
-        for question_data in data['question_attempts']:
-            try:
-                question = QuizQuestion.objects.get(id=question_data['question_id'])
-                QuestionAttempt.objects.create(
-                    quiz_attempt=quiz_attempt,
-                    question=question,
-                    time_taken=question_data['time_taken'],
-                    attempted_options=question_data['attempted_options']
-                )
-            except QuizQuestion.DoesNotExist:
-                # Skip if question doesn't exist
-                continue
-        
+
+        if not batch:
+            return JsonResponse({
+                'status': 'success',
+                'message': 'Quiz attempt saved successfully'
+            })
         return JsonResponse({
             'status': 'success',
-            'message': 'Quiz attempt saved successfully'
+            'message': f'{len(quiz_attempts)} quiz attempts saved successfully',
+            'attempt_ids': [quiz_attempt.id for quiz_attempt in quiz_attempts]
         })
-        
+
     except Exception as e:
         return JsonResponse({
             'status': 'error',
@@ -102,13 +161,16 @@ def get_quiz_history(request):
             }, status=404)
 
         # Get all quiz attempts for the specified user
-        quiz_attempts = QuizAttempt.objects.filter(user=user).order_by('-created_at')
+        # Scores are stored on the question attempts, so this is two queries however long the history
+        quiz_attempts = QuizAttempt.objects.filter(user=user).select_related('topic', 'subtopic').prefetch_related(
+            Prefetch('question_attempts', queryset=QuestionAttempt.objects.select_related('question').order_by('id'))
+        ).order_by('-created_at')
         
         quiz_history = []
         
         for attempt in quiz_attempts:
             # Get all question attempts for this quiz
-            question_attempts = attempt.question_attempts.all()
+            question_attempts = list(attempt.question_attempts.all())
             
             questions = []
             for q_attempt in question_attempts:
@@ -128,14 +190,14 @@ def get_quiz_history(request):
             quiz_data = {
                 'id': str(attempt.id),
                 'topic': attempt.topic.name,  # Use topic name from Topic object
-                'subtopic': attempt.subtopic,
+                'subtopic': attempt.subtopic.name,
                 'date': attempt.created_at.strftime('%Y-%m-%d'),
                 'percentage': attempt.score_percentage,
                 'total_possible_score': attempt.total_possible_score,
                 'score': attempt.score,
                 'timeSpent': attempt.total_time_taken,
                 'negativeMarking': attempt.is_negative_marking,
-                'question_type': question_attempts.first().question.question_type,
+                'question_type': question_attempts[0].question.question_type if question_attempts else None,
                 'questions': questions
             }
             
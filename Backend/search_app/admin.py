@@ -1,9 +1,40 @@
 from django.contrib import admin
-from .models import Topic, QuizQuestion
+from .models import Topic, TopicAlias, Subtopic, QuizQuestion, MergedQuizQuestion, SearchDocument, ApiKeyUsage, ApiKeyHealth
 
 # Register your models here.
 admin.site.register(Topic)
 
+@admin.register(TopicAlias)
+class TopicAliasAdmin(admin.ModelAdmin):
+    list_display = ('name', 'canonical_name', 'topic', 'created_at')
+    search_fields = ('name', 'canonical_name')
+
+@admin.register(Subtopic)
+class SubtopicAdmin(admin.ModelAdmin):
+    list_display = ('name', 'topic', 'position', 'created_at')
+    search_fields = ('name', 'canonical_name', 'topic__name')
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ('title', 'kind', 'topic', 'subtopic', 'updated_at')
+    list_filter = ('kind',)
+    search_fields = ('title',)
+
 @admin.register(QuizQuestion)
 class QuizQuestionAdmin(admin.ModelAdmin):
-    list_display = ('question', 'question_type')
\ No newline at end of file
+    list_display = ('question', 'question_type')
+
+@admin.register(MergedQuizQuestion)
+class MergedQuizQuestionAdmin(admin.ModelAdmin):
+    list_display = ('question_id', 'kept_id', 'question', 'merged_at')
+    search_fields = ('question',)
+
+@admin.register(ApiKeyUsage)
+class ApiKeyUsageAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'key_id', 'day', 'requests', 'units', 'tokens', 'rate_limited', 'errors', 'average_latency_ms')
+    list_filter = ('provider', 'day')
+
+@admin.register(ApiKeyHealth)
+class ApiKeyHealthAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'key_id', 'consecutive_failures', 'trips', 'benched_until', 'last_error')
+    list_filter = ('provider',)
\ No newline at end of file
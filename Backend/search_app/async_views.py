@@ -0,0 +1,472 @@
+"""
+Async versions of the generation views.
+
+These mirror the views in views.py but await the Gemini and YouTube round
+trips instead of holding a worker thread for them, so a single ASGI worker
+can keep many cold generations in flight. Database writes that need a
+transaction run through sync_to_async and reuse the store_* helpers from
+views.py. Enable them with ASYNC_VIEWS=true and serve LearnFlow.asgi.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+from .gemini_api import call_gemini_model_async, stream_gemini_model_async
+from .output_parsing import (
+    OutputParseError,
+    QUIZ_BATCH_SCHEMA,
+    agenerate_items,
+    parse_quiz_batch,
+    parse_topic_content,
+    quiz_batch_complete,
+    topic_content_valid,
+)
+from .models import Topic, VideoResource, ArticleResource, DocumentationResource
+from .prefetch import interactive, schedule_prefetch
+from .quiz_sourcing import get_quiz_sourcing
+from .singleflight import async_generation_lock, async_single_flight
+from .subtopics import get_subtopic
+from .views import (
+    build_quiz_batch_prompt,
+    build_youtube_query,
+    event_stream_response,
+    fuzzy_topic_response,
+    RESOURCE_ITEM_COUNT,
+    RESOURCE_KINDS,
+    add_new_questions,
+    alias_candidates,
+    articles_item_request,
+    documentation_item_request,
+    generate_prompt,
+    load_topic_resources,
+    plan_question_bank_fill,
+    plan_quiz_batches,
+    questions_to_avoid,
+    quiz_batch_shortfall,
+    quiz_endpoint,
+    quiz_flight_key,
+    quiz_item_request,
+    question_bank_key,
+    read_question_bank_request,
+    read_stream_query,
+    sample_questions_from_db,
+    serialize_articles,
+    serialize_documentation,
+    serialize_videos,
+    sse_event,
+    store_articles,
+    store_documentation,
+    store_quiz_batch,
+    store_quiz_questions,
+    store_topic_content,
+    store_videos,
+    stored_bucket_questions,
+    stored_question_texts,
+    summarize_question_bank,
+    topic_candidates,
+    topic_flight_key,
+)
+from .youtube_api import search_youtube_async
+
+logger = logging.getLogger(__name__)
+
+
+def _is_ajax_post(request):
+    return request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+def agemini_caller(endpoint):
+    """Async counterpart of views.gemini_caller."""
+    async def call(prompt, response_schema, cacheable):
+        return await call_gemini_model_async(
+            prompt, endpoint=endpoint, response_schema=response_schema, cacheable=cacheable
+        )
+    return call
+
+
+async def agenerate_topic_content(topic_name):
+    """Async counterpart of views.generate_topic_content."""
+    prompt = generate_prompt(topic_name)
+    for attempt in range(1 + settings.OUTPUT_REPAIR_ATTEMPTS):
+        result = await call_gemini_model_async(prompt, endpoint="topic", cacheable=topic_content_valid)
+        try:
+            return parse_topic_content(result)
+        except OutputParseError as e:
+            error = e
+            logger.warning(f"Unusable content for topic {topic_name!r}: {e}")
+    raise error
+
+
+async def afind_topic(topic_name):
+    """Async counterpart of views.find_topic."""
+    topic = await topic_candidates(topic_name).afirst()
+    if topic is not None and topic.content:
+        return topic
+    alias = await alias_candidates(topic_name).afirst()
+    return alias.topic if alias is not None else topic
+
+
+async def aget_topic(topic_name):
+    """Async counterpart of views.get_topic."""
+    topic = await afind_topic(topic_name)
+    if topic is None:
+        raise Topic.DoesNotExist(f"Topic {topic_name!r} not found")
+    return topic
+
+
+async def aget_or_create_topic(topic_name):
+    """Async counterpart of views.get_or_create_topic."""
+    return await afind_topic(topic_name) or (await Topic.objects.aget_or_create(name=topic_name))[0]
+
+
+async def aget_subtopic(topic, subtopic_name):
+    """Async counterpart of views.get_subtopic."""
+    return await sync_to_async(get_subtopic)(topic, subtopic_name)
+
+
+async def aget_or_generate_topic_content(topic_name):
+    """Async counterpart of views.get_or_generate_topic_content."""
+    topic = await afind_topic(topic_name)
+    if topic and topic.content:
+        return topic.content
+
+    async def generate(contended):
+        # Another request may have stored the topic while we waited
+        topic = await afind_topic(topic_name)
+        if topic and topic.content:
+            return topic.content
+
+        result = await agenerate_topic_content(topic_name)
+        await sync_to_async(store_topic_content)(topic, topic_name, result)
+        schedule_prefetch(topic_name, result)
+        return result
+
+    return await async_single_flight(topic_flight_key(topic_name), generate)
+
+
+async def aget_or_generate_videos(topic, subtopic_name):
+    """Async counterpart of views.get_or_generate_videos."""
+    subtopic = await aget_subtopic(topic, subtopic_name)
+
+    async def load():
+        videos = [video async for video in VideoResource.objects.filter(subtopic=subtopic)]
+        return serialize_videos(videos) if videos else None
+
+    videos = await load()
+    if videos is not None:
+        return videos
+
+    async def generate(contended):
+        videos = await load()
+        if videos is not None:
+            return videos
+
+        youtube_results = await search_youtube_async(build_youtube_query(topic.name, subtopic_name))
+        return await sync_to_async(store_videos)(topic, subtopic, youtube_results)
+
+    return await async_single_flight(f"videos:{subtopic.id}", generate)
+
+
+async def aget_or_generate_articles(topic, subtopic_name):
+    """Async counterpart of views.get_or_generate_articles."""
+    subtopic = await aget_subtopic(topic, subtopic_name)
+
+    async def load():
+        articles = [article async for article in ArticleResource.objects.filter(subtopic=subtopic)]
+        return serialize_articles(articles) if articles else None
+
+    articles = await load()
+    if articles is not None:
+        return articles
+
+    async def generate(contended):
+        articles = await load()
+        if articles is not None:
+            return articles
+
+        articles_data = await agenerate_items(
+            articles_item_request(topic.name, subtopic_name),
+            RESOURCE_ITEM_COUNT,
+            agemini_caller("articles"),
+            settings.OUTPUT_REPAIR_ATTEMPTS,
+        )
+        return await sync_to_async(store_articles)(topic, subtopic, articles_data)
+
+    return await async_single_flight(f"articles:{subtopic.id}", generate)
+
+
+async def aget_or_generate_documentation(topic, subtopic_name):
+    """Async counterpart of views.get_or_generate_documentation."""
+    subtopic = await aget_subtopic(topic, subtopic_name)
+
+    async def load():
+        docs = [doc async for doc in DocumentationResource.objects.filter(subtopic=subtopic)]
+        return serialize_documentation(docs) if docs else None
+
+    documentation = await load()
+    if documentation is not None:
+        return documentation
+
+    async def generate(contended):
+        documentation = await load()
+        if documentation is not None:
+            return documentation
+
+        docs_data = await agenerate_items(
+            documentation_item_request(topic.name, subtopic_name),
+            RESOURCE_ITEM_COUNT,
+            agemini_caller("documentation"),
+            settings.OUTPUT_REPAIR_ATTEMPTS,
+        )
+        return await sync_to_async(store_documentation)(topic, subtopic, docs_data)
+
+    return await async_single_flight(f"documentation:{subtopic.id}", generate)
+
+
+async def aget_or_generate_resources(topic, subtopic_name):
+    """Async counterpart of views.get_or_generate_resources."""
+    resources = await sync_to_async(load_topic_resources)(topic, subtopic_name)
+    generators = {
+        'videos': aget_or_generate_videos,
+        'articles': aget_or_generate_articles,
+        'documentation': aget_or_generate_documentation,
+    }
+    missing = [kind for kind in RESOURCE_KINDS if resources[kind] is None]
+    results = await asyncio.gather(
+        *(generators[kind](topic, subtopic_name) for kind in missing), return_exceptions=True
+    )
+
+    errors = {}
+    for kind, result in zip(missing, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error generating {kind}: {result}")
+            resources[kind] = []
+            errors[kind] = str(result)
+        else:
+            resources[kind] = result
+    resources['errors'] = errors
+    return resources
+
+
+@interactive
+async def search_gemini(request):
+    if not _is_ajax_post(request):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    data = json.loads(request.body)
+    topic_name = data.get('search_query', '')
+    try:
+        fuzzy = None if data.get('exact') else await sync_to_async(fuzzy_topic_response)(topic_name)
+        if fuzzy is not None:
+            return JsonResponse(fuzzy)
+
+        result = await aget_or_generate_topic_content(topic_name)
+        return JsonResponse({'result': result})
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def astream_topic_content(topic_name):
+    """Async counterpart of views.stream_topic_content."""
+    try:
+        topic = await afind_topic(topic_name)
+        if topic and topic.content:
+            yield sse_event({'chunk': topic.content})
+            yield sse_event({}, event='done')
+            return
+
+        async with async_generation_lock(topic_flight_key(topic_name)):
+            topic = await afind_topic(topic_name)
+            if topic and topic.content:
+                yield sse_event({'chunk': topic.content})
+            else:
+                chunks = []
+                async for chunk in stream_gemini_model_async(generate_prompt(topic_name)):
+                    chunks.append(chunk)
+                    yield sse_event({'chunk': chunk})
+                # Unusable content is reported as an error and not stored
+                content = parse_topic_content(''.join(chunks))
+                await sync_to_async(store_topic_content)(topic, topic_name, content)
+                schedule_prefetch(topic_name, content)
+        yield sse_event({}, event='done')
+
+    except Exception as e:
+        logger.error(f"Error streaming topic {topic_name!r}: {e}")
+        yield sse_event({'error': str(e)}, event='error')
+
+
+async def search_gemini_stream(request):
+    """Streaming variant of search_gemini that forwards generated content over SSE."""
+    topic_name = read_stream_query(request)
+    if topic_name is None:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    if not topic_name:
+        return JsonResponse({'error': 'search_query is required'}, status=400)
+    return event_stream_response(astream_topic_content(topic_name))
+
+
+@interactive
+async def generate_quiz(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        topic_name = data.get('topic')
+        subtopic = data.get('subtopic', '')
+        question_type = data.get('question_type', 'mcq')
+        num_questions = data.get('num_questions', 10)
+        user_id = data.get('user_id')
+
+        try:
+            topic = await aget_topic(topic_name)
+        except Topic.DoesNotExist:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Topic not found'
+            }, status=404)
+
+        questions_data = await sync_to_async(get_quiz_sourcing().serve)(topic, subtopic, question_type, num_questions, user_id)
+        if questions_data is not None:
+            return JsonResponse({'quiz': {'quiz': questions_data}})
+
+        async def generate(contended):
+            if contended:
+                questions_data = await sync_to_async(sample_questions_from_db)(topic, subtopic, question_type, num_questions, user_id)
+                if questions_data is not None:
+                    return questions_data
+            stored_subtopic = await aget_subtopic(topic, subtopic)
+            avoid = await sync_to_async(stored_question_texts)(stored_subtopic, question_type)
+            questions = await agenerate_items(
+                quiz_item_request(topic.name, subtopic, question_type, avoid),
+                num_questions,
+                agemini_caller(quiz_endpoint(avoid)),
+                settings.OUTPUT_REPAIR_ATTEMPTS,
+            )
+            return await sync_to_async(store_quiz_questions)(topic, stored_subtopic, question_type, {'quiz': questions})
+
+        final_questions = await async_single_flight(
+            quiz_flight_key(topic, subtopic, question_type, num_questions), generate
+        )
+        return JsonResponse({'quiz': {'quiz': final_questions}})
+
+    except Exception as e:
+        logger.error(f"Error generating quiz: {e}")
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+async def agenerate_quiz_batch_questions(topic, buckets):
+    """Async counterpart of views.generate_quiz_batch_questions."""
+    stored = await sync_to_async(stored_bucket_questions)(topic, buckets)
+    results = {}
+    for attempt in range(1 + settings.OUTPUT_REPAIR_ATTEMPTS):
+        avoid = questions_to_avoid(stored, results)
+        for batch in plan_quiz_batches(buckets, settings.QUIZ_BATCH_MAX_QUESTIONS):
+            response_text = await call_gemini_model_async(
+                build_quiz_batch_prompt(topic.name, batch, avoid),
+                endpoint="quiz_bank",
+                response_schema=QUIZ_BATCH_SCHEMA,
+                cacheable=quiz_batch_complete,
+            )
+            batch_questions = await sync_to_async(store_quiz_batch)(topic, batch, parse_quiz_batch(response_text))
+            add_new_questions(results, stored, batch, batch_questions)
+        buckets = quiz_batch_shortfall(buckets, results)
+        if not buckets:
+            break
+    return results
+
+
+async def afill_question_bank(topic, subtopics, question_types, per_bucket):
+    """Async counterpart of views.fill_question_bank."""
+    async def generate(contended):
+        buckets = await sync_to_async(plan_question_bank_fill)(topic, subtopics, question_types, per_bucket)
+        generated = await agenerate_quiz_batch_questions(topic, buckets) if buckets else {}
+        return await sync_to_async(summarize_question_bank)(topic, subtopics, question_types, generated)
+
+    return await async_single_flight(question_bank_key(topic, subtopics, question_types, per_bucket), generate)
+
+
+async def generate_quiz_batch(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    try:
+        try:
+            topic, subtopics, question_types, per_bucket = await sync_to_async(read_question_bank_request)(request)
+        except Topic.DoesNotExist:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Topic not found'
+            }, status=404)
+
+        buckets = await afill_question_bank(topic, subtopics, question_types, per_bucket)
+        return JsonResponse({'buckets': buckets})
+
+    except Exception as e:
+        logger.error(f"Error generating quiz batch: {e}")
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+async def _resource_view(request, response_key, get_or_generate):
+    if not _is_ajax_post(request):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        topic_name = data.get('topic_name', '')
+        subtopic_name = data.get('subtopic_name', '') or ''
+
+        if not topic_name:
+            return JsonResponse({'error': 'Topic name is required'}, status=400)
+
+        topic = await aget_or_create_topic(topic_name)
+        return JsonResponse({response_key: await get_or_generate(topic, subtopic_name)})
+
+    except Exception as e:
+        logger.error(f"Error generating {response_key}: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@interactive
+async def generate_resources_for_topic(request):
+    """Return videos, articles and documentation for a topic or subtopic in one response."""
+    if not _is_ajax_post(request):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        topic_name = data.get('topic_name', '')
+        subtopic_name = data.get('subtopic_name', '') or ''
+
+        if not topic_name:
+            return JsonResponse({'error': 'Topic name is required'}, status=400)
+
+        topic = await aget_or_create_topic(topic_name)
+        return JsonResponse(await aget_or_generate_resources(topic, subtopic_name))
+
+    except Exception as e:
+        logger.error(f"Error generating resources: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@interactive
+async def generate_videos_for_topic(request):
+    """Generate YouTube videos for a specific topic or subtopic."""
+    return await _resource_view(request, 'videos', aget_or_generate_videos)
+
+
+@interactive
+async def generate_articles_for_topic(request):
+    """Generate articles for a specific topic or subtopic."""
+    return await _resource_view(request, 'articles', aget_or_generate_articles)
+
+
+@interactive
+async def generate_documentation_for_topic(request):
+    """Generate documentation for a specific topic or subtopic."""
+    return await _resource_view(request, 'documentation', aget_or_generate_documentation)
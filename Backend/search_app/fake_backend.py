@@ -0,0 +1,342 @@
+"""
+Local stand-in for the Gemini and YouTube Data APIs.
+
+Serves the subset of both REST APIs that LearnFlow uses, with schema-correct
+payloads for every prompt the app sends, plus configurable latency, 429/500
+error rates and truncated model output. Start it with
+`python manage.py run_fake_backend` and set MODEL_BACKEND=fake to route the
+real clients to it.
+"""
+import json
+import logging
+import math
+import random
+import re
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ['Beginner', 'Intermediate', 'Advanced', 'Expert', 'Mastery']
+RESOURCE_TABS = ['Videos', 'Articles', 'Courses', 'Books', 'Documentation', 'Cheat Sheets', 'Practice Problems']
+LEVELS = ['Basic Level', 'Intermediate Level', 'Advanced Level', 'Expert Level']
+
+
+class FakeBackendConfig:
+    """Latency and fault-injection settings for the fake backend."""
+
+    def __init__(self, gemini_latency=2.0, youtube_latency=0.3, latency_sigma=0.5, rate_429=0.0,
+                 rate_500=0.0, truncate_rate=0.0, stream_chunks=20, subtopics=8, seed=None):
+        # Latencies are medians in seconds of a log-normal distribution with shape latency_sigma
+        self.gemini_latency = gemini_latency
+        self.youtube_latency = youtube_latency
+        self.latency_sigma = latency_sigma
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.truncate_rate = truncate_rate
+        self.stream_chunks = stream_chunks
+        self.subtopics = subtopics
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def random(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def latency(self, median):
+        if median <= 0:
+            return 0
+        with self.rng_lock:
+            return self.rng.lognormvariate(math.log(median), self.latency_sigma)
+
+    def token(self, length=6):
+        with self.rng_lock:
+            return ''.join(self.rng.choices(string.ascii_lowercase, k=length))
+
+    def choice(self, options):
+        with self.rng_lock:
+            return self.rng.choice(options)
+
+
+def fake_topic(name, config):
+    subtopics = []
+    for i in range(config.subtopics):
+        subtopic = f"{name} Concept {i + 1}"
+        subtopics.append({
+            'name': subtopic,
+            'description': f"Understanding {subtopic} and how it fits into {name}.",
+            'difficulty': DIFFICULTIES[min(i // 2, len(DIFFICULTIES) - 1)],
+            'timeToComplete': f"{2 + i % 4} hours",
+            'whyItMatters': f"{subtopic} comes up in most real {name} work.",
+            'commonMistakes': [f"Common mistake {j + 1} with {subtopic}." for j in range(3)],
+            'resourceTabs': [],
+        })
+
+    content = {
+        'Short Description': {
+            'Description': f"**{name}** is a topic worth learning. This description was produced by the fake backend.",
+        },
+        f"Need to Learn {name}": {
+            'Description': f"Learning {name} opens new opportunities.",
+            'Benefit 1': {'heading': 'Careers', 'description': f"{name} skills are in demand."},
+            'Benefit 2': {'heading': 'Projects', 'description': f"Build real projects with {name}."},
+            'Benefit 3': {'heading': 'Community', 'description': f"{name} has an active community."},
+        },
+        'Resource Tab Suggestions': {'Description': RESOURCE_TABS[:3]},
+        'SubTopics': {'Description': {'subtopics': subtopics}},
+        f"Road Map to Learn {name}": {
+            'Description': {
+                'prerequisites': [f"Prerequisite {i + 1} for {name}" for i in range(3)],
+                'levels': [{
+                    'name': level,
+                    'description': f"{level} {name} skills",
+                    'topics': [f"{level} topic {i + 1}" for i in range(3)],
+                    'howToConquer': 'Practice regularly.',
+                    'insiderTips': 'Build small projects as you go.',
+                } for level in LEVELS],
+            },
+        },
+        'Key Takeaways': {'Description': [f"Takeaway {i + 1} about {name}." for i in range(4)]},
+        'Frequently Asked Questions': {'Description': [
+            {'question': f"Question {i + 1} about {name}?", 'answer': f"Answer {i + 1}."} for i in range(5)
+        ]},
+        'Related Topics': {'Description': [
+            {'topic': f"{name} Related {i + 1}", 'description': f"A topic related to {name}."} for i in range(3)
+        ]},
+    }
+    return {'topic': name, name: content}
+
+
+def fake_question(subject, question_type, config):
+    option_count = 2 if question_type == 'true-false' else 4
+    if question_type == 'true-false':
+        options = ['True', 'False']
+    else:
+        options = [f"Option {chr(65 + i)} ({config.token(4)})" for i in range(option_count)]
+    if question_type == 'multiple-correct':
+        correct = sorted({0, int(config.random() * option_count)})
+    else:
+        correct = [int(config.random() * option_count)]
+    return {
+        'type': question_type,
+        'question': f"Fake question {config.token()} about {subject}?",
+        'options': options,
+        'correct_answers': correct,
+        'explanation': f"Explanation for a question about {subject}.",
+    }
+
+
+def fake_quiz(subject, question_type, count, config):
+    return {'quiz': [fake_question(subject, question_type, config) for _ in range(count)]}
+
+
+def fake_articles(subject, config):
+    slug = re.sub(r'\W+', '-', subject.lower()).strip('-')
+    return [{
+        'title': f"{subject} guide part {i + 1}",
+        'url': f"https://example.com/articles/{slug}-{config.token()}",
+        'readTime': f"{5 + i * 3} min",
+    } for i in range(2)]
+
+
+def fake_documentation(subject, config):
+    slug = re.sub(r'\W+', '-', subject.lower()).strip('-')
+    return [{
+        'title': f"{subject} reference {i + 1}",
+        'url': f"https://docs.example.com/{slug}-{config.token()}",
+        'type': config.choice(['Official Documentation', 'API Reference', 'Tutorial']),
+    } for i in range(2)]
+
+
+def fake_model_text(prompt, config):
+    """Return the response text the real model would produce for one of the app's prompts."""
+    match = re.search(r"\{topic-name\} = (.+)", prompt)
+    if match:
+        return json.dumps(fake_topic(match.group(1).strip(), config))
+
+    sets = re.findall(r"- set (\d+): (\d+) questions of type '([^']+)' on (.+)", prompt)
+    if sets:
+        return json.dumps({'sets': [
+            {'set': int(number), **fake_quiz(subject.strip(), question_type, int(count), config)}
+            for number, count, question_type, subject in sets
+        ]})
+
+    match = re.search(r"The quiz should consist of (\d+) questions", prompt)
+    if match:
+        question_type = re.search(r"of type '([^']+)'", prompt)
+        subject = re.search(r"Create a quiz on the (.+?)\.\s*\n", prompt)
+        return json.dumps(fake_quiz(
+            subject.group(1) if subject else 'the topic',
+            question_type.group(1) if question_type else 'mcq',
+            int(match.group(1)),
+            config,
+        ))
+
+    match = re.search(r"articles about (.+?)\.\s*\n", prompt)
+    if match:
+        return json.dumps(fake_articles(match.group(1).strip(), config))
+
+    match = re.search(r"documentation sources for (.+?)\.\s*\n", prompt)
+    if match:
+        return json.dumps(fake_documentation(match.group(1).strip(), config))
+
+    return json.dumps({'text': 'Fake response'})
+
+
+def fake_youtube_search(query, max_results, config):
+    items = []
+    for i in range(max_results):
+        video_id = config.token(11)
+        items.append({
+            'kind': 'youtube#searchResult',
+            'id': {'kind': 'youtube#video', 'videoId': video_id},
+            'snippet': {
+                'title': f"{query} #{i + 1}",
+                'description': f"A fake video about {query}.",
+                'thumbnails': {'default': {'url': f"https://i.ytimg.com/vi/{video_id}/default.jpg"}},
+                'channelTitle': 'Fake Channel',
+            },
+        })
+    return {'kind': 'youtube#searchListResponse', 'items': items}
+
+
+def fake_youtube_videos(video_ids, config):
+    return {'kind': 'youtube#videoListResponse', 'items': [{
+        'id': video_id,
+        'contentDetails': {'duration': f"PT{int(config.random() * 40) + 3}M{int(config.random() * 60)}S"},
+    } for video_id in video_ids]}
+
+
+def _gemini_error(code):
+    status = 'RESOURCE_EXHAUSTED' if code == 429 else 'INTERNAL'
+    message = 'Resource has been exhausted (e.g. check quota).' if code == 429 else 'Internal error encountered.'
+    return {'error': {'code': code, 'message': message, 'status': status}}
+
+
+def _youtube_error(code):
+    reason = 'rateLimitExceeded' if code == 429 else 'backendError'
+    return {'error': {'code': code, 'message': reason, 'errors': [{'reason': reason, 'domain': 'youtube'}]}}
+
+
+class FakeBackendHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _injected_error(self):
+        """Return an HTTP status to fail with, or None."""
+        roll = self.config.random()
+        if roll < self.config.rate_429:
+            return 429
+        if roll < self.config.rate_429 + self.config.rate_500:
+            return 500
+        return None
+
+    def _model_text(self, body):
+        request = json.loads(body or b'{}')
+        prompt = ''.join(
+            part.get('text', '')
+            for content in request.get('contents', [])
+            for part in content.get('parts', [])
+        )
+        text = fake_model_text(prompt, self.config)
+        finish_reason = 'STOP'
+        if self.config.random() < self.config.truncate_rate:
+            text = text[:max(1, int(len(text) * (0.3 + 0.65 * self.config.random())))]
+            finish_reason = 'MAX_TOKENS'
+        return prompt, text, finish_reason
+
+    @staticmethod
+    def _candidate(text, finish_reason=None, prompt_tokens=0, output_tokens=0):
+        candidate = {'content': {'role': 'model', 'parts': [{'text': text}]}, 'index': 0}
+        if finish_reason:
+            candidate['finishReason'] = finish_reason
+        return {
+            'candidates': [candidate],
+            'usageMetadata': {
+                'promptTokenCount': prompt_tokens,
+                'candidatesTokenCount': output_tokens,
+                'totalTokenCount': prompt_tokens + output_tokens,
+            },
+        }
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if ':generateContent' not in path and ':streamGenerateContent' not in path:
+            self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+            return
+
+        latency = self.config.latency(self.config.gemini_latency)
+        error = self._injected_error()
+        if error:
+            time.sleep(latency * self.config.random())
+            self._send_json(error, _gemini_error(error))
+            return
+
+        prompt, text, finish_reason = self._model_text(body)
+        prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+
+        if ':streamGenerateContent' not in path:
+            time.sleep(latency)
+            self._send_json(200, self._candidate(text, finish_reason, prompt_tokens, output_tokens))
+            return
+
+        # Spread the latency over the chunks so time-to-first-byte is realistic
+        chunk_count = max(1, min(self.config.stream_chunks, len(text)))
+        size = math.ceil(len(text) / chunk_count)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            time.sleep(latency / len(chunks))
+            last = i == len(chunks) - 1
+            payload = self._candidate(chunk, finish_reason if last else None, prompt_tokens, output_tokens if last else 0)
+            event = f"data: {json.dumps(payload)}\r\n\r\n".encode('utf-8')
+            self.wfile.write(f"{len(event):x}\r\n".encode('ascii') + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path not in ('/youtube/v3/search', '/youtube/v3/videos'):
+            self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+            return
+
+        time.sleep(self.config.latency(self.config.youtube_latency))
+        error = self._injected_error()
+        if error:
+            self._send_json(error, _youtube_error(error))
+            return
+
+        if url.path == '/youtube/v3/search':
+            query = params.get('q', [''])[0]
+            max_results = int(params.get('maxResults', ['5'])[0])
+            self._send_json(200, fake_youtube_search(query, max_results, self.config))
+        else:
+            video_ids = params.get('id', [''])[0].split(',')
+            self._send_json(200, fake_youtube_videos([v for v in video_ids if v], self.config))
+
+
+def make_server(host='127.0.0.1', port=8765, config=None):
+    """Build (but do not start) a threaded HTTP server for the fake backend."""
+    handler = type('ConfiguredFakeBackendHandler', (FakeBackendHandler,), {'config': config or FakeBackendConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
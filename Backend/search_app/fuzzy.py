@@ -0,0 +1,275 @@
+"""
+Fuzzy matching of topic names against the stored topics.
+
+Candidates are found by trigram similarity over Topic.canonical_name, the
+same measure as Postgres pg_trgm. On Postgres the lookup uses pg_trgm and
+its GIN index. Other databases use an in-process inverted index, loaded on
+first use and kept current by the Topic post_save/post_delete signals and
+by periodically reading topics added by other workers.
+
+Trigrams alone score transpositions poorly ("pyhton" shares only 3 of 11
+trigrams with "python"), so candidates are re-ranked by the better of
+their trigram similarity and an edit-distance similarity. That score only
+ranks suggestions: a stored topic is served in place of the query only
+when its trigram similarity alone is high enough and both names carry the
+same numbers, since names one edit apart are often different topics
+("Python 2" and "Python 3", "Perl" and "Pearl").
+"""
+import logging
+import math
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .normalization import canonicalize
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text):
+    """The set of trigrams of text as pg_trgm computes them: per word, padded with two spaces in front and one behind."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def edit_similarity(a, b):
+    """1 - Damerau-Levenshtein (optimal string alignment) distance / length of the longer string."""
+    if not a or not b:
+        return 0.0
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return 1 - previous[-1] / max(len(a), len(b))
+
+
+def match_score(query, candidate):
+    return max(trigram_similarity(trigrams(query), trigrams(candidate)), edit_similarity(query, candidate))
+
+
+_NUMBERS = re.compile(r"\d+")
+
+
+def numbers(text):
+    """The numbers in a name, in order; they usually name a version ("Python 3", "C++17")."""
+    return _NUMBERS.findall(text)
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to topic ids over canonical topic names.
+
+    A lookup only reads the rarest posting lists of the query's trigrams
+    (prefix filtering), so its cost depends on how rare those trigrams are
+    rather than on the number of topics.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._names = {}
+        self._grams = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, topic_id, canonical_name):
+        grams = trigrams(canonical_name)
+        with self._lock:
+            self._remove(topic_id)
+            self._names[topic_id] = canonical_name
+            self._grams[topic_id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(topic_id)
+
+    def remove(self, topic_id):
+        with self._lock:
+            self._remove(topic_id)
+
+    def _remove(self, topic_id):
+        for gram in self._grams.pop(topic_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(topic_id)
+                if not posting:
+                    del self._postings[gram]
+        self._names.pop(topic_id, None)
+
+    def search(self, query, threshold, limit):
+        """[(trigram similarity, topic_id, canonical_name)] at or above threshold, best first."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        # A match shares at least ceil(threshold * |query|) trigrams, so it must
+        # appear in one of the |query| - that + 1 rarest posting lists
+        required = max(1, math.ceil(threshold * len(query_grams)))
+        with self._lock:
+            postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+            candidates = set().union(*postings[:len(query_grams) - required + 1])
+            results = []
+            for topic_id in candidates:
+                grams = self._grams[topic_id]
+                count = len(query_grams & grams)
+                similarity = count / (len(query_grams) + len(grams) - count)
+                if similarity >= threshold:
+                    results.append((similarity, topic_id, self._names[topic_id]))
+        results.sort(reverse=True)
+        return results[:limit]
+
+
+class TopicMatcher:
+    """Finds stored topics whose names are close to a query, for serving them or suggesting them."""
+
+    def __init__(self, candidate_threshold=0.2, serve_threshold=0.8, suggest_threshold=0.5,
+                 candidates=20, suggestions=5, refresh_interval=30.0):
+        self.candidate_threshold = candidate_threshold
+        self.serve_threshold = serve_threshold
+        self.suggest_threshold = suggest_threshold
+        self.candidates = candidates
+        self.suggestions = suggestions
+        self.refresh_interval = refresh_interval
+        self._index = None
+        self._synced_at = None
+        self._refreshed_at = 0.0
+        self._pg_trgm = None
+        self._load_lock = threading.Lock()
+
+    def uses_pg_trgm(self):
+        """Whether the database is Postgres with the pg_trgm extension installed (checked once)."""
+        if self._pg_trgm is None:
+            self._pg_trgm = False
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                    self._pg_trgm = cursor.fetchone() is not None
+                if not self._pg_trgm:
+                    logger.warning("pg_trgm is not installed; using the in-process trigram index")
+        return self._pg_trgm
+
+    def _ensure_index(self):
+        """Build the in-process index on first use, then pick up topics other workers added or changed."""
+        from .models import Topic
+
+        with self._load_lock:
+            if self._index is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return self._index
+            index = self._index or TrigramIndex()
+            synced_at = timezone.now()
+            topics = Topic.objects.all()
+            if self._synced_at is not None:
+                # Overlap the previous sync a little so no concurrent write is missed
+                topics = topics.filter(updated_at__gte=self._synced_at - timedelta(seconds=5))
+            for topic_id, canonical_name, has_content in topics.annotate(
+                has_content=~Q(content='')
+            ).values_list('id', 'canonical_name', 'has_content').iterator():
+                if has_content:
+                    index.add(topic_id, canonical_name)
+                else:
+                    index.remove(topic_id)
+            self._index = index
+            self._synced_at = synced_at
+            self._refreshed_at = time.monotonic()
+            return index
+
+    def topic_saved(self, topic):
+        """Index a new or changed topic; called from the Topic post_save signal."""
+        if self._index is None:
+            return
+        if topic.content:
+            self._index.add(topic.id, topic.canonical_name)
+        else:
+            self._index.remove(topic.id)
+
+    def topic_deleted(self, topic_id):
+        if self._index is not None:
+            self._index.remove(topic_id)
+
+    def _candidates(self, canonical):
+        """[(topic_id, canonical_name)] of topics sharing enough trigrams with canonical."""
+        if self.uses_pg_trgm():
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                    [str(self.candidate_threshold)],
+                )
+                cursor.execute(
+                    "SELECT id, canonical_name FROM search_app_topic "
+                    "WHERE canonical_name %% %s AND content <> '' "
+                    "ORDER BY similarity(canonical_name, %s) DESC LIMIT %s",
+                    [canonical, canonical, self.candidates],
+                )
+                return cursor.fetchall()
+        index = self._ensure_index()
+        return [(topic_id, name) for _, topic_id, name in index.search(canonical, self.candidate_threshold, self.candidates)]
+
+    def can_serve(self, topic_name, topic):
+        """
+        Whether topic may be served for topic_name: their trigram similarity
+        reaches serve_threshold and their names carry the same numbers.
+        """
+        canonical = canonicalize(topic_name)
+        return (
+            trigram_similarity(trigrams(canonical), trigrams(topic.canonical_name)) >= self.serve_threshold
+            and numbers(canonical) == numbers(topic.canonical_name)
+        )
+
+    def match(self, topic_name):
+        """
+        Return [(score, Topic)] of stored topics close to topic_name, best first,
+        limited to those scoring at least suggest_threshold.
+        """
+        from .models import Topic
+
+        canonical = canonicalize(topic_name)
+        if not canonical:
+            return []
+        scored = {}
+        for topic_id, name in self._candidates(canonical):
+            score = match_score(canonical, name)
+            if score >= self.suggest_threshold:
+                scored[topic_id] = score
+        if not scored:
+            return []
+        best = sorted(scored, key=lambda topic_id: (-scored[topic_id], topic_id))[:self.suggestions]
+        topics = Topic.objects.in_bulk(best)
+        return [(round(scored[topic_id], 3), topics[topic_id]) for topic_id in best if topic_id in topics]
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def fuzzy_matching_enabled():
+    return getattr(settings, 'FUZZY_MATCH', {}).get('enabled', False)
+
+
+def get_topic_matcher():
+    """Return the process-wide TopicMatcher, or None when fuzzy matching is disabled."""
+    global _matcher
+    if not fuzzy_matching_enabled():
+        return None
+    with _matcher_lock:
+        if _matcher is None:
+            options = {key: value for key, value in settings.FUZZY_MATCH.items() if key != 'enabled'}
+            _matcher = TopicMatcher(**options)
+        return _matcher
@@ -0,0 +1,533 @@
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import traceback
+import weakref
+from itertools import cycle
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from google import genai
+from google.genai import errors, types
+from google.genai._api_client import ApiClient, HttpResponse
+
+from . import key_scheduler
+from .hedging import get_hedger
+from .key_scheduler import KeyScheduler, key_fingerprint
+from .llm_cache import cache_key, get_llm_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _ClosingStream:
+    """
+    Streamed HTTP response whose lines close it once they are read, the
+    reader stops early or reading fails, returning its pooled connection.
+    """
+
+    def __init__(self, response):
+        self._response = response
+
+    def iter_lines(self):
+        try:
+            yield from self._response.iter_lines()
+        finally:
+            self._response.close()
+
+    async def aiter_lines(self):
+        try:
+            async for line in self._response.aiter_lines():
+                yield line
+        finally:
+            await self._response.aclose()
+
+    async def aclose(self):
+        await self._response.aclose()
+
+
+class KeepAliveApiClient(ApiClient):
+    """
+    ApiClient that keeps its HTTP connections open between requests.
+
+    The stock google-genai ApiClient opens a new requests.Session (and a new
+    httpx.AsyncClient for async calls) on every request, so every call pays
+    a fresh TCP + TLS handshake. This subclass holds one pooled session per
+    client and one httpx.AsyncClient per event loop instead.
+    """
+
+    def __init__(self, *args, pool_maxsize=10, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool_maxsize = pool_maxsize
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        # httpx.AsyncClient is bound to the loop it was first used on
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
+
+    def _request_unauthorized(self, http_request, stream=False):
+        data = None
+        if http_request.data:
+            if not isinstance(http_request.data, bytes):
+                data = json.dumps(http_request.data)
+            else:
+                data = http_request.data
+
+        response = self._session.request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data,
+            timeout=http_request.timeout,
+            stream=stream,
+        )
+        try:
+            errors.APIError.raise_for_response(response)
+        except errors.APIError:
+            response.close()
+            raise
+        return HttpResponse(response.headers, _ClosingStream(response) if stream else [response.text])
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(limits=httpx.Limits(
+                    max_connections=self._pool_maxsize,
+                    max_keepalive_connections=self._pool_maxsize,
+                ))
+                self._async_clients[loop] = client
+        return client
+
+    async def _async_request(self, http_request, stream=False):
+        if self.vertexai:
+            return await super()._async_request(http_request, stream=stream)
+
+        client = self._get_async_client()
+        data = json.dumps(http_request.data) if http_request.data else None
+        request = client.build_request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data,
+            timeout=http_request.timeout,
+        )
+        response = await client.send(request, stream=stream)
+        try:
+            if stream and response.status_code != 200:
+                # The error details are in the body, which a streamed response has not read yet
+                await response.aread()
+            errors.APIError.raise_for_response(response)
+        except BaseException:
+            # Otherwise the response keeps its pooled connection
+            await response.aclose()
+            raise
+        return HttpResponse(response.headers, _ClosingStream(response) if stream else [response.text])
+
+    async def async_request_streamed(self, http_method, path, request_dict, http_options=None):
+        http_request = self._build_request(http_method, path, request_dict, http_options)
+        response = await self._async_request(http_request=http_request, stream=True)
+
+        async def segments():
+            # HttpResponse keeps its segment iterator, a reference cycle that would
+            # otherwise leave an abandoned stream open until the garbage collector runs
+            try:
+                async for segment in response.async_segments():
+                    yield segment
+            finally:
+                if isinstance(response.response_stream, _ClosingStream):
+                    await response.response_stream.aclose()
+
+        return segments()
+
+    def close(self):
+        """Close the sync session and any async clients whose loop is still usable."""
+        self._session.close()
+        with self._async_clients_lock:
+            async_clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        for loop, client in async_clients:
+            if loop.is_closed():
+                continue
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                else:
+                    loop.run_until_complete(client.aclose())
+            except Exception as e:
+                logger.warning(f"Error closing async Gemini HTTP client: {e}")
+
+    async def aclose(self):
+        """Close the async client bound to the running loop."""
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+class PooledGeminiClient(genai.Client):
+    """genai.Client backed by a KeepAliveApiClient."""
+
+    @staticmethod
+    def _get_api_client(vertexai=None, api_key=None, credentials=None, project=None,
+                        location=None, debug_config=None, http_options=None):
+        return KeepAliveApiClient(
+            vertexai=vertexai,
+            api_key=api_key,
+            credentials=credentials,
+            project=project,
+            location=location,
+            http_options=http_options,
+            pool_maxsize=getattr(settings, 'GEMINI_HTTP_POOL_SIZE', 10),
+        )
+
+    def close(self):
+        self._api_client.close()
+
+    async def aclose(self):
+        await self._api_client.aclose()
+
+
+def gemini_http_options():
+    """HTTP options for new clients; points them at the fake backend when MODEL_BACKEND is 'fake'."""
+    if getattr(settings, 'MODEL_BACKEND', 'google') == 'fake':
+        return {'base_url': settings.FAKE_BACKEND_URL}
+    return None
+
+
+class GeminiClientPool:
+    """
+    Registry of warm Gemini clients, one per configured API key.
+
+    Clients are created lazily on first use and then shared by every thread
+    and event loop in the process. Each one reuses keep-alive connections, so
+    only the first call per key pays for connection setup.
+    """
+
+    def __init__(self, api_keys):
+        self._api_keys = [key for key in api_keys if key]
+        self._key_cycle = cycle(self._api_keys)
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def api_keys(self):
+        return list(self._api_keys)
+
+    def next_key(self):
+        """Return the next API key in round-robin order."""
+        with self._lock:
+            if not self._api_keys:
+                raise RuntimeError("No Gemini API keys are configured")
+            return next(self._key_cycle)
+
+    def get_client(self, api_key=None):
+        """Return the shared client for api_key, or for the next key in rotation."""
+        if api_key is None:
+            api_key = self.next_key()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Gemini client pool has been closed")
+            client = self._clients.get(api_key)
+            if client is None:
+                client = PooledGeminiClient(api_key=api_key, http_options=gemini_http_options())
+                self._clients[api_key] = client
+            return client
+
+    def close(self):
+        """Close every client's connections. Safe to call more than once."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._closed = True
+        for client in clients:
+            client.close()
+
+    async def aclose(self):
+        """Close the async connections owned by the running event loop."""
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            await client.aclose()
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool():
+    """Return the process-wide GeminiClientPool, creating it on first use."""
+    global _client_pool
+    with _client_pool_lock:
+        if _client_pool is None:
+            _client_pool = GeminiClientPool(settings.GEMINI_API_KEYS)
+            atexit.register(_client_pool.close)
+        return _client_pool
+
+
+def close_client_pool():
+    """Close the process-wide pool; the next get_client_pool() builds a new one."""
+    global _client_pool
+    with _client_pool_lock:
+        pool, _client_pool = _client_pool, None
+    if pool is not None:
+        atexit.unregister(pool.close)
+        pool.close()
+
+
+def classify_gemini_error(error):
+    """Map an exception from a Gemini call onto a key_scheduler error kind."""
+    if isinstance(error, errors.APIError):
+        if error.code == 429:
+            # Daily quota errors name the exhausted limit, e.g. GenerateRequestsPerDay
+            if 'PerDay' in str(error.details):
+                return key_scheduler.QUOTA
+            return key_scheduler.RATE_LIMIT
+        if error.code in (401, 403) or (error.code == 400 and 'API_KEY_INVALID' in str(error.details)):
+            return key_scheduler.AUTH
+        if error.code >= 500:
+            return key_scheduler.SERVER
+        return key_scheduler.OTHER
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError)):
+        return key_scheduler.SERVER
+    return key_scheduler.OTHER
+
+
+_key_scheduler = None
+
+
+def get_key_scheduler():
+    """Return the process-wide KeyScheduler for the configured Gemini keys."""
+    global _key_scheduler
+    with _client_pool_lock:
+        if _key_scheduler is None:
+            _key_scheduler = KeyScheduler(
+                'gemini',
+                settings.GEMINI_API_KEYS,
+                classify_gemini_error,
+                **settings.KEY_SCHEDULER.get('gemini', {}),
+            )
+        return _key_scheduler
+
+
+def scheduled_call(attempt, endpoint):
+    """
+    Run attempt(api_key) through the KeyScheduler, hedged on a second key when HEDGING is enabled.
+    """
+    scheduler = get_key_scheduler()
+    hedger = get_hedger()
+
+    def run(in_use):
+        def tracked(api_key):
+            in_use.add(key_fingerprint(api_key))
+            return attempt(api_key)
+        return scheduler.call(tracked, tokens=response_tokens, exclude=set(in_use))
+
+    if hedger is None or len(scheduler.key_ids) < 2:
+        return scheduler.call(attempt, tokens=response_tokens)
+    return hedger.call(endpoint, run)
+
+
+async def ascheduled_call(attempt, endpoint):
+    """Async counterpart of scheduled_call."""
+    scheduler = get_key_scheduler()
+    hedger = get_hedger()
+
+    async def run(in_use):
+        async def tracked(api_key):
+            in_use.add(key_fingerprint(api_key))
+            return await attempt(api_key)
+        return await scheduler.acall(tracked, tokens=response_tokens, exclude=set(in_use))
+
+    if hedger is None or len(scheduler.key_ids) < 2:
+        return await scheduler.acall(attempt, tokens=response_tokens)
+    return await hedger.acall(endpoint, run)
+
+
+def response_tokens(response):
+    usage = getattr(response, 'usage_metadata', None)
+    return (usage.total_token_count or 0) if usage else 0
+
+
+def build_generate_content_config(temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json", response_schema=None):
+    return types.GenerateContentConfig(
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k,
+        max_output_tokens=max_output_tokens,
+        response_mime_type=response_mime_type,
+        response_schema=response_schema,
+    )
+
+
+def response_complete(response):
+    """Whether the model finished normally rather than stopping at the token limit or a safety filter."""
+    candidates = response.candidates or []
+    finish_reason = candidates[0].finish_reason if candidates else None
+    return finish_reason in (None, types.FinishReason.STOP)
+
+
+def should_cache(response, cacheable=None):
+    """Only complete responses that pass the caller's cacheable(text) check are cached."""
+    if not response_complete(response):
+        return False
+    return cacheable is None or cacheable(response.text)
+
+
+def build_contents(prompt):
+    return [
+        types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=prompt)],
+        ),
+    ]
+
+
+def call_gemini_model(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json", endpoint="default", response_schema=None, cacheable=None):
+    """
+    Calls the Gemini model with the given prompt and configuration.
+
+    Responses are served from the LLM response cache when an identical call
+    was made within the TTL configured for endpoint. Otherwise the key is
+    chosen by the Gemini KeyScheduler, which retries rate-limited or failing
+    calls on another key. With HEDGING enabled a call still unanswered after
+    the endpoint's hedge delay is duplicated on another key. response_schema constrains JSON output. Truncated
+    responses, and responses rejected by cacheable(text), are returned but
+    not cached.
+    """
+    cache = get_llm_cache()
+    key = cache_key(prompt, model_name, dict(
+        temperature=temperature, top_p=top_p, top_k=top_k,
+        max_output_tokens=max_output_tokens, response_mime_type=response_mime_type,
+        response_schema=response_schema,
+    ))
+    cached = cache.get(key, endpoint)
+    if cached is not None:
+        return cached
+
+    contents = build_contents(prompt)
+    config = build_generate_content_config(temperature, top_p, top_k, max_output_tokens, response_mime_type, response_schema)
+
+    def attempt(api_key):
+        client = get_client_pool().get_client(api_key)
+        return client.models.generate_content(model=model_name, contents=contents, config=config)
+
+    try:
+        response = scheduled_call(attempt, endpoint)
+        if should_cache(response, cacheable):
+            cache.set(key, endpoint, model_name, response.text)
+        return response.text
+    except Exception as e:
+        logger.error(f"Error calling Gemini model: {e}")
+        traceback.print_exc()
+        raise e
+
+
+async def call_gemini_model_async(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json", endpoint="default", response_schema=None, cacheable=None):
+    """
+    Async counterpart of call_gemini_model; awaits the response without holding a thread.
+    """
+    cache = get_llm_cache()
+    key = cache_key(prompt, model_name, dict(
+        temperature=temperature, top_p=top_p, top_k=top_k,
+        max_output_tokens=max_output_tokens, response_mime_type=response_mime_type,
+        response_schema=response_schema,
+    ))
+    cached = await sync_to_async(cache.get)(key, endpoint)
+    if cached is not None:
+        return cached
+
+    contents = build_contents(prompt)
+    config = build_generate_content_config(temperature, top_p, top_k, max_output_tokens, response_mime_type, response_schema)
+
+    async def attempt(api_key):
+        client = get_client_pool().get_client(api_key)
+        return await client.aio.models.generate_content(model=model_name, contents=contents, config=config)
+
+    try:
+        response = await ascheduled_call(attempt, endpoint)
+        if should_cache(response, cacheable):
+            await sync_to_async(cache.set)(key, endpoint, model_name, response.text)
+        return response.text
+    except Exception as e:
+        logger.error(f"Error calling Gemini model: {e}")
+        traceback.print_exc()
+        raise e
+
+
+def stream_gemini_model(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json"):
+    """
+    Calls the Gemini model with streaming generation and yields text chunks as they arrive.
+
+    Failures before the first chunk fail over to another key; once text has
+    been yielded the error is raised to the caller.
+    """
+    contents = build_contents(prompt)
+    config = build_generate_content_config(temperature, top_p, top_k, max_output_tokens, response_mime_type)
+    scheduler = get_key_scheduler()
+
+    def open_stream(api_key):
+        # Pull the first chunk inside the scheduler so connection and quota errors fail over
+        stream = get_client_pool().get_client(api_key).models.generate_content_stream(
+            model=model_name, contents=contents, config=config,
+        )
+        return next(stream, None), stream
+
+    stream = None
+    try:
+        first, stream = scheduler.call(open_stream)
+        if first is not None:
+            if first.text:
+                yield first.text
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+    except Exception as e:
+        logger.error(f"Error streaming Gemini model: {e}")
+        traceback.print_exc()
+        raise e
+    finally:
+        # A caller that stops reading early must not leave the response holding its connection
+        if stream is not None:
+            stream.close()
+
+
+async def stream_gemini_model_async(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json"):
+    """
+    Async counterpart of stream_gemini_model.
+    """
+    contents = build_contents(prompt)
+    config = build_generate_content_config(temperature, top_p, top_k, max_output_tokens, response_mime_type)
+    scheduler = get_key_scheduler()
+
+    async def open_stream(api_key):
+        stream = await get_client_pool().get_client(api_key).aio.models.generate_content_stream(
+            model=model_name, contents=contents, config=config,
+        )
+        stream = aiter(stream)
+        return await anext(stream, None), stream
+
+    stream = None
+    try:
+        first, stream = await scheduler.acall(open_stream)
+        if first is not None:
+            if first.text:
+                yield first.text
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+    except Exception as e:
+        logger.error(f"Error streaming Gemini model: {e}")
+        traceback.print_exc()
+        raise e
+    finally:
+        if stream is not None:
+            await stream.aclose()
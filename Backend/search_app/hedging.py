@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class HedgeBudget:
+    """
+    Caps hedged calls at a fraction of primary calls.
+
+    Every primary call adds ratio tokens, up to burst, and every hedge
+    spends one. Over time an endpoint therefore issues at most ratio hedges
+    per call, so hedging cannot raise its quota use by more than that
+    fraction.
+    """
+
+    def __init__(self, ratio, burst):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+
+class Hedger:
+    """
+    Issues a duplicate of a slow model call and keeps whichever answers first.
+
+    The hedge delay of an endpoint is the given percentile of its recent
+    attempt latencies, so only calls already in the slow tail are
+    duplicated. No hedge is sent until min_samples latencies have been seen.
+    The duplicate is excluded from the key the first attempt is using,
+    and each endpoint has a HedgeBudget.
+
+    Async calls cancel the losing attempt. A sync attempt that is already
+    in flight cannot be interrupted, so its result is discarded when it
+    arrives. A sync call that cannot be hedged, because its endpoint has
+    too few samples or no budget left, runs on the calling thread; only
+    calls holding a hedge from the budget use the pool, and the hedge is
+    returned to the budget when the first attempt answers in time.
+    """
+
+    def __init__(self, percentile=95, min_samples=20, window=200, min_delay=0.5,
+                 budget=0.1, burst=5, endpoint_budgets=None, workers=16):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._budgets = defaultdict(lambda: HedgeBudget(budget, burst))
+        for endpoint, ratio in (endpoint_budgets or {}).items():
+            self._budgets[endpoint] = HedgeBudget(ratio, burst)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(int))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedge')
+
+    def _count(self, endpoint, counter):
+        with self._lock:
+            self._stats[endpoint][counter] += 1
+
+    def observe(self, endpoint, latency):
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+
+    def delay(self, endpoint):
+        """Seconds to wait before hedging a call to endpoint, or None while there are too few samples."""
+        with self._lock:
+            samples = list(self._latencies[endpoint])
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, _percentile(samples, self.percentile))
+
+    def _should_hedge(self, endpoint):
+        if self._budgets[endpoint].spend():
+            return True
+        self._count(endpoint, 'budget_denied')
+        return False
+
+    def _timed(self, endpoint, run, in_use):
+        start = time.monotonic()
+        try:
+            return run(in_use)
+        finally:
+            self.observe(endpoint, time.monotonic() - start)
+
+    def _pooled(self, endpoint, run, in_use):
+        try:
+            return self._timed(endpoint, run, in_use)
+        finally:
+            close_old_connections()
+
+    def call(self, endpoint, run):
+        """
+        Call run(in_use) and, if it is slow, a second run(in_use) alongside it.
+
+        run must add the key it uses to the in_use set and avoid keys already
+        in it. The first successful result is returned; if both attempts
+        fail, the first error is raised.
+        """
+        budget = self._budgets[endpoint]
+        budget.deposit()
+        self._count(endpoint, 'calls')
+        in_use = set()
+
+        delay = self.delay(endpoint)
+        if delay is None or not self._should_hedge(endpoint):
+            return self._timed(endpoint, run, in_use)
+
+        primary = self._pool.submit(self._pooled, endpoint, run, in_use)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            budget.refund()
+            return primary.result()
+
+        self._count(endpoint, 'hedged')
+        hedge = self._pool.submit(self._pooled, endpoint, run, in_use)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self._count(endpoint, 'hedge_won')
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def acall(self, endpoint, run):
+        """Async counterpart of call(); run(in_use) is awaited and the loser is cancelled."""
+        self._budgets[endpoint].deposit()
+        self._count(endpoint, 'calls')
+        in_use = set()
+
+        async def timed():
+            start = time.monotonic()
+            try:
+                return await run(in_use)
+            finally:
+                # Cancelled attempts still report how long they had been running
+                self.observe(endpoint, time.monotonic() - start)
+
+        primary = asyncio.ensure_future(timed())
+        delay = self.delay(endpoint)
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done or not self._should_hedge(endpoint):
+            return await primary
+
+        self._count(endpoint, 'hedged')
+        hedge = asyncio.ensure_future(timed())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count(endpoint, 'hedge_won')
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        with self._lock:
+            stats = {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+        for endpoint in stats:
+            delay = self.delay(endpoint)
+            stats[endpoint]['delay_ms'] = int(delay * 1000) if delay is not None else None
+        return stats
+
+
+_hedger = None
+_hedger_lock = threading.Lock()
+
+
+def hedging_enabled():
+    return getattr(settings, 'HEDGING', {}).get('enabled', False)
+
+
+def get_hedger():
+    """Return the process-wide Hedger, or None when hedging is disabled."""
+    global _hedger
+    if not hedging_enabled():
+        return None
+    with _hedger_lock:
+        if _hedger is None:
+            options = {key: value for key, value in settings.HEDGING.items() if key != 'enabled'}
+            _hedger = Hedger(**options)
+        return _hedger
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ApiKeyHealth, ApiKeyUsage
+
+logger = logging.getLogger(__name__)
+
+# Google resets daily API quotas at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+RATE_LIMIT = 'rate_limit'
+QUOTA = 'quota'
+SERVER = 'server'
+AUTH = 'auth'
+OTHER = 'other'
+
+# Error kinds worth retrying on a different key
+RETRYABLE = {RATE_LIMIT, QUOTA, SERVER, AUTH}
+
+
+class NoHealthyKeyError(Exception):
+    """Raised when every configured key is benched or over its daily budget."""
+
+
+def key_fingerprint(api_key):
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def quota_day(now=None):
+    return (now or timezone.now()).astimezone(QUOTA_TIMEZONE).date()
+
+
+def next_quota_reset(now=None):
+    now = now or timezone.now()
+    tomorrow = quota_day(now) + timedelta(days=1)
+    return datetime.combine(tomorrow, dt_time.min, tzinfo=QUOTA_TIMEZONE)
+
+
+class KeyScheduler:
+    """
+    Picks API keys for one provider based on usage and health shared across workers.
+
+    Each call goes to the healthy key with the fewest requests today.
+    Per-key counters live in ApiKeyUsage and circuit-breaker state in
+    ApiKeyHealth, so every worker sees the same picture:
+
+    - a 429 benches the key for an exponentially growing cooldown
+    - an exhausted daily quota benches it until the next Pacific midnight
+    - an invalid or forbidden key is benched for max_cooldown
+    - failure_threshold consecutive server errors or timeouts open the circuit
+    - other errors, such as a malformed request, say nothing about the key:
+      they are recorded but never bench it
+
+    call() and acall() retry retryable failures on a different key with
+    exponential backoff and jitter.
+    """
+
+    def __init__(self, provider, api_keys, classify_error, daily_budget=None, max_attempts=3,
+                 backoff_base=0.5, backoff_max=8.0, failure_threshold=3, cooldown=30, max_cooldown=900):
+        self.provider = provider
+        self.classify_error = classify_error
+        self.daily_budget = daily_budget
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._keys = {key_fingerprint(key): key for key in api_keys if key}
+
+    @property
+    def key_ids(self):
+        return list(self._keys)
+
+    def acquire(self, cost=1, exclude=()):
+        """
+        Return the healthy key with the fewest requests today.
+
+        Keys in exclude (fingerprints) are skipped unless nothing else is
+        available. Raises NoHealthyKeyError if every key is benched or would
+        exceed its daily budget.
+        """
+        if not self._keys:
+            raise NoHealthyKeyError(f"No {self.provider} API keys are configured")
+
+        now = timezone.now()
+        usage = {
+            row['key_id']: row
+            for row in ApiKeyUsage.objects.filter(
+                provider=self.provider, day=quota_day(now)
+            ).values('key_id', 'requests', 'units')
+        }
+        benched = set(ApiKeyHealth.objects.filter(
+            provider=self.provider, benched_until__gt=now
+        ).values_list('key_id', flat=True))
+
+        candidates = []
+        for key_id in self._keys:
+            if key_id in benched:
+                continue
+            row = usage.get(key_id, {'requests': 0, 'units': 0})
+            if self.daily_budget and row['units'] + cost > self.daily_budget:
+                continue
+            candidates.append((key_id in exclude, row['requests'], random.random(), key_id))
+
+        if not candidates:
+            raise NoHealthyKeyError(f"All {self.provider} API keys are benched or out of quota")
+        return self._keys[min(candidates)[-1]]
+
+    def _add_usage(self, key_id, **increments):
+        day = quota_day()
+        updated = ApiKeyUsage.objects.filter(provider=self.provider, key_id=key_id, day=day).update(
+            **{field: F(field) + value for field, value in increments.items()}
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                ApiKeyUsage.objects.create(provider=self.provider, key_id=key_id, day=day, **increments)
+        except IntegrityError:
+            # Another worker created today's row first
+            self._add_usage(key_id, **increments)
+
+    def record_success(self, api_key, latency, cost=1, tokens=0):
+        key_id = key_fingerprint(api_key)
+        self._add_usage(
+            key_id,
+            requests=1,
+            units=cost,
+            tokens=tokens or 0,
+            latency_ms_total=int(latency * 1000),
+        )
+        ApiKeyHealth.objects.filter(provider=self.provider, key_id=key_id).exclude(
+            consecutive_failures=0, trips=0
+        ).update(consecutive_failures=0, trips=0, benched_until=None)
+
+    def record_failure(self, api_key, kind, latency, error=None):
+        key_id = key_fingerprint(api_key)
+        self._add_usage(
+            key_id,
+            requests=1,
+            errors=1,
+            rate_limited=1 if kind == RATE_LIMIT else 0,
+            latency_ms_total=int(latency * 1000),
+        )
+
+        now = timezone.now()
+        with transaction.atomic():
+            health, _ = ApiKeyHealth.objects.select_for_update().get_or_create(
+                provider=self.provider, key_id=key_id
+            )
+            if kind != OTHER:
+                health.consecutive_failures += 1
+            health.last_error = f"{kind}: {error}"[:255]
+
+            benched_until = None
+            if kind == QUOTA:
+                benched_until = next_quota_reset(now)
+            elif kind == AUTH:
+                benched_until = now + timedelta(seconds=self.max_cooldown)
+            elif kind == RATE_LIMIT or health.consecutive_failures >= self.failure_threshold:
+                cooldown = min(self.max_cooldown, self.cooldown * 2 ** health.trips)
+                benched_until = now + timedelta(seconds=cooldown)
+
+            if benched_until:
+                health.trips += 1
+                health.benched_until = benched_until
+                logger.warning(f"Benching {self.provider} key {key_id} until {benched_until} after {kind} error")
+            health.save()
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def call(self, fn, cost=1, tokens=None, exclude=()):
+        """
+        Call fn(api_key) with failover.
+
+        cost is the quota units the call consumes; tokens(result) may return
+        the token count to record for a successful result. Keys in exclude
+        are avoided like keys that already failed.
+        """
+        tried = set(exclude)
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(self._backoff(attempt))
+            try:
+                api_key = self.acquire(cost, exclude=tried)
+            except NoHealthyKeyError:
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.add(key_fingerprint(api_key))
+
+            start = time.monotonic()
+            try:
+                result = fn(api_key)
+            except Exception as e:
+                kind = self.classify_error(e)
+                self.record_failure(api_key, kind, time.monotonic() - start, e)
+                if kind not in RETRYABLE:
+                    raise
+                last_error = e
+                continue
+
+            self.record_success(api_key, time.monotonic() - start, cost, tokens(result) if tokens else 0)
+            return result
+        raise last_error
+
+    async def acall(self, fn, cost=1, tokens=None, exclude=()):
+        """Async counterpart of call(); fn(api_key) is awaited."""
+        tried = set(exclude)
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt))
+            try:
+                api_key = await sync_to_async(self.acquire)(cost, exclude=tried)
+            except NoHealthyKeyError:
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.add(key_fingerprint(api_key))
+
+            start = time.monotonic()
+            try:
+                result = await fn(api_key)
+            except Exception as e:
+                kind = self.classify_error(e)
+                await sync_to_async(self.record_failure)(api_key, kind, time.monotonic() - start, e)
+                if kind not in RETRYABLE:
+                    raise
+                last_error = e
+                continue
+
+            await sync_to_async(self.record_success)(
+                api_key, time.monotonic() - start, cost, tokens(result) if tokens else 0
+            )
+            return result
+        raise last_error
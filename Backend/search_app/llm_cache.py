@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMResponse
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(prompt, model_name, config):
+    """Content address of a model call: sha256 over the prompt, model and generation config."""
+    payload = json.dumps({'prompt': prompt, 'model': model_name, 'config': config}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of model responses.
+
+    The first tier is a size-bounded in-process LRU. The second is the
+    LLMResponse table, shared by all workers, which is pruned back to max_rows
+    (least recently used first) every prune_every writes. Every entry carries
+    the TTL of the endpoint that produced it. Hits and misses are counted
+    per endpoint and tier.
+    """
+
+    def __init__(self, max_memory_entries=512, max_rows=10000, prune_every=50, ttl=None):
+        self.max_memory_entries = max_memory_entries
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self.ttl = ttl or {}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = defaultdict(lambda: {'memory_hits': 0, 'db_hits': 0, 'misses': 0})
+
+    def ttl_for(self, endpoint):
+        """TTL in seconds for endpoint; 0 disables caching for it."""
+        return self.ttl.get(endpoint, self.ttl.get('default', 0))
+
+    def _count(self, endpoint, counter):
+        with self._lock:
+            self._stats[endpoint][counter] += 1
+
+    def _remember(self, key, response, expires_at):
+        with self._lock:
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key, endpoint):
+        """Return the cached response for key, or None; always None for an endpoint that is not cached."""
+        if not self.ttl_for(endpoint):
+            # Keys do not include the endpoint, so another endpoint's entry could match
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    self._stats[endpoint]['memory_hits'] += 1
+                    return response
+                del self._memory[key]
+
+        now = timezone.now()
+        row = LLMResponse.objects.filter(key=key, expires_at__gt=now).values('response', 'expires_at').first()
+        if row is None:
+            self._count(endpoint, 'misses')
+            return None
+
+        LLMResponse.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=now)
+        self._remember(key, row['response'], row['expires_at'].timestamp())
+        self._count(endpoint, 'db_hits')
+        return row['response']
+
+    def set(self, key, endpoint, model_name, response):
+        ttl = self.ttl_for(endpoint)
+        if not ttl:
+            return
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=ttl)
+        self._remember(key, response, expires_at.timestamp())
+        LLMResponse.objects.update_or_create(
+            key=key,
+            defaults={
+                'endpoint': endpoint,
+                'model_name': model_name,
+                'response': response,
+                'last_used_at': now,
+                'expires_at': expires_at,
+            },
+        )
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows and evict the least recently used rows beyond max_rows."""
+        LLMResponse.objects.filter(expires_at__lte=timezone.now()).delete()
+        stale_ids = list(
+            LLMResponse.objects.order_by('-last_used_at').values_list('id', flat=True)[self.max_rows:]
+        )
+        if stale_ids:
+            LLMResponse.objects.filter(id__in=stale_ids).delete()
+            logger.info(f"Evicted {len(stale_ids)} cached LLM responses")
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'endpoints': {endpoint: dict(counts) for endpoint, counts in self._stats.items()},
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLMResponseCache configured from settings.LLM_CACHE."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(**getattr(settings, 'LLM_CACHE', {}))
+        return _cache
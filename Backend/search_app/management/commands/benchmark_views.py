@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncRequestFactory, RequestFactory
+
+from search_app import async_views, views
+from search_app.models import Topic
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent-request throughput of the sync (WSGI) and async (ASGI) "
+        "search views against a stubbed Gemini backend with fixed latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Cold topic requests per mode")
+        parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads")
+        parser.add_argument('--concurrency', type=int, default=200, help="Max in-flight requests on the ASGI loop")
+        parser.add_argument('--latency', type=float, default=0.5, help="Stubbed model latency in seconds")
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        # Smallest content parse_topic_content accepts
+        result = json.dumps({
+            'topic': 'Benchmark',
+            'Benchmark': {'SubTopics': {'Description': {'subtopics': [{'name': 'Overview'}]}}},
+        })
+
+        def stub_model(prompt, **kwargs):
+            time.sleep(latency)
+            return result
+
+        async def stub_model_async(prompt, **kwargs):
+            await asyncio.sleep(latency)
+            return result
+
+        prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+        try:
+            with mock.patch.object(views, 'call_gemini_model', stub_model):
+                wsgi = self._run_wsgi(f"{prefix}-wsgi", options['requests'], options['threads'])
+            with mock.patch.object(async_views, 'call_gemini_model_async', stub_model_async):
+                asgi = asyncio.run(self._run_asgi(f"{prefix}-asgi", options['requests'], options['concurrency']))
+        finally:
+            Topic.objects.filter(name__startswith=prefix).delete()
+
+        self.stdout.write(f"{options['requests']} cold requests, stubbed model latency {latency:.3f}s")
+        self._report(f"WSGI ({options['threads']} threads)", *wsgi)
+        self._report(f"ASGI (1 loop, {options['concurrency']} in flight)", *asgi)
+
+        failed = sum(1 for _, results in (wsgi, asgi) for _, status in results if status != 200)
+        if failed:
+            raise CommandError(f"{failed} requests did not return 200, so the timings above are not comparable")
+
+    def _run_wsgi(self, prefix, total, threads):
+        factory = RequestFactory()
+
+        def one(i):
+            request = factory.post(
+                '/gemini-search/search',
+                data=json.dumps({'search_query': f"{prefix}-{i}", 'exact': True}),
+                content_type='application/json',
+                headers={'X-Requested-With': 'XMLHttpRequest'},
+            )
+            start = time.perf_counter()
+            try:
+                response = views.search_gemini(request)
+            finally:
+                close_old_connections()
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(one, range(total)))
+        return time.perf_counter() - start, results
+
+    async def _run_asgi(self, prefix, total, concurrency):
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            request = factory.post(
+                '/gemini-search/search',
+                data=json.dumps({'search_query': f"{prefix}-{i}", 'exact': True}),
+                content_type='application/json',
+                headers={'X-Requested-With': 'XMLHttpRequest'},
+            )
+            async with semaphore:
+                start = time.perf_counter()
+                response = await async_views.search_gemini(request)
+                return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(total)))
+        return time.perf_counter() - start, results
+
+    def _report(self, label, elapsed, results):
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, status in results if status != 200)
+        self.stdout.write(
+            f"{label:<32} {len(results) / elapsed:8.1f} req/s  "
+            f"p50 {_percentile(latencies, 50) * 1000:7.0f}ms  "
+            f"p99 {_percentile(latencies, 99) * 1000:7.0f}ms  "
+            f"errors {errors}"
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search_app.models import Topic
+from search_app.subtopics import parse_subtopics
+from search_app.views import QUIZ_QUESTION_TYPES, fill_question_bank, find_topic
+
+
+class Command(BaseCommand):
+    help = (
+        "Top up the quiz question bank of one or more topics with batched model calls, "
+        "covering every subtopic and question type."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('topics', nargs='*', help="Topic names (default: every stored topic)")
+        parser.add_argument('--subtopics', nargs='+', help="Subtopics to fill (default: those listed in the topic content)")
+        parser.add_argument('--include-topic', action='store_true', help="Also fill the topic-wide bucket (empty subtopic)")
+        parser.add_argument('--types', nargs='+', default=QUIZ_QUESTION_TYPES, choices=QUIZ_QUESTION_TYPES)
+        parser.add_argument('--per-bucket', type=int, default=10, help="Questions to keep per subtopic and type")
+
+    def handle(self, *args, **options):
+        topics = Topic.objects.order_by('name')
+        if options['topics']:
+            found = {name: find_topic(name) for name in options['topics']}
+            missing = [name for name, topic in found.items() if topic is None]
+            if missing:
+                raise CommandError(f"Unknown topics: {', '.join(sorted(missing))}")
+            topics = sorted({topic.id: topic for topic in found.values()}.values(), key=lambda topic: topic.name)
+
+        for topic in topics:
+            subtopics = list(options['subtopics'] or parse_subtopics(topic.content))
+            if options['include_topic']:
+                subtopics.append('')
+            if not subtopics:
+                self.stdout.write(f"{topic.name}: no subtopics found, skipping")
+                continue
+
+            try:
+                buckets = fill_question_bank(topic, subtopics, options['types'], options['per_bucket'])
+            except Exception as e:
+                self.stderr.write(f"{topic.name}: {e}")
+                continue
+
+            generated = sum(bucket['generated'] for bucket in buckets)
+            short = [bucket for bucket in buckets if bucket['available'] < options['per_bucket']]
+            self.stdout.write(
+                f"{topic.name}: {generated} questions generated across {len(buckets)} buckets, "
+                f"{len(short)} still short of {options['per_bucket']}"
+            )
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+
+from search_app.models import Subtopic, Topic, TopicAlias
+from search_app.normalization import canonicalize
+from search_app.views import topic_candidates
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute canonical topic names and merge topics that share one. The generated, "
+        "oldest topic is kept; resources, questions and attempts of the others move to it and "
+        "their names become aliases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report the merges without changing anything")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self._refresh_canonical_names(dry_run)
+
+        duplicated = (
+            Topic.objects.exclude(canonical_name='')
+            .values('canonical_name')
+            .annotate(topics=Count('id'))
+            .filter(topics__gt=1)
+            .order_by('canonical_name')
+        )
+        merged = 0
+        for group in duplicated:
+            # topic_candidates puts generated topics first, then the oldest
+            topics = list(topic_candidates(group['canonical_name']).filter(canonical_name=group['canonical_name']))
+            keep, duplicates = topics[0], topics[1:]
+            self.stdout.write(f"{keep.name}: merging {', '.join(repr(topic.name) for topic in duplicates)}")
+            if dry_run:
+                continue
+            with transaction.atomic():
+                for duplicate in duplicates:
+                    self._merge(keep, duplicate)
+            merged += len(duplicates)
+
+        if dry_run:
+            self.stdout.write("Dry run, nothing changed")
+        else:
+            self.stdout.write(f"Merged {merged} duplicate topics")
+
+    def _refresh_canonical_names(self, dry_run):
+        """Backfill canonical names, e.g. after the normalization rules changed."""
+        stale = []
+        for topic in Topic.objects.only('id', 'name', 'canonical_name').iterator():
+            canonical_name = canonicalize(topic.name)
+            if topic.canonical_name != canonical_name:
+                topic.canonical_name = canonical_name
+                stale.append(topic)
+        if stale and not dry_run:
+            Topic.objects.bulk_update(stale, ['canonical_name'], batch_size=500)
+        self.stdout.write(f"{len(stale)} canonical names {'to update' if dry_run else 'updated'}")
+
+    def _merge(self, keep, duplicate):
+        """Move every row that references duplicate onto keep, then replace duplicate with an alias."""
+        self._merge_subtopics(keep, duplicate)
+        for relation in Topic._meta.related_objects:
+            if relation.one_to_many and relation.related_model is not Subtopic:
+                self._move_rows(relation, duplicate, keep)
+
+        name = duplicate.name
+        duplicate.delete()
+        alias, _ = TopicAlias.objects.get_or_create(name=name, defaults={'topic': keep})
+        if alias.topic_id != keep.id:
+            alias.topic = keep
+            alias.save()
+
+    def _merge_subtopics(self, keep, duplicate):
+        """Move duplicate's subtopics to keep, folding those keep also has into keep's row."""
+        existing = {subtopic.canonical_name: subtopic for subtopic in keep.subtopics.all()}
+        for subtopic in duplicate.subtopics.all():
+            target = existing.get(subtopic.canonical_name)
+            if target is None:
+                Subtopic.objects.filter(pk=subtopic.pk).update(topic=keep)
+                continue
+            for relation in Subtopic._meta.related_objects:
+                if relation.one_to_many:
+                    self._move_rows(relation, subtopic, target)
+            subtopic.delete()
+
+    def _move_rows(self, relation, source, target):
+        field = relation.field.name
+        rows = relation.related_model.objects.filter(**{field: source})
+        try:
+            with transaction.atomic():
+                rows.update(**{field: target})
+        except IntegrityError:
+            # Move rows one by one, dropping those target already has (e.g. the same resource URL)
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        relation.related_model.objects.filter(pk=row.pk).update(**{field: target})
+                except IntegrityError:
+                    row.delete()
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from search_app.models import ArticleResource, DocumentationResource, Topic, VideoResource
+from search_app.normalization import canonicalize_subtopic
+from search_app.subtopics import parse_subtopics
+from search_app.views import (
+    QUIZ_QUESTION_TYPES,
+    fill_question_bank,
+    find_topic,
+    get_or_generate_articles,
+    get_or_generate_documentation,
+    get_or_generate_topic_content,
+    get_or_generate_videos,
+    plan_question_bank_fill,
+    plan_quiz_batches,
+)
+
+RESOURCE_KINDS = ['videos', 'articles', 'documentation', 'quiz']
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing rate_per_minute calls with bursts of up to burst."""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst or max(1, rate_per_minute // 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available. A rate of 0 means unlimited."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Requests larger than the bucket are let through once it is full
+                if self.tokens >= min(tokens, self.capacity):
+                    self.tokens -= tokens
+                    return
+                wait_for = (min(tokens, self.capacity) - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class Checkpoint:
+    """Completed and failed task ids, saved atomically to a JSON file after every update."""
+
+    def __init__(self, path, reset=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = set()
+        self.failed = {}
+        if path and os.path.exists(path) and not reset:
+            with open(path) as f:
+                data = json.load(f)
+            self.completed = set(data.get('completed', []))
+
+    def is_done(self, task_id):
+        return task_id in self.completed
+
+    def mark(self, task_id, error=None):
+        with self.lock:
+            if error is None:
+                self.completed.add(task_id)
+                self.failed.pop(task_id, None)
+            else:
+                self.failed[task_id] = str(error)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'completed': sorted(self.completed), 'failed': self.failed}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate topic content, resources and a minimum quiz question pool for a list of "
+        "topics ahead of traffic, with bounded concurrency, per-provider rate limits and a "
+        "resumable checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File with one topic per line, or - for stdin")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent generation tasks")
+        parser.add_argument('--gemini-rpm', type=int, default=60, help="Gemini calls per minute (0 for unlimited)")
+        parser.add_argument('--youtube-rpm', type=int, default=30, help="YouTube searches per minute (0 for unlimited)")
+        parser.add_argument('--per-bucket', type=int, default=10, help="Quiz questions to keep per subtopic and type")
+        parser.add_argument('--types', nargs='+', default=QUIZ_QUESTION_TYPES, choices=QUIZ_QUESTION_TYPES)
+        parser.add_argument('--skip', nargs='+', default=[], choices=RESOURCE_KINDS, help="Resource kinds to leave out")
+        parser.add_argument('--checkpoint', default='pregenerate.checkpoint.json',
+                            help="Progress file used to resume an interrupted run ('' to disable)")
+        parser.add_argument('--reset', action='store_true', help="Ignore an existing checkpoint")
+
+    def handle(self, *args, **options):
+        topic_names = self._read_topics(options['input'])
+        if not topic_names:
+            raise CommandError("No topics given")
+
+        self.options = options
+        self.checkpoint = Checkpoint(options['checkpoint'], reset=options['reset'])
+        self.limits = {
+            'gemini': TokenBucket(options['gemini_rpm']),
+            'youtube': TokenBucket(options['youtube_rpm']),
+        }
+        self.stats = defaultdict(lambda: {'generated': 0, 'cached': 0, 'resumed': 0, 'failed': 0, 'latencies': []})
+        self.calls = defaultdict(int)
+        self.stats_lock = threading.Lock()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            pending = {pool.submit(self._run_task, 'topic', name, None) for name in topic_names}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for task in future.result():
+                        pending.add(pool.submit(self._run_task, *task))
+        self._report(len(topic_names), time.perf_counter() - start)
+
+    def _read_topics(self, source):
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            try:
+                with open(source) as f:
+                    lines = f.read().splitlines()
+            except OSError as e:
+                raise CommandError(f"Cannot read topics: {e}")
+        names = [line.strip() for line in lines]
+        return list(dict.fromkeys(name for name in names if name and not name.startswith('#')))
+
+    def _record(self, kind, outcome, latency=None):
+        with self.stats_lock:
+            self.stats[kind][outcome] += 1
+            if latency is not None:
+                self.stats[kind]['latencies'].append(latency)
+
+    def _run_task(self, kind, topic_name, subtopic):
+        """Run one task and return the follow-up tasks it produced."""
+        task_id = f"{kind}:{topic_name}" if subtopic is None else f"{kind}:{topic_name}:{subtopic}"
+        if kind != 'topic' and self.checkpoint.is_done(task_id):
+            self._record(kind, 'resumed')
+            return []
+
+        start = time.perf_counter()
+        try:
+            generated, follow_up = getattr(self, f"_generate_{kind}")(topic_name, subtopic)
+        except Exception as e:
+            self._record(kind, 'failed')
+            self.checkpoint.mark(task_id, e)
+            self.stderr.write(f"{task_id} failed: {e}")
+            return []
+        finally:
+            close_old_connections()
+
+        self._record(kind, 'generated' if generated else 'cached', time.perf_counter() - start if generated else None)
+        self.checkpoint.mark(task_id)
+        return follow_up
+
+    def _generate_topic(self, topic_name, subtopic):
+        # The topic task always runs so a resumed run can rebuild the subtopic list from the database
+        topic = find_topic(topic_name)
+        generated = topic is None or not topic.content
+        if generated:
+            self.limits['gemini'].acquire()
+            self._count_calls('gemini')
+        content = get_or_generate_topic_content(topic_name)
+        # Follow-up tasks use the stored name, which may be a variant of the one given
+        topic_name = find_topic(topic_name).name
+
+        # '' is the topic-wide bucket the topic page requests
+        subtopics = [''] + parse_subtopics(content)
+        follow_up = [
+            (kind, topic_name, name)
+            for kind in ('videos', 'articles', 'documentation') if kind not in self.options['skip']
+            for name in subtopics
+        ]
+        if 'quiz' not in self.options['skip']:
+            follow_up.append(('quiz', topic_name, None))
+        return generated, follow_up
+
+    def _generate_resource(self, model, provider, get_or_generate, topic_name, subtopic):
+        topic = Topic.objects.get(name=topic_name)
+        if model.objects.filter(subtopic__topic=topic, subtopic__canonical_name=canonicalize_subtopic(subtopic)).exists():
+            return False, []
+        self.limits[provider].acquire()
+        self._count_calls(provider)
+        if not get_or_generate(topic, subtopic):
+            raise RuntimeError(f"No {model._meta.verbose_name_plural} were returned")
+        return True, []
+
+    def _generate_videos(self, topic_name, subtopic):
+        return self._generate_resource(VideoResource, 'youtube', get_or_generate_videos, topic_name, subtopic)
+
+    def _generate_articles(self, topic_name, subtopic):
+        return self._generate_resource(ArticleResource, 'gemini', get_or_generate_articles, topic_name, subtopic)
+
+    def _generate_documentation(self, topic_name, subtopic):
+        return self._generate_resource(DocumentationResource, 'gemini', get_or_generate_documentation, topic_name, subtopic)
+
+    def _generate_quiz(self, topic_name, subtopic):
+        topic = Topic.objects.get(name=topic_name)
+        subtopics = [''] + parse_subtopics(topic.content)
+        buckets = plan_question_bank_fill(topic, subtopics, self.options['types'], self.options['per_bucket'])
+        if not buckets:
+            return False, []
+        calls = len(plan_quiz_batches(buckets, settings.QUIZ_BATCH_MAX_QUESTIONS))
+        self.limits['gemini'].acquire(calls)
+        self._count_calls('gemini', calls)
+        fill_question_bank(topic, subtopics, self.options['types'], self.options['per_bucket'])
+        return True, []
+
+    def _count_calls(self, provider, calls=1):
+        with self.stats_lock:
+            self.calls[provider] += calls
+
+    def _report(self, topic_count, elapsed):
+        self.stdout.write(f"{topic_count} topics in {elapsed:.1f}s")
+        for kind in ['topic'] + RESOURCE_KINDS:
+            if kind not in self.stats:
+                continue
+            stats = self.stats[kind]
+            latencies = stats['latencies']
+            timing = (
+                f"p50 {_percentile(latencies, 50):6.2f}s  p95 {_percentile(latencies, 95):6.2f}s"
+                if latencies else ''
+            )
+            self.stdout.write(
+                f"{kind:<14} generated {stats['generated']:5}  cached {stats['cached']:5}  "
+                f"resumed {stats['resumed']:5}  failed {stats['failed']:5}  {timing}"
+            )
+        generated = sum(stats['generated'] for stats in self.stats.values())
+        self.stdout.write(
+            f"{generated / elapsed:.2f} generations/s, "
+            + ", ".join(f"{calls} {provider} calls" for provider, calls in sorted(self.calls.items()))
+        )
+        if self.checkpoint.failed:
+            self.stdout.write(f"{len(self.checkpoint.failed)} tasks failed; rerun to retry them")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from search_app.models import QuizQuestion, Topic
+from search_app.search_index import index_questions, index_topic, install_search_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Reinstall the full-text index structures and re-create the search documents "
+        "of every topic, subtopic and quiz question."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Quiz questions indexed per query")
+
+    def handle(self, *args, **options):
+        install_search_schema(connection)
+
+        topics = 0
+        for topic in Topic.objects.exclude(content='').iterator():
+            index_topic(topic)
+            topics += 1
+
+        questions = 0
+        batch = []
+        for question in QuizQuestion.objects.select_related('subtopic').only('id', 'topic_id', 'subtopic__name', 'question').iterator():
+            batch.append(question)
+            if len(batch) >= options['batch_size']:
+                index_questions(batch)
+                questions += len(batch)
+                batch = []
+        index_questions(batch)
+        questions += len(batch)
+
+        self.stdout.write(f"Indexed {topics} topics and {questions} quiz questions")
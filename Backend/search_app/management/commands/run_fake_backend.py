@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from search_app.fake_backend import FakeBackendConfig, make_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local stand-in for the Gemini and YouTube APIs with configurable "
+        "latency, error rates and truncated outputs. Run the app with MODEL_BACKEND=fake to use it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--gemini-latency', type=float, default=2.0, help="Median Gemini latency in seconds")
+        parser.add_argument('--youtube-latency', type=float, default=0.3, help="Median YouTube latency in seconds")
+        parser.add_argument('--latency-sigma', type=float, default=0.5, help="Log-normal shape of the latency distribution")
+        parser.add_argument('--rate-429', type=float, default=0.0, help="Fraction of requests rejected with 429")
+        parser.add_argument('--rate-500', type=float, default=0.0, help="Fraction of requests failed with 500")
+        parser.add_argument('--truncate-rate', type=float, default=0.0, help="Fraction of model outputs cut short")
+        parser.add_argument('--stream-chunks', type=int, default=20, help="Chunks per streamed model response")
+        parser.add_argument('--subtopics', type=int, default=8, help="Subtopics per generated topic")
+        parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible runs")
+
+    def handle(self, *args, **options):
+        config = FakeBackendConfig(
+            gemini_latency=options['gemini_latency'],
+            youtube_latency=options['youtube_latency'],
+            latency_sigma=options['latency_sigma'],
+            rate_429=options['rate_429'],
+            rate_500=options['rate_500'],
+            truncate_rate=options['truncate_rate'],
+            stream_chunks=options['stream_chunks'],
+            subtopics=options['subtopics'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], config)
+        self.stdout.write(f"Fake Gemini/YouTube backend listening on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,24 @@
+from importlib import import_module
+
+from django.db import migrations
+
+create_topics = import_module('search_app.migrations.0002_create_topics')
+
+
+class Migration(migrations.Migration):
+    """
+    0002_create_topics, ordered after quiz.0005, which adds the
+    QuizAttempt.topic it reads. Databases that already applied 0002_create_topics
+    treat this as applied.
+    """
+
+    replaces = [
+        ('search_app', '0002_create_topics'),
+    ]
+
+    dependencies = [
+        ('search_app', '0001_initial'),
+        ('quiz', '0005_alter_quizattempt_topic_and_more'),
+    ]
+
+    operations = create_topics.Migration.operations
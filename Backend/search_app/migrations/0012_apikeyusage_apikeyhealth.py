@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0011_generationlock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiKeyHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('gemini', 'Gemini'), ('youtube', 'YouTube')], max_length=20)),
+                ('key_id', models.CharField(max_length=16)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('trips', models.PositiveIntegerField(default=0, help_text='Times the key has been benched since it last succeeded')),
+                ('benched_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('provider', 'key_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ApiKeyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('gemini', 'Gemini'), ('youtube', 'YouTube')], max_length=20)),
+                ('key_id', models.CharField(help_text='Fingerprint of the API key, never the key itself', max_length=16)),
+                ('day', models.DateField(help_text='Quota day in Pacific time, when Google resets daily quotas')),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0, help_text='Quota units consumed by successful requests')),
+                ('tokens', models.PositiveBigIntegerField(default=0)),
+                ('rate_limited', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('latency_ms_total', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('provider', 'key_id', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:36
+
+import hashlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    Topic = apps.get_model('search_app', 'Topic')
+    topics = list(Topic.objects.only('id', 'content'))
+    for topic in topics:
+        topic.content_hash = hashlib.sha256(topic.content.encode('utf-8')).hexdigest()
+    Topic.objects.bulk_update(topics, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0013_llmresponse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of content, used as its ETag', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from search_app.migrations._normalization import canonicalize
+
+
+def backfill_canonical_name(apps, schema_editor):
+    Topic = apps.get_model('search_app', 'Topic')
+    topics = list(Topic.objects.only('id', 'name'))
+    for topic in topics:
+        topic.canonical_name = canonicalize(topic.name)
+    Topic.objects.bulk_update(topics, ['canonical_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0014_topic_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='canonical_name',
+            field=models.CharField(blank=True, db_index=True, help_text='Normalized name shared by variants of the topic', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='TopicAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('canonical_name', models.CharField(db_index=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='search_app.topic')),
+            ],
+        ),
+        migrations.RunPython(backfill_canonical_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:52
+
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def create_trigram_index(apps, schema_editor):
+    """Install pg_trgm and a GIN trigram index on Topic.canonical_name; a no-op outside Postgres."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SAVEPOINT create_pg_trgm")
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute("RELEASE SAVEPOINT create_pg_trgm")
+    except Exception as e:
+        # Creating extensions needs elevated rights; fuzzy matching then uses the in-process index
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("ROLLBACK TO SAVEPOINT create_pg_trgm")
+        logger.warning(f"Could not install pg_trgm, skipping the trigram index: {e}")
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS search_app_topic_canonical_trgm "
+        "ON search_app_topic USING gin (canonical_name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS search_app_topic_canonical_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0015_topic_canonical_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
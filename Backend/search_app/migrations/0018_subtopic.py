@@ -0,0 +1,102 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:48
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min
+
+from search_app.migrations._normalization import canonicalize_subtopic
+
+
+def parse_subtopics(content):
+    """Subtopic names listed in a topic's generated content, or []."""
+    try:
+        data = json.loads(content)
+        topic_data = data.get(data.get('topic'))
+        if not isinstance(topic_data, dict):
+            topic_data = next(value for value in data.values() if isinstance(value, dict) and 'SubTopics' in value)
+        subtopics = topic_data['SubTopics']['Description']['subtopics']
+        return [subtopic['name'] for subtopic in subtopics if isinstance(subtopic, dict) and subtopic.get('name')]
+    except (TypeError, ValueError, KeyError, AttributeError, StopIteration):
+        return []
+
+
+RESOURCE_MODELS = ['VideoResource', 'ArticleResource', 'DocumentationResource']
+
+
+def backfill_subtopics(apps, schema_editor):
+    """Create Subtopic rows for listed and referenced subtopics, and point every row at its Subtopic."""
+    Topic = apps.get_model('search_app', 'Topic')
+    Subtopic = apps.get_model('search_app', 'Subtopic')
+    ids = {}
+
+    def subtopic_id(topic_id, name, position=None):
+        key = (topic_id, canonicalize_subtopic(name))
+        if key not in ids:
+            subtopic, _ = Subtopic.objects.get_or_create(
+                topic_id=topic_id, canonical_name=key[1], defaults={'name': name, 'position': position},
+            )
+            ids[key] = subtopic.id
+        return ids[key]
+
+    for topic in Topic.objects.only('id', 'content').iterator():
+        subtopic_id(topic.id, '')
+        for position, name in enumerate(parse_subtopics(topic.content)):
+            subtopic_id(topic.id, name[:255], position)
+
+    for model_name in RESOURCE_MODELS + ['QuizQuestion']:
+        model = apps.get_model('search_app', model_name)
+        for topic_id, name in model.objects.values_list('topic_id', 'subtopic').distinct():
+            model.objects.filter(topic_id=topic_id, subtopic=name).update(subtopic_ref_id=subtopic_id(topic_id, name))
+
+    # Resources stored under spelling variants of one subtopic may now repeat a URL
+    for model_name in RESOURCE_MODELS:
+        model = apps.get_model('search_app', model_name)
+        keep = model.objects.values('subtopic_ref', 'url').annotate(keep=Min('id')).values_list('keep', flat=True)
+        model.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0017_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Subtopic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('canonical_name', models.CharField(blank=True, help_text='Normalized name shared by spelling variants of the subtopic', max_length=255)),
+                ('position', models.PositiveIntegerField(blank=True, help_text='Position in the topic content, if listed there', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subtopics', to='search_app.topic')),
+            ],
+            options={
+                'unique_together': {('topic', 'canonical_name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='articleresource',
+            name='subtopic_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='articles', to='search_app.subtopic'),
+        ),
+        migrations.AddField(
+            model_name='documentationresource',
+            name='subtopic_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documentation', to='search_app.subtopic'),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='subtopic_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='search_app.subtopic'),
+        ),
+        migrations.AddField(
+            model_name='videoresource',
+            name='subtopic_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='videos', to='search_app.subtopic'),
+        ),
+        migrations.RunPython(backfill_subtopics, migrations.RunPython.noop),
+    ]
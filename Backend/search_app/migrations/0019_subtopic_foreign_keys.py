@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def subtopic_foreign_key(model_name, related_name):
+    """Replace the subtopic CharField of model_name with the subtopic_ref foreign key filled in by 0018."""
+    return [
+        migrations.RemoveField(model_name=model_name, name='subtopic'),
+        migrations.RenameField(model_name=model_name, old_name='subtopic_ref', new_name='subtopic'),
+        migrations.AlterField(
+            model_name=model_name,
+            name='subtopic',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name=related_name, to='search_app.subtopic'),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0018_subtopic'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(name='articleresource', unique_together=set()),
+        migrations.AlterUniqueTogether(name='documentationresource', unique_together=set()),
+        migrations.AlterUniqueTogether(name='videoresource', unique_together=set()),
+        migrations.RemoveIndex(model_name='articleresource', name='search_app__topic_i_3049d6_idx'),
+        migrations.RemoveIndex(model_name='documentationresource', name='search_app__topic_i_66771f_idx'),
+        migrations.RemoveIndex(model_name='videoresource', name='search_app__topic_i_fb4160_idx'),
+        migrations.RemoveIndex(model_name='quizquestion', name='search_app__topic_i_4051e9_idx'),
+        *subtopic_foreign_key('articleresource', 'articles'),
+        *subtopic_foreign_key('documentationresource', 'documentation'),
+        *subtopic_foreign_key('videoresource', 'videos'),
+        *subtopic_foreign_key('quizquestion', 'questions'),
+        migrations.AlterUniqueTogether(name='articleresource', unique_together={('subtopic', 'url')}),
+        migrations.AlterUniqueTogether(name='documentationresource', unique_together={('subtopic', 'url')}),
+        migrations.AlterUniqueTogether(name='videoresource', unique_together={('subtopic', 'url')}),
+        migrations.AddIndex(
+            model_name='quizquestion',
+            index=models.Index(fields=['subtopic', 'question_type'], name='search_app__subtopi_b35950_idx'),
+        ),
+    ]
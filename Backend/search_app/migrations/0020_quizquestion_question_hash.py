@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:57
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+_TRAILING_PUNCTUATION = re.compile(r"[^\w+\-=#*/<>!()]+$")
+
+
+def question_digest(question):
+    text = ' '.join(unicodedata.normalize('NFKC', question or '').casefold().split())
+    normalized = _TRAILING_PUNCTUATION.sub('', text)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def backfill_question_hash(apps, schema_editor):
+    QuizQuestion = apps.get_model('search_app', 'QuizQuestion')
+    batch = []
+    for question in QuizQuestion.objects.only('id', 'question').order_by('id').iterator(chunk_size=500):
+        question.question_hash = question_digest(question.question)
+        batch.append(question)
+        if len(batch) >= 500:
+            QuizQuestion.objects.bulk_update(batch, ['question_hash'])
+            batch = []
+    QuizQuestion.objects.bulk_update(batch, ['question_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0019_subtopic_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='question_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the normalized question text', max_length=64),
+        ),
+        migrations.RunPython(backfill_question_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:58
+
+import hashlib
+
+from django.db import migrations, models
+from django.db.models import Count
+
+MERGED_FIELDS = [
+    'topic_id', 'subtopic_id', 'question_type', 'question', 'question_hash', 'options',
+    'correct_answers', 'explanation', 'created_at', 'source',
+]
+
+
+def fold(text):
+    return ' '.join(text.casefold().split())
+
+
+def merge_duplicate_questions(apps, schema_editor):
+    """
+    Fold questions whose text repeats within a bucket, up to case and spacing,
+    into the oldest one, logging each removed row in MergedQuizQuestion.
+    """
+    QuizQuestion = apps.get_model('search_app', 'QuizQuestion')
+    MergedQuizQuestion = apps.get_model('search_app', 'MergedQuizQuestion')
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+
+    shared = list(
+        QuizQuestion.objects.values('subtopic', 'question_type', 'question_hash')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for group in shared:
+        kept = {}
+        for question in QuizQuestion.objects.filter(
+            subtopic=group['subtopic'],
+            question_type=group['question_type'],
+            question_hash=group['question_hash'],
+        ).order_by('id'):
+            text = fold(question.question)
+            if text not in kept:
+                kept[text] = question
+                continue
+            attempts = QuestionAttempt.objects.filter(question_id=question.id)
+            MergedQuizQuestion.objects.create(
+                question_id=question.id,
+                kept_id=kept[text].id,
+                attempt_ids=list(attempts.values_list('id', flat=True)),
+                **{field: getattr(question, field) for field in MERGED_FIELDS},
+            )
+            attempts.update(question_id=kept[text].id)
+            question.delete()
+
+        # The texts left differ only in trailing punctuation. The one without
+        # any (or else the oldest) keeps the hash, the others get the hash of
+        # their folded text, which no normalized text can have
+        digests = {text: hashlib.sha256(text.encode('utf-8')).hexdigest() for text in kept}
+        owner = next((text for text in kept if digests[text] == group['question_hash']), next(iter(kept)))
+        rehashed = []
+        for text, question in kept.items():
+            if text != owner:
+                question.question_hash = digests[text]
+                rehashed.append(question)
+        QuizQuestion.objects.bulk_update(rehashed, ['question_hash'])
+
+
+def restore_merged_questions(apps, schema_editor):
+    QuizQuestion = apps.get_model('search_app', 'QuizQuestion')
+    MergedQuizQuestion = apps.get_model('search_app', 'MergedQuizQuestion')
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+
+    for merged in MergedQuizQuestion.objects.order_by('id'):
+        fields = {field: getattr(merged, field) for field in MERGED_FIELDS}
+        QuizQuestion.objects.create(id=merged.question_id, **fields)
+        # auto_now_add overrode it on create
+        QuizQuestion.objects.filter(id=merged.question_id).update(created_at=merged.created_at)
+        QuestionAttempt.objects.filter(id__in=merged.attempt_ids).update(question_id=merged.question_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0020_quizquestion_question_hash'),
+        ('quiz', '0007_quizattempt_subtopic_foreign_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MergedQuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_id', models.PositiveIntegerField(help_text='Id of the removed question')),
+                ('kept_id', models.PositiveIntegerField(help_text='Id of the question it was merged into')),
+                ('attempt_ids', models.JSONField(default=list, help_text='QuestionAttempts moved onto the kept question')),
+                ('topic_id', models.PositiveIntegerField()),
+                ('subtopic_id', models.PositiveIntegerField()),
+                ('question_type', models.CharField(max_length=20)),
+                ('question', models.TextField()),
+                ('question_hash', models.CharField(max_length=64)),
+                ('options', models.JSONField()),
+                ('correct_answers', models.JSONField()),
+                ('explanation', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('source', models.CharField(max_length=20)),
+                ('merged_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(merge_duplicate_questions, restore_merged_questions),
+        migrations.RemoveIndex(
+            model_name='quizquestion',
+            name='search_app__subtopi_b35950_idx',
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='question',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='question_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the normalized question text', max_length=64),
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizquestion',
+            unique_together={('subtopic', 'question_type', 'question_hash')},
+        ),
+    ]
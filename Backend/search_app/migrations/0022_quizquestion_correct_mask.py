@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 00:02
+
+from django.db import migrations, models
+
+MAX_OPTIONS = 15
+
+
+def option_mask(indexes):
+    mask = 0
+    for index in indexes:
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < MAX_OPTIONS:
+            raise ValueError(f"Invalid option index {index!r}")
+        mask |= 1 << index
+    return mask
+
+
+def fill_correct_mask(apps, schema_editor):
+    QuizQuestion = apps.get_model('search_app', 'QuizQuestion')
+    batch = []
+    for question in QuizQuestion.objects.only('id', 'correct_answers').order_by('id').iterator(chunk_size=500):
+        try:
+            question.correct_mask = option_mask(question.correct_answers)
+        except (TypeError, ValueError):
+            # Malformed answers get an empty mask
+            question.correct_mask = 0
+        batch.append(question)
+        if len(batch) >= 500:
+            QuizQuestion.objects.bulk_update(batch, ['correct_mask'])
+            batch = []
+    QuizQuestion.objects.bulk_update(batch, ['correct_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0021_quizquestion_unique_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='correct_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='correct_answers as a bitmask'),
+        ),
+        migrations.RunPython(fill_correct_mask, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,60 @@
+import hashlib
+
 from django.db import models
+from django.utils import timezone
+
+from .normalization import canonicalize, canonicalize_subtopic, normalize_question
+
+
+def content_digest(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def question_digest(question):
+    """SHA-256 of a question's normalized text, shared by copies that differ only in case, spacing or trailing punctuation."""
+    return content_digest(normalize_question(question))
+
+
+# Option indexes are also stored as bitmasks, bit i for option i, in PositiveSmallIntegerFields
+MAX_OPTIONS = 15
+
+
+def option_mask(indexes):
+    """Bitmask of a list of option indexes; raises ValueError for an index that is not an int below MAX_OPTIONS."""
+    mask = 0
+    for index in indexes:
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < MAX_OPTIONS:
+            raise ValueError(f"Invalid option index {index!r}")
+        mask |= 1 << index
+    return mask
+
+
+def mask_options(mask):
+    """The option indexes set in mask, in ascending order."""
+    return [index for index in range(MAX_OPTIONS) if mask >> index & 1]
+
 
 class Topic(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    canonical_name = models.CharField(max_length=255, blank=True, db_index=True,
+                                      help_text="Normalized name shared by variants of the topic")
     content = models.TextField()
+    content_hash = models.CharField(max_length=64, blank=True, help_text="SHA-256 of content, used as its ETag")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        self.canonical_name = canonicalize(self.name)
+        self.content_hash = content_digest(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'name' in update_fields:
+                update_fields.add('canonical_name')
+            if 'content' in update_fields:
+                update_fields |= {'content_hash', 'updated_at'}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -12,9 +64,46 @@ class Topic(models.Model):
             models.Index(fields=['name']),
         ]
 
+class TopicAlias(models.Model):
+    """Another name for a stored topic, e.g. the name of a duplicate merged into it."""
+    name = models.CharField(max_length=255, unique=True)
+    canonical_name = models.CharField(max_length=255, db_index=True)
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='aliases')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        self.canonical_name = canonicalize(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.name} -> {self.topic.name}"
+
+class Subtopic(models.Model):
+    """
+    A subtopic of a topic, usually one listed in its content. Resources, quiz
+    questions and quiz attempts refer to it by id. The subtopic with an empty
+    name stands for the topic as a whole.
+    """
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='subtopics')
+    name = models.CharField(max_length=255, blank=True)
+    canonical_name = models.CharField(max_length=255, blank=True,
+                                      help_text="Normalized name shared by spelling variants of the subtopic")
+    position = models.PositiveIntegerField(null=True, blank=True, help_text="Position in the topic content, if listed there")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        self.canonical_name = canonicalize_subtopic(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.topic.name} / {self.name}" if self.name else self.topic.name
+
+    class Meta:
+        unique_together = ['topic', 'canonical_name']
+
 class VideoResource(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='videos')
-    subtopic = models.CharField(max_length=255, blank=True)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE, related_name='videos')
     title = models.CharField(max_length=255)
     url = models.URLField()
     duration = models.CharField(max_length=20)
@@ -23,17 +112,14 @@ class VideoResource(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [
-            models.Index(fields=['topic', 'subtopic']),
-        ]
-        unique_together = ['topic', 'subtopic', 'url']
+        unique_together = ['subtopic', 'url']
 
     def __str__(self):
         return f"{self.title} - {self.topic.name}"
 
 class ArticleResource(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='articles')
-    subtopic = models.CharField(max_length=255, blank=True)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE, related_name='articles')
     title = models.CharField(max_length=255)
     url = models.URLField()
     read_time = models.CharField(max_length=50)
@@ -41,17 +127,14 @@ class ArticleResource(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [
-            models.Index(fields=['topic', 'subtopic']),
-        ]
-        unique_together = ['topic', 'subtopic', 'url']
+        unique_together = ['subtopic', 'url']
 
     def __str__(self):
         return f"{self.title} - {self.topic.name}"
 
 class DocumentationResource(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='documentation')
-    subtopic = models.CharField(max_length=255, blank=True)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE, related_name='documentation')
     title = models.CharField(max_length=255)
     url = models.URLField()
     doc_type = models.CharField(max_length=100)
@@ -59,10 +142,7 @@ class DocumentationResource(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [
-            models.Index(fields=['topic', 'subtopic']),
-        ]
-        unique_together = ['topic', 'subtopic', 'url']
+        unique_together = ['subtopic', 'url']
 
     def __str__(self):
         return f"{self.title} - {self.topic.name}"
@@ -76,19 +156,150 @@ class QuizQuestion(models.Model):
     ]
     
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='questions')
-    subtopic = models.CharField(max_length=255, blank=True)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE, related_name='questions')
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES)
-    question = models.TextField(unique=True)
+    question = models.TextField()
+    question_hash = models.CharField(max_length=64, editable=False, help_text="SHA-256 of the normalized question text")
     options = models.JSONField()  # Store as JSON array
     correct_answers = models.JSONField()  # Store as JSON array
+    correct_mask = models.PositiveSmallIntegerField(default=0, editable=False, help_text="correct_answers as a bitmask")
     explanation = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     source = models.CharField(max_length=20, choices=[('gemini', 'Gemini'), ('manual', 'Manual')], default='gemini')
 
+    class Meta:
+        # Its index also serves lookups by subtopic and by (subtopic, question_type)
+        unique_together = ['subtopic', 'question_type', 'question_hash']
+
+    def save(self, *args, **kwargs):
+        self.question_hash = question_digest(self.question)
+        self.correct_mask = option_mask(self.correct_answers)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.question[:50]}..."
+
+class MergedQuizQuestion(models.Model):
+    """
+    A quiz question removed by migration 0021 as a copy of an older one, with
+    the attempts moved onto that question, kept so the merge can be reversed.
+    """
+    question_id = models.PositiveIntegerField(help_text="Id of the removed question")
+    kept_id = models.PositiveIntegerField(help_text="Id of the question it was merged into")
+    attempt_ids = models.JSONField(default=list, help_text="QuestionAttempts moved onto the kept question")
+    topic_id = models.PositiveIntegerField()
+    subtopic_id = models.PositiveIntegerField()
+    question_type = models.CharField(max_length=20)
+    question = models.TextField()
+    question_hash = models.CharField(max_length=64)
+    options = models.JSONField()
+    correct_answers = models.JSONField()
+    explanation = models.TextField()
+    created_at = models.DateTimeField()
+    source = models.CharField(max_length=20)
+    merged_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.question_id} -> {self.kept_id}"
+
+class SearchDocument(models.Model):
+    """
+    One searchable entry: a topic, a subtopic inside a topic's content, or a
+    quiz question. Its full-text index (a tsvector column on Postgres, an FTS5
+    table on SQLite) is created by migration and kept current by the database
+    as rows are written; see search_index.py.
+    """
+    KINDS = [
+        ('topic', 'Topic'),
+        ('subtopic', 'Subtopic'),
+        ('question', 'Quiz question'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='search_documents')
+    question = models.ForeignKey(QuizQuestion, null=True, blank=True, on_delete=models.CASCADE, related_name='search_documents')
+    subtopic = models.CharField(max_length=255, blank=True)
+    title = models.TextField()
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         indexes = [
-            models.Index(fields=['topic', 'subtopic', 'question_type']),
+            models.Index(fields=['kind']),
         ]
 
     def __str__(self):
-        return f"{self.question[:50]}..."
\ No newline at end of file
+        return f"{self.kind}: {self.title[:50]}"
+
+class GenerationLock(models.Model):
+    """Lock row used for cross-worker single-flight on databases without advisory locks."""
+    key = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=32)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} (held by {self.owner})"
+
+
+class ApiKeyUsage(models.Model):
+    """Per-key daily usage counters, shared by every worker through the database."""
+    PROVIDERS = [
+        ('gemini', 'Gemini'),
+        ('youtube', 'YouTube')
+    ]
+
+    provider = models.CharField(max_length=20, choices=PROVIDERS)
+    key_id = models.CharField(max_length=16, help_text="Fingerprint of the API key, never the key itself")
+    day = models.DateField(help_text="Quota day in Pacific time, when Google resets daily quotas")
+    requests = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0, help_text="Quota units consumed by successful requests")
+    tokens = models.PositiveBigIntegerField(default=0)
+    rate_limited = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    latency_ms_total = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['provider', 'key_id', 'day']
+
+    @property
+    def average_latency_ms(self):
+        if not self.requests:
+            return 0
+        return round(self.latency_ms_total / self.requests)
+
+    def __str__(self):
+        return f"{self.provider}:{self.key_id} on {self.day}"
+
+
+class ApiKeyHealth(models.Model):
+    """Circuit-breaker state for one API key."""
+    provider = models.CharField(max_length=20, choices=ApiKeyUsage.PROVIDERS)
+    key_id = models.CharField(max_length=16)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    trips = models.PositiveIntegerField(default=0, help_text="Times the key has been benched since it last succeeded")
+    benched_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['provider', 'key_id']
+
+    def __str__(self):
+        return f"{self.provider}:{self.key_id}"
+
+
+class LLMResponse(models.Model):
+    """Persistent tier of the LLM response cache, keyed by a hash of the prompt and config."""
+    key = models.CharField(max_length=64, unique=True)
+    endpoint = models.CharField(max_length=50, db_index=True)
+    model_name = models.CharField(max_length=100)
+    response = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.endpoint}:{self.key[:12]}"
@@ -0,0 +1,123 @@
+"""
+Canonical forms of topic names.
+
+Users type the same topic in many ways ("Python", " python ", "Python
+programming", "learn Python"). canonicalize() maps such variants onto one
+key, stored as Topic.canonical_name, so they share one generated topic
+instead of each costing a model call.
+"""
+import re
+import unicodedata
+
+# Trailing words that describe the request rather than the topic
+STOP_SUFFIXES = [
+    'tutorial',
+    'tutorials',
+    'fundamentals',
+    'for beginners',
+    'for dummies',
+    'explained',
+    'overview',
+]
+
+STOP_PREFIXES = [
+    'introduction to',
+    'intro to',
+    'basics of',
+    'fundamentals of',
+    'the',
+]
+
+# These words are also part of many topic names ("Dynamic programming",
+# "Golf course", "Style guide", "Learning rate", "What is love"), so they are
+# only stripped when what is left is the name of a programming language
+# ("Python programming", "Rust course", "learn Go")
+SUBJECT_SUFFIXES = [
+    'programming language',
+    'programming',
+    'language',
+    'course',
+    'guide',
+    'basics',
+]
+
+SUBJECT_PREFIXES = [
+    'what is',
+    'learn',
+    'learning',
+]
+
+PROGRAMMING_LANGUAGES = {
+    'assembly', 'bash', 'c', 'c#', 'c++', 'clojure', 'cobol', 'dart', 'elixir', 'elm', 'erlang',
+    'f#', 'fortran', 'go', 'golang', 'groovy', 'haskell', 'java', 'javascript', 'julia', 'kotlin',
+    'lisp', 'lua', 'matlab', 'objective c', 'ocaml', 'pascal', 'perl', 'php', 'prolog', 'python',
+    'r', 'ruby', 'rust', 'scala', 'scheme', 'shell', 'solidity', 'sql', 'swift', 'typescript',
+    'visual basic', 'zig',
+}
+
+# '+', '#' and '.' carry meaning inside names (C++, C#, Node.js, .NET)
+_SEPARATORS = re.compile(r"[^\w+#.]+")
+_EDGE_DOTS = re.compile(r"(?<!\w)\.(?!\w)|\.$")
+
+_SUFFIX_PATTERN = re.compile(r"\s+(?:%s)$" % "|".join(re.escape(suffix) for suffix in STOP_SUFFIXES))
+_PREFIX_PATTERN = re.compile(r"^(?:%s)\s+" % "|".join(re.escape(prefix) for prefix in STOP_PREFIXES))
+_SUBJECT_SUFFIX_PATTERN = re.compile(r"\s+(?:%s)$" % "|".join(re.escape(suffix) for suffix in SUBJECT_SUFFIXES))
+_SUBJECT_PREFIX_PATTERN = re.compile(r"^(?:%s)\s+" % "|".join(re.escape(prefix) for prefix in SUBJECT_PREFIXES))
+
+
+def _strip_accents(text):
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def _strip_affixes(text):
+    previous = None
+    while text != previous:
+        previous = text
+        text = _SUFFIX_PATTERN.sub('', text)
+        text = _PREFIX_PATTERN.sub('', text)
+    for pattern in (_SUBJECT_SUFFIX_PATTERN, _SUBJECT_PREFIX_PATTERN):
+        subject = pattern.sub('', text)
+        if subject != text:
+            subject = _strip_affixes(subject)
+            if subject in PROGRAMMING_LANGUAGES:
+                return subject
+    return text
+
+
+def canonicalize(name):
+    """
+    Return the canonical key for a topic name.
+
+    Case is folded, accents and punctuation are dropped, whitespace is
+    collapsed, and stop prefixes and suffixes are stripped while something
+    is left of the name; subject prefixes and suffixes only around a
+    programming language's name. Returns '' for names with no usable
+    characters.
+    """
+    text = _strip_accents(unicodedata.normalize('NFKC', name or '')).casefold()
+    text = _SEPARATORS.sub(' ', text.replace('_', ' '))
+    return _strip_affixes(' '.join(_EDGE_DOTS.sub(' ', text).split()))
+
+
+def canonicalize_subtopic(name):
+    """
+    Return the key that identifies a subtopic within its topic: the
+    canonical form of its name, or the case-folded name if that is empty.
+    The empty name, for the topic as a whole, stays ''.
+    """
+    return canonicalize(name) or ' '.join((name or '').casefold().split())
+
+
+# Operators carry meaning in questions about code or arithmetic ("2+2" and
+# "2-2", "x++" and "x--"), so only other punctuation is dropped, and only
+# from the end of the question
+_TRAILING_PUNCTUATION = re.compile(r"[^\w+\-=#*/<>!()]+$")
+
+
+def normalize_question(text):
+    """
+    Return the form of a quiz question used to recognize copies of it:
+    case-folded, with whitespace collapsed and trailing punctuation removed.
+    """
+    text = ' '.join(unicodedata.normalize('NFKC', text or '').casefold().split())
+    return _TRAILING_PUNCTUATION.sub('', text)
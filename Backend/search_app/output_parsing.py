@@ -0,0 +1,336 @@
+"""
+Parsing and repair of structured model output.
+
+Every JSON endpoint has a response schema, written in the google-genai
+Schema dict format. The schema is sent as the response_schema of the call
+and is used again here to validate what comes back. Item lists (quiz
+questions, articles, documentation) are parsed item by item. Complete items
+are salvaged from truncated or partly malformed output, and only the
+missing items are requested again.
+"""
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+class OutputParseError(ValueError):
+    """Raised when model output cannot be parsed into anything usable."""
+
+
+def _string(**extra):
+    return {'type': 'STRING', **extra}
+
+
+QUIZ_QUESTION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'type': _string(enum=['mcq', 'true-false', 'multiple-correct']),
+        'question': _string(),
+        'options': {'type': 'ARRAY', 'items': _string()},
+        'correct_answers': {'type': 'ARRAY', 'items': {'type': 'INTEGER'}},
+        'explanation': _string(),
+    },
+    'required': ['type', 'question', 'options', 'correct_answers', 'explanation'],
+}
+
+QUIZ_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'quiz': {'type': 'ARRAY', 'items': QUIZ_QUESTION_SCHEMA}},
+    'required': ['quiz'],
+}
+
+QUIZ_SET_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'set': {'type': 'INTEGER'},
+        'quiz': {'type': 'ARRAY', 'items': QUIZ_QUESTION_SCHEMA},
+    },
+    'required': ['set', 'quiz'],
+}
+
+QUIZ_BATCH_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'sets': {'type': 'ARRAY', 'items': QUIZ_SET_SCHEMA}},
+    'required': ['sets'],
+}
+
+ARTICLE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'title': _string(), 'url': _string(), 'readTime': _string()},
+    'required': ['title', 'url', 'readTime'],
+}
+
+ARTICLES_SCHEMA = {'type': 'ARRAY', 'items': ARTICLE_SCHEMA}
+
+DOCUMENTATION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'title': _string(), 'url': _string(), 'type': _string()},
+    'required': ['title', 'url', 'type'],
+}
+
+DOCUMENTATIONS_SCHEMA = {'type': 'ARRAY', 'items': DOCUMENTATION_SCHEMA}
+
+OPTION_COUNTS = {'mcq': 4, 'multiple-correct': 4, 'true-false': 2}
+
+
+def validate(value, schema, path='$'):
+    """Raise OutputParseError if value does not match schema."""
+    kind = schema['type']
+    if kind == 'OBJECT':
+        if not isinstance(value, dict):
+            raise OutputParseError(f"{path}: expected an object")
+        for name in schema.get('required', []):
+            if name not in value:
+                raise OutputParseError(f"{path}: missing {name!r}")
+        for name, property_schema in schema.get('properties', {}).items():
+            if name in value:
+                validate(value[name], property_schema, f"{path}.{name}")
+    elif kind == 'ARRAY':
+        if not isinstance(value, list):
+            raise OutputParseError(f"{path}: expected an array")
+        for i, item in enumerate(value):
+            validate(item, schema['items'], f"{path}[{i}]")
+    elif kind == 'STRING':
+        if not isinstance(value, str):
+            raise OutputParseError(f"{path}: expected a string")
+    elif kind == 'INTEGER':
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise OutputParseError(f"{path}: expected an integer")
+    elif kind == 'NUMBER':
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise OutputParseError(f"{path}: expected a number")
+    elif kind == 'BOOLEAN':
+        if not isinstance(value, bool):
+            raise OutputParseError(f"{path}: expected a boolean")
+
+    if schema.get('enum') and value not in schema['enum']:
+        raise OutputParseError(f"{path}: {value!r} is not one of {schema['enum']}")
+
+
+def check_question(question, question_type):
+    """Checks beyond the schema: the requested type, option count and answer indexes."""
+    if question['type'] != question_type:
+        raise OutputParseError(f"expected a {question_type} question, got {question['type']}")
+    if len(question['options']) != OPTION_COUNTS[question_type]:
+        raise OutputParseError(f"{question_type} questions need {OPTION_COUNTS[question_type]} options")
+    answers = question['correct_answers']
+    if not answers or any(not 0 <= answer < len(question['options']) for answer in answers):
+        raise OutputParseError(f"invalid correct_answers {answers}")
+    if question_type != 'multiple-correct' and len(answers) != 1:
+        raise OutputParseError(f"{question_type} questions need exactly one correct answer")
+
+
+def strip_code_fence(text):
+    """Remove a surrounding ```json fence, which models sometimes add despite the JSON mime type."""
+    text = text.strip()
+    match = re.match(r"^```(?:json)?\s*(.*?)\s*(?:```)?$", text, re.DOTALL)
+    return match.group(1) if match else text
+
+
+def salvage_array(text, key=None):
+    """
+    Decode the complete items of a JSON array from possibly truncated text.
+
+    The array is the top-level one when key is None, otherwise the first
+    array stored under key. Decoding stops at the first item that is cut off
+    or malformed.
+    """
+    if key is None:
+        start = text.find('[')
+    else:
+        match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text)
+        start = match.end() - 1 if match else -1
+    if start < 0:
+        return []
+
+    decoder = json.JSONDecoder()
+    items = []
+    position = start + 1
+    while True:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text) or text[position] == ']':
+            return items
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            return items
+        items.append(item)
+
+
+def parse_items(text, item_schema, key=None, check=None):
+    """
+    Parse a list of items from model output.
+
+    Returns (items, complete). Items that fail item_schema or check are
+    dropped. complete is False if the output had to be salvaged or any
+    item was dropped.
+    """
+    text = strip_code_fence(text or '')
+    complete = True
+    try:
+        data = json.loads(text)
+        items = data if key is None else data[key]
+        if not isinstance(items, list):
+            raise TypeError(f"{key or 'response'} is not an array")
+    except (ValueError, KeyError, TypeError) as e:
+        complete = False
+        items = salvage_array(text, key)
+        logger.warning(f"Salvaged {len(items)} items from malformed model output: {e}")
+
+    valid = []
+    for item in items:
+        try:
+            validate(item, item_schema)
+            if check is not None:
+                check(item)
+        except OutputParseError as e:
+            complete = False
+            logger.warning(f"Dropping invalid item from model output: {e}")
+            continue
+        valid.append(item)
+    return valid, complete
+
+
+def is_complete(text, item_schema, key=None, check=None):
+    """Whether text parses cleanly with no dropped items; used to keep partial output out of the cache."""
+    return parse_items(text, item_schema, key, check)[1]
+
+
+def with_exclusions(prompt, label, values):
+    """Append an instruction not to repeat values already generated."""
+    if not values:
+        return prompt
+    listed = "\n".join(f"- {value}" for value in values)
+    return f"{prompt}\n        Do not repeat any of these {label}:\n{listed}\n"
+
+
+class ItemRequest:
+    """
+    How to generate and parse one list of items.
+
+    build_prompt(count) builds the prompt asking for count items. Items are
+    identified by identity(item), which is used to drop duplicates and to
+    tell the model which items it already produced when the missing part is
+    requested again.
+    """
+
+    def __init__(self, build_prompt, item_schema, response_schema, key=None, check=None,
+                 identity=None, exclusion_label='items'):
+        self.build_prompt = build_prompt
+        self.item_schema = item_schema
+        self.response_schema = response_schema
+        self.key = key
+        self.check = check
+        self.identity = identity or (lambda item: json.dumps(item, sort_keys=True))
+        self.exclusion_label = exclusion_label
+
+    def prompt(self, count, items):
+        return with_exclusions(self.build_prompt(count), self.exclusion_label, [self.identity(item) for item in items])
+
+    def accept(self, text):
+        return is_complete(text, self.item_schema, self.key, self.check)
+
+    def merge(self, items, text, count):
+        """Add the new valid items in text to items, up to count in total."""
+        new_items, _ = parse_items(text, self.item_schema, self.key, self.check)
+        seen = {self.identity(item) for item in items}
+        for item in new_items:
+            identity = self.identity(item)
+            if identity not in seen and len(items) < count:
+                seen.add(identity)
+                items.append(item)
+        return items
+
+
+def generate_items(request, count, call, max_repairs=1):
+    """
+    Generate count items, salvaging partial output and requesting only what is missing.
+
+    call(prompt, response_schema, cacheable) performs the model call.
+    Raises OutputParseError if no valid item could be produced.
+    """
+    items = []
+    for attempt in range(1 + max_repairs):
+        missing = count - len(items)
+        text = call(request.prompt(missing, items), request.response_schema, request.accept)
+        request.merge(items, text, count)
+        if len(items) >= count:
+            break
+        logger.info(f"Got {len(items)} of {count} items, requesting the remaining {count - len(items)}")
+    if not items:
+        raise OutputParseError("Model output contained no valid items")
+    return items
+
+
+async def agenerate_items(request, count, call, max_repairs=1):
+    """Async counterpart of generate_items; call is awaited."""
+    items = []
+    for attempt in range(1 + max_repairs):
+        missing = count - len(items)
+        text = await call(request.prompt(missing, items), request.response_schema, request.accept)
+        request.merge(items, text, count)
+        if len(items) >= count:
+            break
+        logger.info(f"Got {len(items)} of {count} items, requesting the remaining {count - len(items)}")
+    if not items:
+        raise OutputParseError("Model output contained no valid items")
+    return items
+
+
+def parse_topic_content(text):
+    """
+    Validate generated topic content and return its JSON text without any code fence.
+
+    The topic schema has a key named after the topic itself, so it cannot be
+    expressed as a response schema; the checks here cover what the topic
+    page needs to render.
+    """
+    try:
+        data = json.loads(strip_code_fence(text or ''))
+    except ValueError as e:
+        raise OutputParseError(f"Topic content is not valid JSON: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get('topic'), str):
+        raise OutputParseError("Topic content has no 'topic' key")
+    if not any(isinstance(value, dict) and 'SubTopics' in value for value in data.values()):
+        raise OutputParseError("Topic content has no topic section")
+    return strip_code_fence(text)
+
+
+def topic_content_valid(text):
+    try:
+        parse_topic_content(text)
+    except OutputParseError:
+        return False
+    return True
+
+
+# Sets are salvaged whole; their questions are validated one by one when stored
+_LOOSE_QUIZ_SET_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'set': {'type': 'INTEGER'}, 'quiz': {'type': 'ARRAY', 'items': {'type': 'OBJECT'}}},
+    'required': ['set', 'quiz'],
+}
+
+
+def parse_quiz_batch(text):
+    """Parse a batched quiz response, salvaging the complete sets of a truncated one."""
+    sets, _ = parse_items(text, _LOOSE_QUIZ_SET_SCHEMA, key='sets')
+    return {'sets': sets}
+
+
+def quiz_batch_complete(text):
+    return is_complete(text, _LOOSE_QUIZ_SET_SCHEMA, key='sets')
+
+
+def valid_question(question, question_type):
+    """Whether a single generated question is usable as a question_type question."""
+    try:
+        validate(question, QUIZ_QUESTION_SCHEMA)
+        check_question(question, question_type)
+    except OutputParseError as e:
+        logger.warning(f"Dropping invalid question: {e}")
+        return False
+    return True
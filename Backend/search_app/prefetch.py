@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .subtopics import parse_subtopics
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_KINDS = ('videos', 'articles', 'documentation')
+
+
+class ResourcePrefetcher:
+    """
+    Generates resources for a new topic's first subtopics in the background.
+
+    Jobs run on a small thread pool, one (kind, subtopic) pair at a time, in
+    subtopic order. Prefetching ranks below interactive requests: before each
+    job a worker waits until no interactive generation is in flight in this
+    process, for at most max_defer seconds so prefetching cannot starve.
+    Prefetch jobs and interactive requests share single-flight keys, so a user
+    who opens a subtopic while it is being prefetched joins that generation
+    instead of starting another.
+    """
+
+    def __init__(self, subtopics=3, workers=2, include_topic=True, max_defer=10.0):
+        self.subtopics = subtopics
+        self.include_topic = include_topic
+        self.max_defer = max_defer
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._idle = threading.Condition()
+        self._interactive = 0
+        self._stats_lock = threading.Lock()
+        self._stats = defaultdict(int)
+
+    def _count(self, counter, value=1):
+        with self._stats_lock:
+            self._stats[counter] += value
+
+    def interactive_started(self):
+        with self._idle:
+            self._interactive += 1
+
+    def interactive_finished(self):
+        with self._idle:
+            self._interactive -= 1
+            if not self._interactive:
+                self._idle.notify_all()
+
+    def _wait_for_idle(self):
+        start = time.monotonic()
+        with self._idle:
+            self._idle.wait_for(lambda: not self._interactive, timeout=self.max_defer)
+        self._count('deferred_ms', int((time.monotonic() - start) * 1000))
+
+    def schedule(self, topic_name, content):
+        """Queue resource generation for the first subtopics listed in content."""
+        subtopics = parse_subtopics(content)[:self.subtopics]
+        if self.include_topic:
+            subtopics.insert(0, '')
+        for subtopic in subtopics:
+            for kind in RESOURCE_KINDS:
+                self._pool.submit(self._run, kind, topic_name, subtopic)
+                self._count('scheduled')
+
+    def _run(self, kind, topic_name, subtopic):
+        from . import views
+        from .models import Topic
+
+        self._wait_for_idle()
+        try:
+            topic = Topic.objects.get(name=topic_name)
+            getattr(views, f"get_or_generate_{kind}")(topic, subtopic)
+            self._count('completed')
+        except Exception as e:
+            self._count('failed')
+            logger.warning(f"Prefetching {kind} for {topic_name!r}/{subtopic!r} failed: {e}")
+        finally:
+            close_old_connections()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._idle:
+            stats['interactive_in_flight'] = self._interactive
+        stats['pending'] = stats.get('scheduled', 0) - stats.get('completed', 0) - stats.get('failed', 0)
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def prefetch_enabled():
+    return getattr(settings, 'PREFETCH', {}).get('enabled', False)
+
+
+def get_prefetcher():
+    """Return the process-wide ResourcePrefetcher, or None when prefetching is disabled."""
+    global _prefetcher
+    if not prefetch_enabled():
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            options = {key: value for key, value in settings.PREFETCH.items() if key != 'enabled'}
+            _prefetcher = ResourcePrefetcher(**options)
+        return _prefetcher
+
+
+def schedule_prefetch(topic_name, content):
+    """Prefetch resources for a freshly generated topic if PREFETCH is enabled."""
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        prefetcher.schedule(topic_name, content)
+
+
+def interactive(view):
+    """Mark a sync or async view as interactive so prefetch jobs wait for it."""
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            prefetcher = get_prefetcher()
+            if prefetcher is None:
+                return await view(request, *args, **kwargs)
+            prefetcher.interactive_started()
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                prefetcher.interactive_finished()
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        prefetcher = get_prefetcher()
+        if prefetcher is None:
+            return view(request, *args, **kwargs)
+        prefetcher.interactive_started()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            prefetcher.interactive_finished()
+    return wrapper
@@ -0,0 +1,224 @@
+"""
+Bulk ingestion of generated quiz questions.
+
+Each question is keyed by the SHA-256 of its normalized text
+(QuizQuestion.question_hash), so copies that differ only in case, spacing
+or trailing punctuation are recognized as the question already stored. A
+batch is stored in a constant number of queries whatever its size: one read
+of the target buckets' hashes, one read of question texts not seen by this
+process before, one bulk insert and one read-back of the rows.
+
+Reworded copies are caught with MinHash over word shingles. A question
+whose estimated Jaccard similarity to a question of the same (subtopic,
+question_type) bucket reaches threshold is not stored, and that question is
+used in its place. Candidates are found by locality-sensitive hashing: the
+signature is cut into bands and only questions sharing a band are compared.
+Signatures are cached by question hash, so stored questions are shingled
+once per process.
+"""
+import hashlib
+import random
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import QuizQuestion, content_digest, option_mask
+from .normalization import normalize_question
+from .question_sampler import get_question_sampler
+from .search_index import index_questions
+
+_PRIME = (1 << 61) - 1
+
+
+def shingle_hashes(normalized, size):
+    """64-bit hashes of the size-word shingles of a normalized question."""
+    words = normalized.split()
+    if len(words) <= size:
+        shingles = {normalized}
+    else:
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big') for shingle in shingles]
+
+
+class _BucketIndex:
+    """LSH index over the signatures of one bucket's questions."""
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.signatures = {}
+        self.bands = defaultdict(list)
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band in self.detector.band_keys(signature):
+            self.bands[band].append(key)
+
+    def match(self, signature):
+        """The key of the most similar indexed question at or above threshold, or None."""
+        best, best_similarity = None, self.detector.threshold
+        candidates = {key for band in self.detector.band_keys(signature) for key in self.bands.get(band, ())}
+        for key in candidates:
+            similarity = self.detector.similarity(signature, self.signatures[key])
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        return best
+
+
+class QuestionIngester:
+    """Stores generated questions in bulk, mapping exact and near duplicates onto stored questions."""
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=3, max_signatures=100000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_signatures = max_signatures
+        # Fixed seed: the permutations only have to agree within this process
+        rng = random.Random(0x5eed)
+        self._permutations = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_perm)]
+        self._signatures = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(int)
+
+    def _count(self, counter, value=1):
+        with self._lock:
+            self._stats[counter] += value
+
+    def signature(self, normalized):
+        hashes = shingle_hashes(normalized, self.shingle_size)
+        return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in self._permutations)
+
+    def band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def similarity(self, a, b):
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def _cached_signature(self, question_hash):
+        with self._lock:
+            signature = self._signatures.get(question_hash)
+            if signature is not None:
+                self._signatures.move_to_end(question_hash)
+            return signature
+
+    def _cache_signature(self, question_hash, signature):
+        with self._lock:
+            self._signatures[question_hash] = signature
+            while len(self._signatures) > self.max_signatures:
+                self._signatures.popitem(last=False)
+
+    def _load_buckets(self, buckets):
+        """
+        Return ({(subtopic_id, question_type, question_hash): id}, {bucket: _BucketIndex})
+        for the stored questions of buckets.
+        """
+        subtopic_ids = {subtopic_id for subtopic_id, _ in buckets}
+        question_types = {question_type for _, question_type in buckets}
+        rows = [
+            row for row in QuizQuestion.objects.filter(
+                subtopic_id__in=subtopic_ids, question_type__in=question_types
+            ).values_list('id', 'subtopic_id', 'question_type', 'question_hash')
+            if row[1:3] in buckets
+        ]
+        uncached = {row[0] for row in rows if self._cached_signature(row[3]) is None}
+        if uncached:
+            for question_hash, question in QuizQuestion.objects.filter(id__in=uncached).values_list('question_hash', 'question'):
+                self._cache_signature(question_hash, self.signature(normalize_question(question)))
+
+        stored = {}
+        indexes = {bucket: _BucketIndex(self) for bucket in buckets}
+        for question_id, subtopic_id, question_type, question_hash in rows:
+            stored[(subtopic_id, question_type, question_hash)] = question_id
+            signature = self._cached_signature(question_hash)
+            if signature is not None:
+                indexes[(subtopic_id, question_type)].add((subtopic_id, question_type, question_hash), signature)
+        return stored, indexes
+
+    def ingest(self, topic, items):
+        """
+        Store generated questions and return the stored QuizQuestion for each
+        (Subtopic, question_type, question dict) item, in item order.
+
+        An item that copies or rewords a stored question, or one earlier in
+        items, gets that question. None marks an item that could not be stored.
+        """
+        if not items:
+            return []
+        buckets = {(subtopic.id, question_type) for subtopic, question_type, _ in items}
+        stored, indexes = self._load_buckets(buckets)
+
+        keys = []
+        new_questions = {}
+        for subtopic, question_type, question in items:
+            normalized = normalize_question(question["question"])
+            question_hash = content_digest(normalized)
+            key = (subtopic.id, question_type, question_hash)
+            if key in stored or key in new_questions:
+                self._count('exact_duplicates')
+                keys.append(key)
+                continue
+            signature = self._cached_signature(question_hash) or self.signature(normalized)
+            near = indexes[(subtopic.id, question_type)].match(signature)
+            if near is not None:
+                self._count('near_duplicates')
+                keys.append(near)
+                continue
+            self._cache_signature(question_hash, signature)
+            indexes[(subtopic.id, question_type)].add(key, signature)
+            new_questions[key] = QuizQuestion(
+                topic=topic,
+                subtopic=subtopic,
+                question_type=question_type,
+                question=question["question"],
+                question_hash=question_hash,
+                options=question["options"],
+                correct_answers=question["correct_answers"],
+                correct_mask=option_mask(question["correct_answers"]),
+                explanation=question["explanation"],
+                source="gemini"
+            )
+            keys.append(key)
+
+        with transaction.atomic():
+            QuizQuestion.objects.bulk_create(list(new_questions.values()), ignore_conflicts=True)
+        # ignore_conflicts leaves primary keys unset, so read the rows back with the existing ones
+        wanted = Q(id__in={stored[key] for key in keys if key in stored})
+        if new_questions:
+            wanted |= Q(
+                subtopic_id__in={subtopic_id for subtopic_id, _ in buckets},
+                question_hash__in={question_hash for _, _, question_hash in new_questions},
+            )
+        rows = {
+            (row.subtopic_id, row.question_type, row.question_hash): row
+            for row in QuizQuestion.objects.filter(wanted).select_related('subtopic')
+        }
+        inserted = [rows[key] for key in new_questions if key in rows]
+        self._count('inserted', len(inserted))
+        # bulk_create skips the save signals that keep the search index and sampler current
+        index_questions(inserted)
+        get_question_sampler().questions_saved(inserted)
+        return [rows.get(key) for key in keys]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_signatures'] = len(self._signatures)
+        return stats
+
+
+_ingester = None
+_ingester_lock = threading.Lock()
+
+
+def get_question_ingester():
+    """Return the process-wide QuestionIngester."""
+    global _ingester
+    with _ingester_lock:
+        if _ingester is None:
+            _ingester = QuestionIngester(**getattr(settings, 'QUESTION_INGEST', {}))
+        return _ingester
@@ -0,0 +1,145 @@
+"""
+Random sampling of stored quiz questions without reading whole buckets.
+
+The ids of each (subtopic, question_type) bucket are kept in memory, so a
+quiz of k questions picks k ids and reads only those rows. A bucket is
+loaded with one id-only query on first use. It is extended as questions are
+stored in this process, and other workers' inserts are read every
+refresh_interval seconds, when only ids above the highest known one are
+fetched. Every reload_interval seconds the whole id list is read again, to
+catch inserts committed out of id order and deletions.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class _Bucket:
+    def __init__(self, ids):
+        self.ids = ids
+        self.known = set(ids)
+        self.max_id = max(ids, default=0)
+        self.loaded_at = self.refreshed_at = time.monotonic()
+
+    def add(self, question_id):
+        if question_id not in self.known:
+            self.known.add(question_id)
+            self.ids.append(question_id)
+            self.max_id = max(self.max_id, question_id)
+
+    def discard(self, question_ids):
+        if question_ids:
+            self.known -= set(question_ids)
+            self.ids = [question_id for question_id in self.ids if question_id in self.known]
+
+
+class QuestionSampler:
+    """Picks random stored questions of a bucket in time proportional to the number requested."""
+
+    def __init__(self, refresh_interval=30.0, reload_interval=600.0, max_buckets=10000, max_draws=4):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.max_buckets = max_buckets
+        self.max_draws = max_draws
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, subtopic_id, question_type):
+        """The bucket's id list, loaded or refreshed from the database when needed."""
+        from .models import QuizQuestion
+
+        key = (subtopic_id, question_type)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                self._buckets.move_to_end(key)
+                if time.monotonic() - bucket.refreshed_at < self.refresh_interval:
+                    return bucket
+        questions = QuizQuestion.objects.filter(subtopic_id=subtopic_id, question_type=question_type)
+        if bucket is None or time.monotonic() - bucket.loaded_at >= self.reload_interval:
+            bucket = _Bucket(list(questions.values_list('id', flat=True)))
+        else:
+            newer = list(questions.filter(id__gt=bucket.max_id).values_list('id', flat=True))
+            with self._lock:
+                for question_id in newer:
+                    bucket.add(question_id)
+                bucket.refreshed_at = time.monotonic()
+        with self._lock:
+            self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return bucket
+
+    def _pick(self, ids, k, exclude):
+        """k distinct random ids not in exclude, or None if there are not enough."""
+        if len(ids) < k:
+            return None
+        if not exclude:
+            return random.sample(ids, k)
+        # Rejection sampling stays O(k) while few of the bucket's ids are excluded
+        picked = {}
+        for _ in range(self.max_draws * k):
+            question_id = ids[random.randrange(len(ids))]
+            if question_id not in exclude:
+                picked[question_id] = None
+                if len(picked) == k:
+                    return list(picked)
+        # Mostly excluded: filter the whole bucket instead
+        available = [question_id for question_id in ids if question_id not in exclude]
+        return random.sample(available, k) if len(available) >= k else None
+
+    def size(self, subtopic_id, question_type):
+        return len(self._bucket(subtopic_id, question_type).ids)
+
+    def sample(self, subtopic_id, question_type, k, exclude=()):
+        """
+        Return k random QuizQuestions of the bucket, skipping ids in exclude,
+        or None if the bucket holds fewer than k such questions.
+        """
+        from .models import QuizQuestion
+
+        bucket = self._bucket(subtopic_id, question_type)
+        exclude = set(exclude)
+        for _ in range(2):
+            with self._lock:
+                picked = self._pick(bucket.ids, k, exclude)
+            if picked is None:
+                return None
+            questions = QuizQuestion.objects.in_bulk(picked)
+            if len(questions) == len(picked):
+                return [questions[question_id] for question_id in picked]
+            # Some questions were deleted by another worker; forget them and draw again
+            with self._lock:
+                bucket.discard([question_id for question_id in picked if question_id not in questions])
+        return None
+
+    def questions_saved(self, questions):
+        """Add stored questions to the buckets already loaded; called on insert."""
+        with self._lock:
+            for question in questions:
+                bucket = self._buckets.get((question.subtopic_id, question.question_type))
+                if bucket is not None and question.id is not None:
+                    bucket.add(question.id)
+
+    def question_deleted(self, question):
+        with self._lock:
+            bucket = self._buckets.get((question.subtopic_id, question.question_type))
+            if bucket is not None:
+                bucket.discard([question.id])
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_question_sampler():
+    """Return the process-wide QuestionSampler."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = QuestionSampler(**getattr(settings, 'QUESTION_SAMPLER', {}))
+        return _sampler
@@ -0,0 +1,150 @@
+"""
+Where a quiz comes from: the question bank or a model call.
+
+A quiz is served from the bank whenever its (subtopic, question_type)
+bucket holds enough questions the user has not answered yet. Only requests
+the bank cannot satisfy wait for generation. The bank is kept ahead of
+demand by background top-ups, scheduled while serving when:
+
+- the bucket is shallow: fewer than min_pool questions the user has not
+  answered, or
+- the bucket is stale: since its last top-up it has served max_reuse times
+  as many questions as it holds, so users keep seeing the same questions.
+
+A top-up adds top_up_size questions through fill_question_bank, which is
+single-flighted per bucket across workers and asks the model, past the LLM
+response cache, for questions the bucket does not hold yet. Buckets holding max_pool
+questions are not topped up any more.
+"""
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .question_sampler import get_question_sampler
+from .subtopics import find_subtopic
+
+logger = logging.getLogger(__name__)
+
+
+class QuizSourcingPolicy:
+    """Serves quizzes from the question bank and tops shallow or stale buckets up in the background."""
+
+    def __init__(self, min_pool=30, max_pool=300, top_up_size=20, max_reuse=5.0, workers=2, max_buckets=10000):
+        self.min_pool = min_pool
+        self.max_pool = max_pool
+        self.top_up_size = top_up_size
+        self.max_reuse = max_reuse
+        self.max_buckets = max_buckets
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quiz-top-up')
+        self._lock = threading.Lock()
+        self._served = OrderedDict()
+        self._pending = set()
+        self._stats = defaultdict(int)
+
+    def _count(self, counter, value=1):
+        with self._lock:
+            self._stats[counter] += value
+
+    def _record_served(self, key, num_questions):
+        """Questions served from a bucket since its last top-up."""
+        with self._lock:
+            served = self._served.pop(key, 0) + num_questions
+            self._served[key] = served
+            while len(self._served) > self.max_buckets:
+                self._served.popitem(last=False)
+            return served
+
+    def top_up_reason(self, pool, available, served):
+        """'shallow', 'stale' or None for a bucket of pool questions, available of them unanswered."""
+        if pool >= self.max_pool:
+            return None
+        if available < self.min_pool:
+            return 'shallow'
+        if served >= self.max_reuse * pool:
+            return 'stale'
+        return None
+
+    def serve(self, topic, subtopic_name, question_type, num_questions, user_id=None):
+        """
+        Return num_questions serialized questions from the bank, or None when
+        the bank cannot supply them and the caller has to generate.
+        """
+        from .views import seen_question_ids, serialize_question
+
+        subtopic = find_subtopic(topic, subtopic_name)
+        if subtopic is None:
+            self._count('misses')
+            return None
+        sampler = get_question_sampler()
+        key = (subtopic.id, question_type)
+        exclude = seen_question_ids(user_id, subtopic, question_type) if user_id else set()
+        pool = sampler.size(subtopic.id, question_type)
+        questions = None
+        if pool - len(exclude) >= num_questions:
+            questions = sampler.sample(subtopic.id, question_type, num_questions, exclude)
+        if questions is None:
+            self._count('misses')
+            logger.info(f"Question bank cannot supply {num_questions} {question_type} questions for {topic.name}/{subtopic_name}, generating")
+            return None
+
+        self._count('hits')
+        self._count('questions_served', len(questions))
+        reason = self.top_up_reason(pool, pool - len(exclude), self._record_served(key, len(questions)))
+        if reason:
+            self.schedule_top_up(topic, subtopic, question_type, pool, reason)
+        return [serialize_question(question) for question in questions]
+
+    def schedule_top_up(self, topic, subtopic, question_type, pool, reason):
+        """Queue generation of top_up_size more questions for a bucket, unless one is already queued."""
+        key = (subtopic.id, question_type)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            self._stats[f"top_ups_{reason}"] += 1
+        target = min(self.max_pool, pool + self.top_up_size)
+        self._pool.submit(self._top_up, topic, subtopic.name, question_type, target, key)
+
+    def _top_up(self, topic, subtopic_name, question_type, target, key):
+        from .views import fill_question_bank
+
+        try:
+            fill_question_bank(topic, [subtopic_name], [question_type], target)
+            self._count('top_ups_completed')
+            with self._lock:
+                self._served.pop(key, None)
+        except Exception as e:
+            self._count('top_ups_failed')
+            logger.warning(f"Topping up {question_type} questions for {topic.name!r}/{subtopic_name!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+            close_old_connections()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['top_ups_pending'] = len(self._pending)
+        requests = stats.get('hits', 0) + stats.get('misses', 0)
+        stats['hit_rate'] = round(stats.get('hits', 0) / requests, 3) if requests else None
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_quiz_sourcing():
+    """Return the process-wide QuizSourcingPolicy."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = QuizSourcingPolicy(**getattr(settings, 'QUIZ_SOURCING', {}))
+        return _policy
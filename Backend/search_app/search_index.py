@@ -0,0 +1,249 @@
+"""
+Full-text search and autocomplete over what has already been generated.
+
+Topics, the subtopics listed in their content, and quiz questions are
+stored as SearchDocument rows. The database keeps the text index itself:
+
+- Postgres: generated tsvector columns (english for ranked search, simple
+  for title autocomplete), each with a GIN index.
+- SQLite: an external-content FTS5 table maintained by triggers.
+- Anything else: icontains queries on the documents table.
+
+The documents are written from Topic and QuizQuestion save signals, and
+explicitly after bulk inserts, which skip signals. rebuild_search_index
+backfills them and reinstalls the index structures. On SQLite, a migration
+that alters SearchDocument rebuilds its table and drops the FTS triggers, so
+run rebuild_search_index after one.
+"""
+import logging
+import re
+
+from django.db import connection, transaction
+
+from .models import SearchDocument
+from .subtopics import parse_subtopic_entries
+
+logger = logging.getLogger(__name__)
+
+SEARCH_KINDS = ('topic', 'subtopic', 'question')
+AUTOCOMPLETE_KINDS = ('topic', 'subtopic')
+
+TABLE = 'search_app_searchdocument'
+FTS_TABLE = 'search_app_searchdocument_fts'
+
+_SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, body, content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_fts_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_fts_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_fts_update AFTER UPDATE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+_POSTGRES_SCHEMA = [
+    f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED""",
+    f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS title_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', coalesce(title, ''))
+    ) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_search_gin ON {TABLE} USING gin (search_vector)",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_title_gin ON {TABLE} USING gin (title_vector)",
+]
+
+
+def install_search_schema(schema_connection):
+    """Create the full-text index structures for the connection's database. Safe to run again."""
+    if schema_connection.vendor == 'postgresql':
+        statements = _POSTGRES_SCHEMA
+    elif schema_connection.vendor == 'sqlite':
+        statements = _SQLITE_SCHEMA
+    else:
+        return
+    with schema_connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+        if schema_connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+_backend = None
+
+
+def search_backend():
+    """'postgresql', 'fts5' or 'basic', depending on what the database provides (checked once)."""
+    global _backend
+    if _backend is None:
+        _backend = 'basic'
+        if connection.vendor == 'postgresql':
+            _backend = 'postgresql'
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = 'fts5'
+        if _backend == 'basic':
+            logger.warning("No full-text index available; search falls back to substring matching")
+    return _backend
+
+
+def topic_documents(topic):
+    """SearchDocuments for a topic and the subtopics listed in its content."""
+    subtopics = parse_subtopic_entries(topic.content)
+    documents = [SearchDocument(
+        key=f"topic:{topic.id}",
+        kind='topic',
+        topic=topic,
+        title=topic.name,
+        body=' '.join(subtopic['name'] for subtopic in subtopics),
+    )]
+    seen = set()
+    for subtopic in subtopics:
+        name = str(subtopic['name'])[:255]
+        if name in seen:
+            continue
+        seen.add(name)
+        documents.append(SearchDocument(
+            key=f"subtopic:{topic.id}:{len(seen)}",
+            kind='subtopic',
+            topic=topic,
+            subtopic=name,
+            title=name,
+            body=str(subtopic.get('description', '')),
+        ))
+    return documents
+
+
+def index_topic(topic):
+    """Replace the documents of topic and its subtopics. Placeholder topics without content are not indexed."""
+    with transaction.atomic():
+        SearchDocument.objects.filter(topic=topic, kind__in=AUTOCOMPLETE_KINDS).delete()
+        if topic.content:
+            SearchDocument.objects.bulk_create(topic_documents(topic))
+
+
+def index_questions(questions):
+    """Add or refresh the documents of saved quiz questions."""
+    documents = [
+        SearchDocument(
+            key=f"question:{question.id}",
+            kind='question',
+            topic_id=question.topic_id,
+            question_id=question.id,
+            subtopic=question.subtopic.name,
+            title=question.question,
+        )
+        for question in questions if question.id is not None
+    ]
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['subtopic', 'title', 'topic', 'updated_at'],
+        )
+
+
+def query_tokens(query, limit=10):
+    return re.findall(r"\w+", (query or '').lower())[:limit]
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _rows_to_results(rows):
+    return [
+        {
+            'kind': kind,
+            'title': title,
+            'topic': topic_name,
+            'subtopic': subtopic,
+            'question_id': question_id,
+        }
+        for kind, title, topic_name, subtopic, question_id in rows
+    ]
+
+
+_SELECT = (
+    f"SELECT d.kind, d.title, t.name, d.subtopic, d.question_id "
+    f"FROM {TABLE} d JOIN search_app_topic t ON t.id = d.topic_id "
+)
+
+# Topics rank above subtopics, subtopics above questions
+_KIND_ORDER = "CASE d.kind WHEN 'topic' THEN 0 WHEN 'subtopic' THEN 1 ELSE 2 END"
+
+
+def search(query, kinds=SEARCH_KINDS, limit=20):
+    """Ranked full-text search over the documents of the given kinds."""
+    tokens = query_tokens(query)
+    kinds = [kind for kind in kinds if kind in SEARCH_KINDS]
+    if not tokens or not kinds:
+        return []
+    backend = search_backend()
+    with connection.cursor() as cursor:
+        if backend == 'postgresql':
+            cursor.execute(
+                _SELECT + f"WHERE d.search_vector @@ websearch_to_tsquery('english', %s) "
+                f"AND d.kind IN ({_placeholders(kinds)}) "
+                f"ORDER BY ts_rank_cd(d.search_vector, websearch_to_tsquery('english', %s)) DESC, {_KIND_ORDER} "
+                f"LIMIT %s",
+                [query, *kinds, query, limit],
+            )
+        elif backend == 'fts5':
+            match = ' '.join(f'"{token}"' for token in tokens)
+            cursor.execute(
+                _SELECT + f"JOIN {FTS_TABLE} f ON f.rowid = d.id "
+                f"WHERE {FTS_TABLE} MATCH %s AND d.kind IN ({_placeholders(kinds)}) "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), {_KIND_ORDER} "
+                f"LIMIT %s",
+                [match, *kinds, limit],
+            )
+        else:
+            where = ' AND '.join(["LOWER(d.title || ' ' || d.body) LIKE %s"] * len(tokens))
+            cursor.execute(
+                _SELECT + f"WHERE {where} AND d.kind IN ({_placeholders(kinds)}) "
+                f"ORDER BY {_KIND_ORDER}, LENGTH(d.title) LIMIT %s",
+                [*(f"%{token}%" for token in tokens), *kinds, limit],
+            )
+        return _rows_to_results(cursor.fetchall())
+
+
+def autocomplete(prefix, limit=8):
+    """Topics and subtopics whose titles contain every typed word, the last one as a prefix."""
+    tokens = query_tokens(prefix)
+    if not tokens:
+        return []
+    backend = search_backend()
+    kinds = list(AUTOCOMPLETE_KINDS)
+    with connection.cursor() as cursor:
+        if backend == 'postgresql':
+            tsquery = ' & '.join(tokens[:-1] + [f"{tokens[-1]}:*"])
+            cursor.execute(
+                _SELECT + f"WHERE d.title_vector @@ to_tsquery('simple', %s) "
+                f"AND d.kind IN ({_placeholders(kinds)}) "
+                f"ORDER BY {_KIND_ORDER}, LENGTH(d.title), d.title LIMIT %s",
+                [tsquery, *kinds, limit],
+            )
+        elif backend == 'fts5':
+            match = 'title : (' + ' '.join([f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']) + ')'
+            cursor.execute(
+                _SELECT + f"JOIN {FTS_TABLE} f ON f.rowid = d.id "
+                f"WHERE {FTS_TABLE} MATCH %s AND d.kind IN ({_placeholders(kinds)}) "
+                f"ORDER BY {_KIND_ORDER}, LENGTH(d.title), d.title LIMIT %s",
+                [match, *kinds, limit],
+            )
+        else:
+            where = ' AND '.join(["LOWER(d.title) LIKE %s"] * len(tokens))
+            cursor.execute(
+                _SELECT + f"WHERE {where} AND d.kind IN ({_placeholders(kinds)}) "
+                f"ORDER BY {_KIND_ORDER}, LENGTH(d.title), d.title LIMIT %s",
+                [*(f"%{token}%" for token in tokens), *kinds, limit],
+            )
+        return _rows_to_results(cursor.fetchall())
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search_index
+from .fuzzy import get_topic_matcher
+from .question_sampler import get_question_sampler
+from .models import QuizQuestion, Topic
+from .subtopics import sync_subtopics
+
+
+@receiver(post_save, sender=Topic)
+def index_topic(sender, instance, **kwargs):
+    matcher = get_topic_matcher()
+    if matcher is not None:
+        matcher.topic_saved(instance)
+
+
+@receiver(post_delete, sender=Topic)
+def unindex_topic(sender, instance, **kwargs):
+    matcher = get_topic_matcher()
+    if matcher is not None:
+        matcher.topic_deleted(instance.id)
+
+
+@receiver(post_save, sender=Topic)
+def store_subtopics(sender, instance, raw=False, **kwargs):
+    if not raw and instance.content:
+        sync_subtopics(instance)
+
+
+@receiver(post_save, sender=Topic)
+def index_topic_documents(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search_index.index_topic(instance)
+
+
+@receiver(post_save, sender=QuizQuestion)
+def index_question_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search_index.index_questions([instance])
+
+
+@receiver(post_save, sender=QuizQuestion)
+def add_sampled_question(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        get_question_sampler().questions_saved([instance])
+
+
+@receiver(post_delete, sender=QuizQuestion)
+def remove_sampled_question(sender, instance, **kwargs):
+    get_question_sampler().question_deleted(instance)
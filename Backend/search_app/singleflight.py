@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import GenerationLock
+
+logger = logging.getLogger(__name__)
+
+
+def _lock_timeout():
+    return getattr(settings, 'GENERATION_LOCK_TIMEOUT', 120)
+
+
+def _poll_interval():
+    return getattr(settings, 'GENERATION_LOCK_POLL_INTERVAL', 0.25)
+
+
+def lock_digest(key):
+    """Fixed-width digest of a single-flight key, used as the lock identity."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def advisory_lock_id(key):
+    """Signed 64-bit id for pg_advisory_lock derived from the key."""
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key within one process.
+
+    The first caller for a key runs the function; callers that arrive while
+    it is in flight block until it finishes and receive the same result (or
+    the same exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class _LeaderCancelled(Exception):
+    """Set on a call's future when its leader is cancelled, so a follower takes over."""
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight.
+
+    Followers await the leader's future instead of blocking a thread. Calls
+    are tracked per event loop since futures cannot cross loops. If the
+    leader is cancelled, its followers are not: the first of them to resume
+    runs fn again as the new leader.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, fn):
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        future = calls.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                future = calls.get(key)
+
+        future = loop.create_future()
+        # Mark the exception as retrieved even if nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del calls[key]
+
+
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+
+def _try_acquire_row_lock(digest, owner):
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            GenerationLock.objects.create(
+                key=digest,
+                owner=owner,
+                expires_at=now + timedelta(seconds=_lock_timeout()),
+            )
+        return True
+    except IntegrityError:
+        # Steal the row if its holder died without releasing it
+        GenerationLock.objects.filter(key=digest, expires_at__lt=now).delete()
+        return False
+
+
+def _release_row_lock(digest, owner):
+    GenerationLock.objects.filter(key=digest, owner=owner).delete()
+
+
+def _try_acquire_advisory_lock(lock_id):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+        return cursor.fetchone()[0]
+
+
+def _release_advisory_lock(lock_id):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+def _lock_backend(key):
+    """Return (try_acquire, release) callables for the configured database."""
+    if connection.vendor == 'postgresql':
+        lock_id = advisory_lock_id(key)
+        return (lambda: _try_acquire_advisory_lock(lock_id),
+                lambda: _release_advisory_lock(lock_id))
+    digest = lock_digest(key)
+    owner = uuid.uuid4().hex
+    return (lambda: _try_acquire_row_lock(digest, owner),
+            lambda: _release_row_lock(digest, owner))
+
+
+@contextmanager
+def generation_lock(key):
+    """
+    Cross-worker mutex around generating the value for key.
+
+    Uses a Postgres advisory lock when available and a GenerationLock row
+    otherwise. Yields True if another worker held the lock while we waited,
+    meaning the value has probably been generated and stored by now. If the
+    lock cannot be taken within GENERATION_LOCK_TIMEOUT seconds the body runs
+    anyway rather than failing the request.
+    """
+    try_acquire, release = _lock_backend(key)
+    deadline = time.monotonic() + _lock_timeout()
+    contended = False
+    acquired = try_acquire()
+    while not acquired and time.monotonic() < deadline:
+        contended = True
+        time.sleep(_poll_interval())
+        acquired = try_acquire()
+    if not acquired:
+        logger.warning(f"Timed out waiting for generation lock on {key!r}, generating anyway")
+
+    try:
+        yield contended
+    finally:
+        if acquired:
+            release()
+
+
+@asynccontextmanager
+async def async_generation_lock(key):
+    """
+    Async counterpart of generation_lock.
+
+    The lock queries run in the request's sync thread, so the advisory lock
+    is taken and released on the same database connection, and the wait
+    between attempts is an asyncio.sleep rather than a blocked thread.
+    """
+    try_acquire, release = _lock_backend(key)
+    try_acquire = sync_to_async(try_acquire)
+    release = sync_to_async(release)
+    deadline = time.monotonic() + _lock_timeout()
+    contended = False
+    acquired = await try_acquire()
+    while not acquired and time.monotonic() < deadline:
+        contended = True
+        await asyncio.sleep(_poll_interval())
+        acquired = await try_acquire()
+    if not acquired:
+        logger.warning(f"Timed out waiting for generation lock on {key!r}, generating anyway")
+
+    try:
+        yield contended
+    finally:
+        if acquired:
+            await release()
+
+
+def single_flight(key, fn):
+    """
+    Run fn at most once per key at a time, within and across workers.
+
+    Concurrent callers in this process share the leader's result. The leader
+    runs fn while holding generation_lock(key), so fn receives the lock's
+    contended flag and should re-check the database when it is True.
+    """
+    def run():
+        with generation_lock(key) as contended:
+            return fn(contended)
+    return _flights.do(key, run)
+
+
+async def async_single_flight(key, fn):
+    """Async counterpart of single_flight; fn is a coroutine function taking the contended flag."""
+    async def run():
+        async with async_generation_lock(key) as contended:
+            return await fn(contended)
+    return await _async_flights.do(key, run)
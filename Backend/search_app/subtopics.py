@@ -0,0 +1,79 @@
+"""
+Subtopics of a topic.
+
+A topic's generated content lists its subtopics. Each gets a Subtopic row
+when the content is stored (see signals.py), and requests that name a
+subtopic find or create the row for that name or a spelling variant of it,
+so resources, quiz questions and quiz attempts can refer to it by id.
+"""
+import json
+
+from .models import Subtopic
+from .normalization import canonicalize_subtopic
+
+
+def parse_subtopic_entries(content):
+    """Return the subtopic dicts listed in a topic's generated content, or [] if it cannot be parsed."""
+    try:
+        data = json.loads(content)
+        topic_data = data.get(data.get('topic'))
+        if not isinstance(topic_data, dict):
+            # The model does not always echo the topic name exactly
+            topic_data = next(value for value in data.values() if isinstance(value, dict) and 'SubTopics' in value)
+        subtopics = topic_data['SubTopics']['Description']['subtopics']
+        return [subtopic for subtopic in subtopics if isinstance(subtopic, dict) and subtopic.get('name')]
+    except (TypeError, ValueError, KeyError, AttributeError, StopIteration):
+        return []
+
+
+def parse_subtopics(content):
+    """Return the subtopic names listed in a topic's generated content, or [] if it cannot be parsed."""
+    return [subtopic['name'] for subtopic in parse_subtopic_entries(content)]
+
+
+def get_subtopics(topic, subtopic_names):
+    """
+    Return {name: Subtopic} for subtopic_names of topic, creating the missing
+    rows. Spelling variants of one name (see canonicalize_subtopic) share a row.
+    """
+    keys = {name: canonicalize_subtopic(name) for name in subtopic_names}
+    subtopics = {
+        subtopic.canonical_name: subtopic
+        for subtopic in Subtopic.objects.filter(topic=topic, canonical_name__in=set(keys.values()))
+    }
+    missing = {key: name for name, key in keys.items() if key not in subtopics}
+    if missing:
+        Subtopic.objects.bulk_create(
+            [Subtopic(topic=topic, name=name[:255], canonical_name=key) for key, name in missing.items()],
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts leaves primary keys unset, and a concurrent request may have won
+        subtopics.update({
+            subtopic.canonical_name: subtopic
+            for subtopic in Subtopic.objects.filter(topic=topic, canonical_name__in=list(missing))
+        })
+    return {name: subtopics[key] for name, key in keys.items()}
+
+
+def get_subtopic(topic, subtopic_name):
+    """The Subtopic of topic named subtopic_name or a variant of it, created if missing. '' is the whole topic."""
+    return get_subtopics(topic, [subtopic_name])[subtopic_name]
+
+
+def find_subtopic(topic, subtopic_name):
+    """Return the stored Subtopic of topic for subtopic_name or a variant of it, or None."""
+    return Subtopic.objects.filter(topic=topic, canonical_name=canonicalize_subtopic(subtopic_name)).first()
+
+
+def sync_subtopics(topic):
+    """Create Subtopic rows for the subtopics listed in topic's content and record their order."""
+    names = [''] + [name[:255] for name in parse_subtopics(topic.content)]
+    subtopics = get_subtopics(topic, names)
+    changed = []
+    for position, name in enumerate(names[1:]):
+        subtopic = subtopics[name]
+        if subtopic.position is None:
+            subtopic.position = position
+            changed.append(subtopic)
+    if changed:
+        Subtopic.objects.bulk_update(changed, ['position'])
@@ -1,3 +1,475 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from google.genai import errors
+
+from . import async_views, key_scheduler, views
+from .fuzzy import TopicMatcher
+from .gemini_api import PooledGeminiClient
+from .hedging import Hedger
+from .models import ApiKeyHealth, ApiKeyUsage, QuizQuestion, Subtopic, Topic, TopicAlias
+from .normalization import canonicalize, normalize_question
+from .question_ingest import QuestionIngester
+from .quiz_sourcing import QuizSourcingPolicy
+from .singleflight import AsyncSingleFlight
+
+
+class _GeminiStubHandler(BaseHTTPRequestHandler):
+    """Answers every Gemini call with the server's status: an error body, or a few SSE chunks."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.server.status != 200:
+            body = json.dumps({'error': {'code': self.server.status, 'message': 'Resource exhausted', 'status': 'RESOURCE_EXHAUSTED'}}).encode()
+            self.send_response(self.server.status)
+            self.send_header('Content-Type', 'application/json')
+        else:
+            chunk = {'candidates': [{'content': {'role': 'model', 'parts': [{'text': 'chunk'}]}}]}
+            body = b''.join(b'data: ' + json.dumps(chunk).encode() + b'\r\n\r\n' for _ in range(3))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(GEMINI_HTTP_POOL_SIZE=2)
+class AsyncStreamConnectionTests(SimpleTestCase):
+    """Streamed async calls must give their pooled connection back however they end."""
+
+    calls = 5
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _GeminiStubHandler)
+        self.server.status = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = PooledGeminiClient(api_key='test-key', http_options={'base_url': f'http://127.0.0.1:{self.server.server_port}'})
+
+    def run_calls(self, call):
+        async def run():
+            try:
+                for _ in range(self.calls):
+                    await asyncio.wait_for(call(), timeout=5)
+            finally:
+                await self.client.aclose()
+        asyncio.run(run())
+
+    async def open_stream(self):
+        """The stream with its first chunk read, which sends the request."""
+        stream = aiter(await self.client.aio.models.generate_content_stream(model='gemini-test', contents='prompt'))
+        return await anext(stream), stream
+
+    def test_error_responses_release_connections(self):
+        self.server.status = 429
+        errors_seen = []
+
+        async def call():
+            with self.assertRaises(errors.ClientError) as raised:
+                await self.open_stream()
+            errors_seen.append(raised.exception)
+
+        self.run_calls(call)
+        self.assertEqual(len(errors_seen), self.calls)
+        # The body is read before the connection is released, so the error keeps its details
+        self.assertEqual(errors_seen[0].status, 'RESOURCE_EXHAUSTED')
+
+    def test_abandoned_streams_release_connections(self):
+        async def call():
+            first, stream = await self.open_stream()
+            self.assertEqual(first.text, 'chunk')
+            await stream.aclose()
+            # Closing the outer generator finalizes the ones it wraps on the next loop iterations
+            for _ in range(3):
+                await asyncio.sleep(0)
+
+        self.run_calls(call)
+
+
+VALID_TOPIC_CONTENT = json.dumps({
+    'topic': 'Rust',
+    'Rust': {'SubTopics': {'Description': {'subtopics': [{'name': 'Ownership'}]}}},
+})
+
+
+@mock.patch.object(views, 'schedule_prefetch')
+@mock.patch.object(async_views, 'schedule_prefetch')
+class StreamTopicContentTests(TestCase):
+    """Streamed topic content is stored only when it is usable topic JSON."""
+
+    def stream(self, chunks):
+        with mock.patch.object(views, 'stream_gemini_model', return_value=iter(chunks)):
+            return list(views.stream_topic_content('Rust'))
+
+    def astream(self, chunks):
+        async def generate(prompt):
+            for chunk in chunks:
+                yield chunk
+
+        async def collect():
+            return [message async for message in async_views.astream_topic_content('Rust')]
+
+        with mock.patch.object(async_views, 'stream_gemini_model_async', generate):
+            # async_to_sync keeps the ORM calls on this thread, inside the test transaction
+            return async_to_sync(collect)()
+
+    def test_invalid_content_is_an_error_and_not_stored(self, *mocks):
+        for stream in (self.stream, self.astream):
+            with self.subTest(stream=stream.__name__):
+                messages = stream(['{"topic": "Rust", ', '"truncated'])
+                self.assertTrue(messages[-1].startswith('event: error'))
+                self.assertFalse(Topic.objects.filter(name='Rust').exists())
+
+    def test_valid_content_is_stored(self, *mocks):
+        for stream in (self.stream, self.astream):
+            with self.subTest(stream=stream.__name__):
+                Topic.objects.filter(name='Rust').delete()
+                messages = stream([VALID_TOPIC_CONTENT[:20], VALID_TOPIC_CONTENT[20:]])
+                self.assertTrue(messages[-1].startswith('event: done'))
+                self.assertEqual(Topic.objects.get(name='Rust').content, VALID_TOPIC_CONTENT)
+
+
+class KeySchedulerFailureTests(TestCase):
+    """Only failures that say something about the key count toward its circuit breaker."""
+
+    def setUp(self):
+        self.scheduler = key_scheduler.KeyScheduler('gemini', ['test-key'], lambda error: key_scheduler.OTHER, failure_threshold=3)
+        self.key_id = key_scheduler.key_fingerprint('test-key')
+
+    def fail(self, kind, times):
+        for _ in range(times):
+            self.scheduler.record_failure('test-key', kind, 0.1, error='boom')
+        return ApiKeyHealth.objects.get(provider='gemini', key_id=self.key_id)
+
+    def test_other_errors_are_recorded_without_benching(self):
+        health = self.fail(key_scheduler.OTHER, 5)
+        self.assertEqual(health.consecutive_failures, 0)
+        self.assertIsNone(health.benched_until)
+        self.assertEqual(health.last_error, 'other: boom')
+        self.assertEqual(ApiKeyUsage.objects.get(provider='gemini', key_id=self.key_id).errors, 5)
+
+    def test_server_errors_open_the_circuit(self):
+        health = self.fail(key_scheduler.SERVER, 3)
+        self.assertEqual(health.consecutive_failures, 3)
+        self.assertIsNotNone(health.benched_until)
+
+
+class SyncHedgingTests(SimpleTestCase):
+    """Only calls that may be hedged leave the calling thread."""
+
+    def hedger(self, **options):
+        hedger = Hedger(min_samples=3, min_delay=0.05, **options)
+        self.addCleanup(hedger._pool.shutdown)
+        return hedger
+
+    def warm(self, hedger, latency=0.01):
+        for _ in range(3):
+            hedger.observe('quiz', latency)
+
+    def test_calls_without_samples_run_inline(self):
+        threads = []
+        result = self.hedger().call('quiz', lambda in_use: threads.append(threading.current_thread()) or 'ok')
+        self.assertEqual(result, 'ok')
+        self.assertEqual(threads, [threading.current_thread()])
+
+    def test_calls_without_budget_run_inline(self):
+        hedger = self.hedger(budget=0, burst=0)
+        self.warm(hedger)
+        threads = []
+        hedger.call('quiz', lambda in_use: threads.append(threading.current_thread()))
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(hedger.stats()['quiz']['budget_denied'], 1)
+
+    def test_fast_calls_return_their_hedge_to_the_budget(self):
+        hedger = self.hedger(budget=0, burst=1)
+        self.warm(hedger)
+        for _ in range(3):
+            self.assertEqual(hedger.call('quiz', lambda in_use: 'ok'), 'ok')
+        self.assertNotIn('budget_denied', hedger.stats()['quiz'])
+
+    def test_slow_calls_are_hedged(self):
+        hedger = self.hedger()
+        self.warm(hedger)
+        attempts = []
+
+        def run(in_use):
+            attempts.append(threading.current_thread())
+            if len(attempts) == 1:
+                time.sleep(0.5)
+                return 'primary'
+            return 'hedge'
+
+        self.assertEqual(hedger.call('quiz', run), 'hedge')
+        self.assertEqual(hedger.stats()['quiz']['hedge_won'], 1)
+        self.assertNotIn(threading.current_thread(), attempts)
+
+
+class AsyncSingleFlightTests(SimpleTestCase):
+
+    def test_followers_outlive_a_cancelled_leader(self):
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def fn():
+            runs.append(asyncio.current_task())
+            # The first run hangs until it is cancelled
+            await asyncio.sleep(60 if len(runs) == 1 else 0)
+            return len(runs)
+
+        async def scenario():
+            leader = asyncio.create_task(flight.do('key', fn))
+            followers = [asyncio.create_task(flight.do('key', fn)) for _ in range(2)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+
+        self.assertEqual(asyncio.run(scenario()), [2, 2])
+        self.assertEqual(len(runs), 2)
+
+
+class CanonicalizeTests(SimpleTestCase):
+
+    def test_request_words_are_stripped(self):
+        for name in ('Python', ' python ', 'Python programming', 'learn Python programming language tutorial'):
+            with self.subTest(name=name):
+                self.assertEqual(canonicalize(name), 'python')
+
+    def test_request_words_around_a_language_are_stripped(self):
+        for name in ('Rust course', 'learn Rust', 'What is Rust?', 'Rust basics', 'The Rust Programming Language'):
+            with self.subTest(name=name):
+                self.assertEqual(canonicalize(name), 'rust')
+
+    def test_request_words_stay_in_other_topics(self):
+        for name in (
+            'Dynamic programming', 'Natural language', 'Functional programming', 'Learning rate',
+            'Learning theory', 'Golf course', 'Style guide', 'What is love',
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(canonicalize(name), name.lower())
+
+
+# Questions that differ only in an operator
+OPERATOR_PAIRS = [
+    ('What is 2+2?', 'What is 2-2?'),
+    ('Is a == b true here?', 'Is a = b true here?'),
+    ('What does x++ return?', 'What does x-- return?'),
+    ('Who designed C++?', 'Who designed C#?'),
+]
+
+
+class NormalizeQuestionTests(SimpleTestCase):
+
+    def test_case_spacing_and_trailing_punctuation_are_folded(self):
+        for text in ('What is a closure?', 'what  is a closure', ' WHAT IS A CLOSURE ?.'):
+            with self.subTest(text=text):
+                self.assertEqual(normalize_question(text), 'what is a closure')
+
+    def test_operators_are_kept(self):
+        for a, b in OPERATOR_PAIRS:
+            with self.subTest(a=a, b=b):
+                self.assertNotEqual(normalize_question(a), normalize_question(b))
+        self.assertEqual(normalize_question('What does f() return?'), 'what does f() return')
+
+
+class QuestionIngestTests(TestCase):
+
+    def setUp(self):
+        self.topic = Topic.objects.create(name='Rust', content=VALID_TOPIC_CONTENT)
+        self.subtopic = Subtopic.objects.get(topic=self.topic, name='Ownership')
+
+    def ingest(self, *texts):
+        items = [
+            (self.subtopic, 'mcq', {'question': text, 'options': ['a', 'b'], 'correct_answers': [0], 'explanation': ''})
+            for text in texts
+        ]
+        return QuestionIngester().ingest(self.topic, items)
+
+    def test_copies_are_stored_once(self):
+        first, second = self.ingest('What is a closure?', 'what is a  closure')
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(QuizQuestion.objects.count(), 1)
+
+    def test_operator_only_differences_are_kept(self):
+        for a, b in OPERATOR_PAIRS:
+            with self.subTest(a=a, b=b):
+                first, second = self.ingest(a, b)
+                self.assertNotEqual(first.id, second.id)
+                self.assertEqual([first.question, second.question], [a, b])
+
+
+class MergeDuplicateQuestionsMigrationTests(TransactionTestCase):
+    """Migration 0021 merges only questions repeated up to case and spacing, and can be undone."""
+
+    before = [
+        ('search_app', '0019_subtopic_foreign_keys'),
+        ('quiz', '0007_quizattempt_subtopic_foreign_key'),
+        ('authentication', '0002_user_created_at_user_updated_at'),
+    ]
+    after = [('search_app', '0021_quizquestion_unique_hash')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        apps = self.migrate(self.before)
+        topic = apps.get_model('search_app', 'Topic').objects.create(name='C', content='')
+        subtopic = apps.get_model('search_app', 'Subtopic').objects.create(topic=topic, name='', canonical_name='')
+        user = apps.get_model('authentication', 'User').objects.create(name='u', email='u@example.com', password='')
+        quiz_attempt = apps.get_model('quiz', 'QuizAttempt').objects.create(
+            user=user, topic=topic, subtopic=subtopic, total_time_taken=0, score=0,
+            correct_attempts=0, incorrect_attempts=0, partial_attempts=0, unattempted=0,
+        )
+        texts = [text for pair in OPERATOR_PAIRS for text in pair]
+        texts += ['What is a closure?', 'what is a  CLOSURE?', 'What is a closure']
+        QuizQuestion = apps.get_model('search_app', 'QuizQuestion')
+        self.ids = {}
+        for text in texts:
+            question = QuizQuestion.objects.create(
+                topic=topic, subtopic=subtopic, question_type='mcq', question=text,
+                options=['a', 'b'], correct_answers=[0], explanation='',
+            )
+            self.ids[text] = question.id
+        self.attempt = apps.get_model('quiz', 'QuestionAttempt').objects.create(
+            quiz_attempt=quiz_attempt, question_id=self.ids['what is a  CLOSURE?'],
+            time_taken=1, attempted_options=[0],
+        )
+
+    def stored(self, apps):
+        return dict(apps.get_model('search_app', 'QuizQuestion').objects.values_list('question', 'id'))
+
+    def test_only_repeated_text_is_merged(self):
+        apps = self.migrate(self.after)
+        expected = dict(self.ids)
+        del expected['what is a  CLOSURE?']
+        self.assertEqual(self.stored(apps), expected)
+        attempt = apps.get_model('quiz', 'QuestionAttempt').objects.get(id=self.attempt.id)
+        self.assertEqual(attempt.question_id, self.ids['What is a closure?'])
+        merged = apps.get_model('search_app', 'MergedQuizQuestion').objects.get()
+        self.assertEqual((merged.question_id, merged.kept_id, merged.attempt_ids),
+                         (self.ids['what is a  CLOSURE?'], self.ids['What is a closure?'], [self.attempt.id]))
+
+    def test_merge_is_reversible(self):
+        self.migrate(self.after)
+        apps = self.migrate(self.before)
+        self.assertEqual(self.stored(apps), self.ids)
+        attempt = apps.get_model('quiz', 'QuestionAttempt').objects.get(id=self.attempt.id)
+        self.assertEqual(attempt.question_id, self.ids['what is a  CLOSURE?'])
+
+
+@mock.patch.object(views, 'schedule_prefetch')
+@mock.patch.object(async_views, 'schedule_prefetch')
+class PlaceholderTopicTests(TestCase):
+    """Generated content fills in a placeholder stored under another variant of the name."""
+
+    def setUp(self):
+        self.placeholder = Topic.objects.create(name='Python programming', content='')
+
+    def assert_placeholder_filled(self):
+        self.assertEqual(list(Topic.objects.values_list('id', 'content')), [(self.placeholder.id, VALID_TOPIC_CONTENT)])
+
+    def test_generated_content(self, *mocks):
+        with mock.patch.object(views, 'generate_topic_content', return_value=VALID_TOPIC_CONTENT):
+            self.assertEqual(views.get_or_generate_topic_content('python'), VALID_TOPIC_CONTENT)
+        self.assert_placeholder_filled()
+
+    def test_async_generated_content(self, *mocks):
+        async def generate(topic_name):
+            return VALID_TOPIC_CONTENT
+
+        with mock.patch.object(async_views, 'agenerate_topic_content', generate):
+            async_to_sync(async_views.aget_or_generate_topic_content)('python')
+        self.assert_placeholder_filled()
+
+    def test_streamed_content(self, *mocks):
+        with mock.patch.object(views, 'stream_gemini_model', return_value=iter([VALID_TOPIC_CONTENT])):
+            list(views.stream_topic_content('python'))
+        self.assert_placeholder_filled()
+
+
+class FuzzyTopicTests(TestCase):
+    """A fuzzy match is served only when it is the same topic, never another version of it."""
+
+    def respond(self, stored, query):
+        Topic.objects.create(name=stored, content=VALID_TOPIC_CONTENT)
+        # A new matcher indexes the topics stored now
+        with mock.patch.object(views, 'get_topic_matcher', return_value=TopicMatcher()):
+            return views.fuzzy_topic_response(query)
+
+    def test_other_versions_are_only_suggested(self):
+        pairs = [('Python 2', 'Python 3'), ('Vue 2', 'Vue 3'), ('C++11', 'C++17'), ('HTML', 'HTML5'), ('Perl', 'Pearl')]
+        for stored, query in pairs:
+            with self.subTest(stored=stored, query=query):
+                response = self.respond(stored, query)
+                self.assertEqual([match['name'] for match in response['did_you_mean']], [stored])
+                self.assertFalse(TopicAlias.objects.exists())
+                Topic.objects.all().delete()
+
+    def test_close_names_are_served(self):
+        response = self.respond('JavaScript Promises', 'Javascript promise')
+        self.assertEqual(response['matched_topic'], 'JavaScript Promises')
+        self.assertEqual(TopicAlias.objects.get().name, 'Javascript promise')
+
+
+class QuizTopUpTests(TestCase):
+    """Each top-up adds questions, even when the previous one asked for the same bucket."""
+
+    def setUp(self):
+        self.topic = Topic.objects.create(name='Rust', content=VALID_TOPIC_CONTENT)
+        self.questions = itertools.count(1)
+        # The model, not the LLM cache in front of it, is faked: every call writes new questions
+        client = SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content))
+        for target, value in (
+            ('search_app.gemini_api.get_client_pool', lambda: SimpleNamespace(get_client=lambda api_key: client)),
+            ('search_app.gemini_api.scheduled_call', lambda attempt, endpoint: attempt('test-key')),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def generate_content(self, model, contents, config):
+        prompt = contents[0].parts[0].text
+        sets = [
+            {'set': int(number), 'quiz': [self.question(question_type) for _ in range(int(count))]}
+            for number, count, question_type in re.findall(r"- set (\d+): (\d+) questions of type '([\w-]+)'", prompt)
+        ]
+        return SimpleNamespace(text=json.dumps({'sets': sets}), candidates=[], usage_metadata=None)
+
+    def question(self, question_type):
+        n = next(self.questions)
+        return {
+            'type': question_type,
+            'question': f"Which of the {n * 7919} borrow checker rules applies to case {n}?",
+            'options': ['a', 'b', 'c', 'd'],
+            'correct_answers': [0],
+            'explanation': 'Because.',
+        }
+
+    def test_consecutive_top_ups_grow_the_bucket(self):
+        policy = QuizSourcingPolicy(top_up_size=5)
+        self.addCleanup(policy.shutdown)
+        sizes = []
+        for _ in range(2):
+            pool = QuizQuestion.objects.filter(topic=self.topic, question_type='mcq').count()
+            policy._top_up(self.topic, 'Ownership', 'mcq', pool + policy.top_up_size, ('Ownership', 'mcq'))
+            sizes.append(QuizQuestion.objects.filter(topic=self.topic, question_type='mcq').count())
+        self.assertEqual(sizes, [5, 10])
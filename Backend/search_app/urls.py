@@ -1,11 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# Generation views are served by their async versions when running under ASGI
+generation_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('search', views.search_gemini, name='search_gemini'),
-    path('generate-quiz', views.generate_quiz, name='generate_quiz'),
+    path('search', generation_views.search_gemini, name='search_gemini'),
+    path('search-stream', generation_views.search_gemini_stream, name='search_gemini_stream'),
+    path('generate-quiz', generation_views.generate_quiz, name='generate_quiz'),
+    path('generate-quiz-batch', generation_views.generate_quiz_batch, name='generate_quiz_batch'),
     
-    path('generate-topic-videos', views.generate_videos_for_topic, name='generate_topic_videos'),
-    path('generate-topic-articles', views.generate_articles_for_topic, name='generate_topic_articles'),
-    path('generate-topic-documentation', views.generate_documentation_for_topic, name='generate_topic_documentation'),
+    path('generate-topic-resources', generation_views.generate_resources_for_topic, name='generate_topic_resources'),
+    path('generate-topic-videos', generation_views.generate_videos_for_topic, name='generate_topic_videos'),
+    path('generate-topic-articles', generation_views.generate_articles_for_topic, name='generate_topic_articles'),
+    path('generate-topic-documentation', generation_views.generate_documentation_for_topic, name='generate_topic_documentation'),
+
+    # Cacheable GET reads of stored content (ETag / Last-Modified / 304)
+    path('topic', views.topic_content, name='topic_content'),
+    path('topic-resources', views.topic_resources, name='topic_resources'),
+
+    # Full-text search over generated content
+    path('search-content', views.search_content, name='search_content'),
+    path('autocomplete', views.autocomplete_topics, name='autocomplete'),
+
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
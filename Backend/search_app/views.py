@@ -1,55 +1,52 @@
 import os
 import json
-import traceback
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.conf import settings
-from google import genai
-from google.genai import types
+from .fuzzy import get_topic_matcher
+from .gemini_api import call_gemini_model, stream_gemini_model
+from .hedging import get_hedger
+from .llm_cache import get_llm_cache
+from .output_parsing import (
+    ARTICLE_SCHEMA,
+    ARTICLES_SCHEMA,
+    DOCUMENTATION_SCHEMA,
+    DOCUMENTATIONS_SCHEMA,
+    QUIZ_BATCH_SCHEMA,
+    QUIZ_QUESTION_SCHEMA,
+    QUIZ_SCHEMA,
+    ItemRequest,
+    OutputParseError,
+    check_question,
+    generate_items,
+    parse_quiz_batch,
+    parse_topic_content,
+    quiz_batch_complete,
+    topic_content_valid,
+    valid_question,
+    with_exclusions,
+)
 from .youtube_api import search_youtube
 import logging
-import random
-from .models import QuizQuestion, Topic, VideoResource, ArticleResource, DocumentationResource
-from itertools import cycle
-from django.db import transaction
-
-_gemini_api_key_cycle = cycle(settings.GEMINI_API_KEYS)
-_youtube_api_key_cycle = cycle(settings.YOUTUBE_API_KEYS)
+from .models import QuizQuestion, Topic, TopicAlias, VideoResource, ArticleResource, DocumentationResource, content_digest
+from .normalization import canonicalize, canonicalize_subtopic
+from .prefetch import get_prefetcher, interactive, schedule_prefetch
+from .question_ingest import get_question_ingester
+from .question_sampler import get_question_sampler
+from .quiz_sourcing import get_quiz_sourcing
+from .search_index import SEARCH_KINDS, autocomplete, search
+from .singleflight import generation_lock, single_flight
+from .subtopics import find_subtopic, get_subtopic, get_subtopics, parse_subtopics
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections, transaction
+from django.db.models import Case, CharField, Count, F, Q, Value, When
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
 # Configure logging (optional, for debugging)
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def call_gemini_model(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json"):
-    """
-    Calls the Gemini model with the given prompt and configuration.
-    """
-    try:
-        client = genai.Client(api_key=next(_gemini_api_key_cycle))
-        contents = [
-            types.Content(
-                role="user",
-                parts=[types.Part.from_text(text=prompt)],
-            ),
-        ]
-        generate_content_config = types.GenerateContentConfig(
-            temperature=temperature,
-            top_p=top_p,
-            top_k=top_k,
-            max_output_tokens=max_output_tokens,
-            response_mime_type=response_mime_type,
-        )
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=generate_content_config,
-        )
-        return response.text
-    except Exception as e:
-        logging.error(f"Error calling Gemini model: {e}")
-        traceback.print_exc()
-        raise e
-
 def generate_prompt(topic):
     prompt_template = """
         {topic-name} = {topic}
@@ -192,27 +189,143 @@ Output a single valid JSON object inside the response with key as {topic} and an
     """
     return prompt_template.replace("{topic}", topic)
 
+def generate_topic_content(topic_name):
+    """Generate topic content, retrying when the output is not usable topic JSON."""
+    prompt = generate_prompt(topic_name)
+    for attempt in range(1 + settings.OUTPUT_REPAIR_ATTEMPTS):
+        result = call_gemini_model(prompt, endpoint="topic", cacheable=topic_content_valid)
+        try:
+            return parse_topic_content(result)
+        except OutputParseError as e:
+            error = e
+            logger.warning(f"Unusable content for topic {topic_name!r}: {e}")
+    raise error
+
+def topic_candidates(topic_name):
+    """
+    Topics stored under topic_name or a variant with the same canonical name.
+    Generated topics come before placeholders created by resource requests,
+    and an exact name match before other variants.
+    """
+    canonical = canonicalize(topic_name)
+    match = Q(name=topic_name) | Q(canonical_name=canonical) if canonical else Q(name=topic_name)
+    return Topic.objects.filter(match).order_by(
+        Case(When(content='', then=Value(1)), default=Value(0)),
+        Case(When(name=topic_name, then=Value(0)), default=Value(1)),
+        'id',
+    )
+
+def alias_candidates(topic_name):
+    canonical = canonicalize(topic_name)
+    match = Q(name=topic_name) | Q(canonical_name=canonical) if canonical else Q(name=topic_name)
+    return TopicAlias.objects.filter(match).select_related('topic').order_by('id')
+
+def find_topic(topic_name):
+    """
+    Return the stored Topic for topic_name or any variant of it, or None.
+
+    Variants share a canonical name (see normalization.canonicalize) or
+    are aliases left behind when duplicates were merged. A placeholder
+    without content is returned only if no generated variant exists.
+    """
+    topic = topic_candidates(topic_name).first()
+    if topic is not None and topic.content:
+        return topic
+    alias = alias_candidates(topic_name).first()
+    return alias.topic if alias is not None else topic
+
+def get_topic(topic_name):
+    """find_topic that raises Topic.DoesNotExist instead of returning None."""
+    topic = find_topic(topic_name)
+    if topic is None:
+        raise Topic.DoesNotExist(f"Topic {topic_name!r} not found")
+    return topic
+
+def get_or_create_topic(topic_name):
+    """find_topic, creating a placeholder Topic without content if no variant is stored."""
+    return find_topic(topic_name) or Topic.objects.get_or_create(name=topic_name)[0]
+
+def store_topic_content(topic, topic_name, content):
+    """
+    Store content generated for topic_name and return its Topic.
+
+    topic is what find_topic returned for topic_name: a placeholder, possibly
+    stored under another variant of the name, is filled in so the resources,
+    subtopics and questions already attached to it stay with the topic.
+    Without one a Topic named topic_name is created.
+    """
+    if topic is None:
+        return Topic.objects.update_or_create(name=topic_name, defaults={'content': content})[0]
+    topic.content = content
+    topic.save(update_fields=['content'])
+    return topic
+
+def topic_flight_key(topic_name):
+    # Variants of one topic share a single generation
+    return f"topic:{canonicalize(topic_name) or topic_name}"
+
+def get_or_generate_topic_content(topic_name):
+    """Return the stored content for topic_name or a variant of it, generating it once if missing."""
+    topic = find_topic(topic_name)
+    if topic and topic.content:
+        return topic.content
+
+    def generate(contended):
+        # Another request may have stored the topic while we waited
+        topic = find_topic(topic_name)
+        if topic and topic.content:
+            return topic.content
+
+        result = generate_topic_content(topic_name)
+
+        store_topic_content(topic, topic_name, result)
+        schedule_prefetch(topic_name, result)
+        return result
+
+    return single_flight(topic_flight_key(topic_name), generate)
+
+def fuzzy_topic_response(topic_name):
+    """
+    Look for a stored topic close to a name that has no stored variant.
+
+    Returns the response body serving the best match when the matcher
+    allows serving it ({'result', 'matched_topic'}), the close matches as
+    {'did_you_mean': [...]} otherwise, or None when nothing is close or
+    fuzzy matching is disabled, in which case the topic is generated. A
+    served match is remembered as an alias of the topic.
+    """
+    matcher = get_topic_matcher()
+    if matcher is None:
+        return None
+    topic = find_topic(topic_name)
+    if topic is not None and topic.content:
+        return None
+    matches = matcher.match(topic_name)
+    if not matches:
+        return None
+
+    topic = next((topic for _, topic in matches if matcher.can_serve(topic_name, topic)), None)
+    if topic is not None:
+        TopicAlias.objects.get_or_create(name=topic_name.strip()[:255], defaults={'topic': topic})
+        return {'result': topic.content, 'matched_topic': topic.name}
+    return {'did_you_mean': [{'name': topic.name, 'score': score} for score, topic in matches]}
+
+@interactive
 def search_gemini(request):
     print("search_gemini called")
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         print("it is a post request")
-        topic_name = json.loads(request.body).get('search_query', '')
+        data = json.loads(request.body)
+        topic_name = data.get('search_query', '')
         print(f"topic_name: {topic_name}")
         
         try:
-            # Check if topic already exists
-            topic = Topic.objects.filter(name=topic_name).first()
-            if topic:
-                # Return existing content if available
-                return JsonResponse({'result': topic.content})
-            
-            # Generate new content if topic doesn't exist
-            prompt = generate_prompt(topic_name)
-            result = call_gemini_model(prompt)
-            
-            # Create new topic with generated content
-            Topic.objects.create(name=topic_name, content=result)
-            
+            # "exact" skips fuzzy matching, e.g. after the user declined the suggestions
+            fuzzy = None if data.get('exact') else fuzzy_topic_response(topic_name)
+            if fuzzy is not None:
+                return JsonResponse(fuzzy)
+
+            result = get_or_generate_topic_content(topic_name)
             return JsonResponse({'result': result})
             
         except Exception as e:
@@ -221,6 +334,180 @@ def search_gemini(request):
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+def sse_event(data, event=None):
+    """Format data as one server-sent event message."""
+    message = f"event: {event}\n" if event else ""
+    return f"{message}data: {json.dumps(data)}\n\n"
+
+def read_stream_query(request):
+    """Return the search query of a streaming request, or None if the request is invalid."""
+    if request.method == 'GET':
+        return request.GET.get('search_query', '')
+    if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return json.loads(request.body).get('search_query', '')
+    return None
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def stream_topic_content(topic_name):
+    """
+    Yield SSE messages for a topic's content.
+
+    Content arrives as "chunk" messages (a single one for stored topics) and is
+    followed by a "done" event once it has been persisted, or an "error" event.
+    """
+    try:
+        topic = find_topic(topic_name)
+        if topic and topic.content:
+            yield sse_event({'chunk': topic.content})
+            yield sse_event({}, event='done')
+            return
+
+        with generation_lock(topic_flight_key(topic_name)):
+            # Another request may have stored the topic while we waited
+            topic = find_topic(topic_name)
+            if topic and topic.content:
+                yield sse_event({'chunk': topic.content})
+            else:
+                chunks = []
+                for chunk in stream_gemini_model(generate_prompt(topic_name)):
+                    chunks.append(chunk)
+                    yield sse_event({'chunk': chunk})
+                # Unusable content is reported as an error and not stored
+                content = parse_topic_content(''.join(chunks))
+                store_topic_content(topic, topic_name, content)
+                schedule_prefetch(topic_name, content)
+        yield sse_event({}, event='done')
+
+    except Exception as e:
+        logger.error(f"Error streaming topic {topic_name!r}: {e}")
+        yield sse_event({'error': str(e)}, event='error')
+
+def search_gemini_stream(request):
+    """Streaming variant of search_gemini that forwards generated content over SSE."""
+    topic_name = read_stream_query(request)
+    if topic_name is None:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    if not topic_name:
+        return JsonResponse({'error': 'search_query is required'}, status=400)
+    return event_stream_response(stream_topic_content(topic_name))
+
+def serialize_question(question):
+    return {
+        'id': question.id,
+        'type': question.question_type,
+        'question': question.question,
+        'options': question.options,
+        'correct_answers': question.correct_answers,
+        'explanation': question.explanation
+    }
+
+def seen_question_ids(user_id, subtopic, question_type):
+    """Ids of the questions of a bucket that the user has already answered."""
+    return set(QuizQuestion.objects.filter(
+        subtopic=subtopic,
+        question_type=question_type,
+        questionattempt__quiz_attempt__user_id=user_id,
+    ).values_list('id', flat=True))
+
+def sample_questions_from_db(topic, subtopic_name, question_type, num_questions, user_id=None):
+    """
+    Return num_questions random stored questions, or None if the bank is too
+    small. With a user_id, questions that user has already answered are skipped.
+    """
+    subtopic = find_subtopic(topic, subtopic_name)
+    if subtopic is None:
+        return None
+    exclude = seen_question_ids(user_id, subtopic, question_type) if user_id else ()
+    questions = get_question_sampler().sample(subtopic.id, question_type, num_questions, exclude)
+    if questions is None:
+        logger.info(f"Question bank cannot supply {num_questions} {question_type} questions for {topic.name}/{subtopic_name}, falling back to Gemini")
+        return None
+    return [serialize_question(question) for question in questions]
+
+def build_quiz_prompt(topic_name, subtopic, question_type, num_questions):
+    return f"""
+        Create a quiz on the {'subtopic of ' + subtopic + ' within the broader topic of ' if subtopic else 'topic of '}{topic_name}. 
+        The quiz should consist of {num_questions} questions. 
+        All questions should be of type '{question_type}'.
+        There should be only 4 options for mcq type and multiple-correct type questions and only 2 options for true-false type questions.
+        For each question, provide:
+            type: string;
+            question: string;
+            options: string[];
+            correct_answers: number[];
+            explanation: string;
+        
+        Return the quiz in JSON format with a "quiz" key containing an array of questions.
+    """
+
+def gemini_caller(endpoint):
+    """Adapt call_gemini_model to the call(prompt, response_schema, cacheable) interface of generate_items."""
+    def call(prompt, response_schema, cacheable):
+        return call_gemini_model(prompt, endpoint=endpoint, response_schema=response_schema, cacheable=cacheable)
+    return call
+
+def quiz_item_request(topic_name, subtopic, question_type, avoid=()):
+    """ItemRequest for questions of one bucket; avoid lists stored questions the model must not repeat."""
+    return ItemRequest(
+        lambda count: with_exclusions(build_quiz_prompt(topic_name, subtopic, question_type, count), 'existing questions', avoid),
+        QUIZ_QUESTION_SCHEMA,
+        QUIZ_SCHEMA,
+        key='quiz',
+        check=lambda question: check_question(question, question_type),
+        identity=lambda question: question['question'],
+        exclusion_label='questions',
+    )
+
+def stored_question_texts(subtopic, question_type):
+    """The latest QUIZ_AVOID_QUESTIONS stored questions of a bucket, newest first."""
+    return list(QuizQuestion.objects.filter(subtopic=subtopic, question_type=question_type).order_by('-id').values_list(
+        'question', flat=True
+    )[:settings.QUIZ_AVOID_QUESTIONS])
+
+def quiz_endpoint(avoid):
+    # Once a bucket holds questions, a cached response would only return them again
+    return "quiz_bank" if avoid else "quiz"
+
+def unique_questions(questions):
+    """Serialize stored questions, skipping missing ones and repeats."""
+    seen = set()
+    serialized = []
+    for question in questions:
+        if question is not None and question.id not in seen:
+            seen.add(question.id)
+            serialized.append(serialize_question(question))
+    return serialized
+
+def store_quiz_questions(topic, subtopic, question_type, quiz_data):
+    """Store new questions for a Subtopic from a parsed quiz response and return all of them serialized."""
+    items = [(subtopic, question_type, question) for question in quiz_data["quiz"]]
+    return unique_questions(get_question_ingester().ingest(topic, items))
+
+def generate_quiz_questions(topic, subtopic_name, question_type, num_questions):
+    """
+    Generate questions with Gemini, store the new ones and return them serialized.
+
+    The bank could not supply the quiz, for instance because the user has
+    answered every stored question, so the stored questions are listed as
+    ones not to repeat.
+    """
+    subtopic = get_subtopic(topic, subtopic_name)
+    avoid = stored_question_texts(subtopic, question_type)
+    questions = generate_items(
+        quiz_item_request(topic.name, subtopic_name, question_type, avoid),
+        num_questions,
+        gemini_caller(quiz_endpoint(avoid)),
+        settings.OUTPUT_REPAIR_ATTEMPTS,
+    )
+    return store_quiz_questions(topic, subtopic, question_type, {"quiz": questions})
+
+@interactive
 def generate_quiz(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
@@ -231,121 +518,695 @@ def generate_quiz(request):
         subtopic = data.get('subtopic', '')
         question_type = data.get('question_type', 'mcq')
         num_questions = data.get('num_questions', 10)
+        user_id = data.get('user_id')
         
         # Get or create the Topic object
         try:
-            topic = Topic.objects.get(name=topic_name)
+            topic = get_topic(topic_name)
         except Topic.DoesNotExist:
             return JsonResponse({
                 'status': 'error',
                 'message': 'Topic not found'
             }, status=404)
         
-        # 50-50 chance to use database or Gemini
-        use_database = random.choice([True, False])
+        # Serve from the question bank when it can supply the quiz
+        questions_data = get_quiz_sourcing().serve(topic, subtopic, question_type, num_questions, user_id)
+        if questions_data is not None:
+            return JsonResponse({'quiz': {'quiz': questions_data}})
+
+        def generate(contended):
+            # A concurrent generation in another worker has just filled the bank
+            if contended:
+                questions_data = sample_questions_from_db(topic, subtopic, question_type, num_questions, user_id)
+                if questions_data is not None:
+                    return questions_data
+            return generate_quiz_questions(topic, subtopic, question_type, num_questions)
+
+        # Generate new questions using Gemini
+        final_questions = single_flight(
+            quiz_flight_key(topic, subtopic, question_type, num_questions), generate
+        )
+        return JsonResponse({'quiz': {"quiz": final_questions}})
+
+    except Exception as e:
+        logger.error(f"Error generating quiz: {e}")
+        return JsonResponse({'error': str(e)}, status=400)
+
+QUIZ_QUESTION_TYPES = ['mcq', 'true-false', 'multiple-correct']
+
+def quiz_flight_key(topic, subtopic_name, question_type, num_questions):
+    return f"quiz:{topic.id}:{canonicalize_subtopic(subtopic_name)}:{question_type}:{num_questions}"
+
+def plan_quiz_batches(buckets, max_questions):
+    """
+    Pack (subtopic, question_type, num_questions) buckets into model calls.
+
+    Buckets larger than max_questions are split, and the pieces are packed
+    greedily so no call asks for more than max_questions questions.
+    """
+    pieces = []
+    for subtopic, question_type, num_questions in buckets:
+        while num_questions > 0:
+            size = min(num_questions, max_questions)
+            pieces.append((subtopic, question_type, size))
+            num_questions -= size
+
+    batches, current, current_size = [], [], 0
+    for piece in pieces:
+        if current and current_size + piece[2] > max_questions:
+            batches.append(current)
+            current, current_size = [], 0
+        current.append(piece)
+        current_size += piece[2]
+    if current:
+        batches.append(current)
+    return batches
+
+def build_quiz_batch_prompt(topic_name, buckets, avoid=None):
+    """avoid maps (subtopic, question_type) to stored questions the model must not repeat."""
+    lines = []
+    for i, (subtopic, question_type, num_questions) in enumerate(buckets, 1):
+        lines.append(
+            f"- set {i}: {num_questions} questions of type '{question_type}' on "
+            f"{'the subtopic ' + subtopic if subtopic else 'the topic as a whole'}"
+        )
+        existing = (avoid or {}).get((subtopic, question_type))
+        if existing:
+            lines.append(f"  Set {i} must not repeat any of these existing questions:")
+            lines.extend(f"  - {question}" for question in existing)
+    sets = "\n".join(lines)
+    return f"""
+        Create quiz questions on the topic of {topic_name} for each of the following question sets.
+{sets}
+        There should be only 4 options for mcq type and multiple-correct type questions and only 2 options for true-false type questions.
+        Do not repeat a question within or across sets.
+        For each question, provide:
+            type: string;
+            question: string;
+            options: string[];
+            correct_answers: number[];
+            explanation: string;
+
+        Return JSON with a "sets" key containing one object per question set, each with a "set" key holding the set number and a "quiz" key holding the array of its questions.
+    """
+
+def store_quiz_batch(topic, buckets, batch_data):
+    """
+    Fan a batched quiz response out into QuizQuestion rows with a single bulk insert.
+
+    Returns the serialized questions stored for each bucket, in bucket order.
+    Questions that copy or reword stored ones are returned from the database
+    instead.
+    """
+    subtopics = get_subtopics(topic, {subtopic for subtopic, _, _ in buckets})
+    indexes = []
+    items = []
+    for quiz_set in batch_data.get('sets', []):
+        try:
+            index = int(quiz_set['set']) - 1
+            questions = quiz_set['quiz']
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping malformed question set: {e}")
+            continue
+        if not 0 <= index < len(buckets):
+            continue
+
+        subtopic, question_type, _ = buckets[index]
+        for question in questions:
+            if valid_question(question, question_type):
+                indexes.append(index)
+                items.append((subtopics[subtopic], question_type, question))
+
+    stored = get_question_ingester().ingest(topic, items)
+    results = [[] for _ in buckets]
+    for index, question in zip(indexes, stored):
+        results[index].append(question)
+    return [unique_questions(questions) for questions in results]
+
+def stored_bucket_questions(topic, buckets):
+    """
+    {(subtopic, question_type): (ids, texts)} for the stored questions of
+    buckets: the ids of all of them and the texts of the latest
+    QUIZ_AVOID_QUESTIONS, newest first.
+    """
+    subtopics = get_subtopics(topic, {subtopic for subtopic, _, _ in buckets})
+    keys = {(subtopics[subtopic].id, question_type): (subtopic, question_type) for subtopic, question_type, _ in buckets}
+    stored = {key: (set(), []) for key in keys.values()}
+    rows = QuizQuestion.objects.filter(
+        subtopic__in=set(subtopics.values()),
+        question_type__in={question_type for _, question_type, _ in buckets},
+    ).order_by('-id').values_list('id', 'subtopic_id', 'question_type', 'question')
+    for question_id, subtopic_id, question_type, question in rows:
+        key = keys.get((subtopic_id, question_type))
+        if key is not None:
+            ids, texts = stored[key]
+            ids.add(question_id)
+            if len(texts) < settings.QUIZ_AVOID_QUESTIONS:
+                texts.append(question)
+    return stored
+
+def questions_to_avoid(stored, results):
+    """Questions each bucket held before and has gained since, newest first, at most QUIZ_AVOID_QUESTIONS."""
+    return {
+        key: ([question['question'] for question in reversed(results.get(key, []))] + texts)[:settings.QUIZ_AVOID_QUESTIONS]
+        for key, (_, texts) in stored.items()
+    }
+
+def add_new_questions(results, stored, batch, batch_questions):
+    """
+    Add the questions stored for each bucket of batch to results, skipping
+    those the bucket already held: copies of them add nothing to the bank.
+    """
+    for (subtopic, question_type, _), questions in zip(batch, batch_questions):
+        ids, _ = stored[(subtopic, question_type)]
+        new = [question for question in questions if question['id'] not in ids]
+        ids.update(question['id'] for question in new)
+        results.setdefault((subtopic, question_type), []).extend(new)
+
+def generate_quiz_batch_questions(topic, buckets):
+    """
+    Generate questions for several (subtopic, question_type, num_questions)
+    buckets in as few model calls as QUIZ_BATCH_MAX_QUESTIONS allows.
+
+    The calls ask for questions the buckets do not hold yet: they list the
+    stored questions not to repeat and bypass the LLM response cache.
+    Complete question sets are kept from truncated responses, and buckets
+    left short of new questions are requested again up to
+    OUTPUT_REPAIR_ATTEMPTS times. Returns {(subtopic, question_type):
+    [serialized new questions]}.
+    """
+    stored = stored_bucket_questions(topic, buckets)
+    results = {}
+    for attempt in range(1 + settings.OUTPUT_REPAIR_ATTEMPTS):
+        avoid = questions_to_avoid(stored, results)
+        for batch in plan_quiz_batches(buckets, settings.QUIZ_BATCH_MAX_QUESTIONS):
+            response_text = call_gemini_model(
+                build_quiz_batch_prompt(topic.name, batch, avoid),
+                endpoint="quiz_bank",
+                response_schema=QUIZ_BATCH_SCHEMA,
+                cacheable=quiz_batch_complete,
+            )
+            add_new_questions(results, stored, batch, store_quiz_batch(topic, batch, parse_quiz_batch(response_text)))
+        buckets = quiz_batch_shortfall(buckets, results)
+        if not buckets:
+            break
+    return results
+
+def quiz_batch_shortfall(buckets, results):
+    """Buckets that received fewer questions than requested, with the number still missing."""
+    requested = {}
+    for subtopic, question_type, num_questions in buckets:
+        requested[(subtopic, question_type)] = requested.get((subtopic, question_type), 0) + num_questions
+    return [
+        (subtopic, question_type, num_questions - len(results.get((subtopic, question_type), [])))
+        for (subtopic, question_type), num_questions in requested.items()
+        if len(results.get((subtopic, question_type), [])) < num_questions
+    ]
+
+def question_bank_counts(topic, subtopics, question_types):
+    """Stored question counts per (subtopic, question_type) bucket."""
+    stored_subtopics = get_subtopics(topic, subtopics)
+    rows = QuizQuestion.objects.filter(
+        subtopic__in=set(stored_subtopics.values()),
+        question_type__in=question_types
+    ).values('subtopic', 'question_type').annotate(count=Count('id'))
+    stored_counts = {(row['subtopic'], row['question_type']): row['count'] for row in rows}
+    return {
+        (subtopic, question_type): stored_counts.get((stored_subtopics[subtopic].id, question_type), 0)
+        for subtopic in subtopics for question_type in question_types
+    }
+
+def plan_question_bank_fill(topic, subtopics, question_types, per_bucket):
+    """Buckets that hold fewer than per_bucket questions, with the number still missing."""
+    counts = question_bank_counts(topic, subtopics, question_types)
+    return [
+        (subtopic, question_type, per_bucket - count)
+        for (subtopic, question_type), count in counts.items()
+        if count < per_bucket
+    ]
+
+def summarize_question_bank(topic, subtopics, question_types, generated):
+    counts = question_bank_counts(topic, subtopics, question_types)
+    return [{
+        'subtopic': subtopic,
+        'question_type': question_type,
+        'generated': len(generated.get((subtopic, question_type), [])),
+        'available': count,
+    } for (subtopic, question_type), count in counts.items()]
+
+def read_question_bank_request(request):
+    """Return (topic, subtopics, question_types, per_bucket) from a batch quiz request body."""
+    data = json.loads(request.body)
+    topic = get_topic(data.get('topic') or '')
+    subtopics = data.get('subtopics')
+    if subtopics is None:
+        subtopics = parse_subtopics(topic.content)
+    question_types = data.get('question_types') or QUIZ_QUESTION_TYPES
+    per_bucket = int(data.get('num_questions', 10))
+    return topic, subtopics, question_types, per_bucket
+
+def question_bank_key(topic, subtopics, question_types, per_bucket):
+    return f"quiz-bank:{topic.id}:{per_bucket}:{json.dumps([sorted(subtopics), sorted(question_types)])}"
+
+def fill_question_bank(topic, subtopics, question_types, per_bucket):
+    """
+    Top up every (subtopic, question_type) bucket of topic to per_bucket
+    questions using batched model calls, and return per-bucket counts.
+    """
+    def generate(contended):
+        buckets = plan_question_bank_fill(topic, subtopics, question_types, per_bucket)
+        generated = generate_quiz_batch_questions(topic, buckets) if buckets else {}
+        return summarize_question_bank(topic, subtopics, question_types, generated)
+
+    return single_flight(question_bank_key(topic, subtopics, question_types, per_bucket), generate)
+
+def generate_quiz_batch(request):
+    """Fill a topic's question bank for several subtopics and question types at once."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    try:
+        try:
+            topic, subtopics, question_types, per_bucket = read_question_bank_request(request)
+        except Topic.DoesNotExist:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Topic not found'
+            }, status=404)
+
+        buckets = fill_question_bank(topic, subtopics, question_types, per_bucket)
+        return JsonResponse({'buckets': buckets})
+
+    except Exception as e:
+        logger.error(f"Error generating quiz batch: {e}")
+        return JsonResponse({'error': str(e)}, status=400)
+
+def serialize_videos(videos):
+    return [{
+        'title': video.title,
+        'url': video.url,
+        'duration': video.duration,
+        'thumbnail': video.thumbnail
+    } for video in videos]
+
+def serialize_articles(articles):
+    return [{
+        'title': article.title,
+        'url': article.url,
+        'readTime': article.read_time
+    } for article in articles]
+
+def serialize_documentation(docs):
+    return [{
+        'title': doc.title,
+        'url': doc.url,
+        'type': doc.doc_type
+    } for doc in docs]
+
+def build_youtube_query(topic_name, subtopic_name):
+    return f"{f'{topic_name} {subtopic_name}' if subtopic_name else topic_name} tutorial"
+
+def store_videos(topic, subtopic, youtube_results):
+    """Store the top YouTube results for a Subtopic of topic and return them serialized."""
+    videos = []
+    if youtube_results:
+        with transaction.atomic():
+            for video in youtube_results[:2]:  # Get top 2 videos
+                video_url = video.get('url', '')
+                video_id = video_url.split('v=')[-1] if 'v=' in video_url else ''
+                
+                video_data = {
+                    'title': video.get('title', ''),
+                    'url': video_url,
+                    'duration': video.get('duration', ''),
+                    'thumbnail': f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg" if video_id else ''
+                }
+                
+                # Save to database
+                VideoResource.objects.create(
+                    topic=topic,
+                    subtopic=subtopic,
+                    **video_data
+                )
+                
+                videos.append(video_data)
+    return videos
+
+def get_or_generate_videos(topic, subtopic_name):
+    """Return stored videos for topic/subtopic, searching YouTube once if there are none."""
+    subtopic = get_subtopic(topic, subtopic_name)
+    # Check if videos already exist in database
+    existing_videos = VideoResource.objects.filter(subtopic=subtopic)
+    if existing_videos.exists():
+        return serialize_videos(existing_videos)
+
+    def generate(contended):
+        existing_videos = VideoResource.objects.filter(subtopic=subtopic)
+        if existing_videos.exists():
+            return serialize_videos(existing_videos)
+
+        # Generate new videos if not in database
+        youtube_results = search_youtube(build_youtube_query(topic.name, subtopic_name))
+        return store_videos(topic, subtopic, youtube_results)
+
+    return single_flight(f"videos:{subtopic.id}", generate)
+
+# Articles and documentation links generated per topic/subtopic
+RESOURCE_ITEM_COUNT = 2
+
+def build_articles_prompt(topic_name, subtopic_name, count=2):
+    return f"""
+        Generate {count} high-quality, beginner-friendly articles about {f'{topic_name} {subtopic_name}' if subtopic_name else topic_name}.
+        Return a JSON array with the following structure for each article:
+        {{
+            "title": "article title",
+            "url": "article url",
+            "readTime": "estimated read time"
+        }}
         
-        if use_database:
-            # Try to get questions from database first
-            questions = QuizQuestion.objects.filter(
+        Make sure all URLs are valid and accessible.
+    """
+
+def articles_item_request(topic_name, subtopic_name):
+    return ItemRequest(
+        lambda count: build_articles_prompt(topic_name, subtopic_name, count),
+        ARTICLE_SCHEMA,
+        ARTICLES_SCHEMA,
+        identity=lambda article: article['url'],
+        exclusion_label='article URLs',
+    )
+
+def store_articles(topic, subtopic, articles_data):
+    """Store generated articles for a Subtopic of topic and return them serialized."""
+    articles = []
+    with transaction.atomic():
+        for article_data in articles_data:
+            article = ArticleResource.objects.create(
                 topic=topic,
                 subtopic=subtopic,
-                question_type=question_type
+                title=article_data['title'],
+                url=article_data['url'],
+                read_time=article_data['readTime']
             )
-            
-            if questions.exists():
-                # If we have questions in database, use them
-                if questions.count() >= num_questions:
-                    # If we have enough questions, randomly select from existing ones
-                    selected_questions = random.sample(list(questions), num_questions)
-                    questions_data = []
-                    for q in selected_questions:
-                        questions_data.append({
-                            'id': q.id,
-                            'question': q.question,
-                            'options': q.options,
-                            'correct_answers': q.correct_answers,
-                            'explanation': q.explanation,
-                            'type': q.question_type
-                        })
-                    return JsonResponse({'quiz': {'quiz': questions_data}})
-                else:
-                    # If we don't have enough questions, fall back to Gemini
-                    logger.info(f"Database has {questions.count()} questions, falling back to Gemini for {num_questions} questions")
-                    use_database = False
+            articles.append(article)
+    return serialize_articles(articles)
+
+def get_or_generate_articles(topic, subtopic_name):
+    """Return stored articles for topic/subtopic, asking Gemini once if there are none."""
+    subtopic = get_subtopic(topic, subtopic_name)
+    # Check if articles already exist in database
+    existing_articles = ArticleResource.objects.filter(subtopic=subtopic)
+    if existing_articles.exists():
+        return serialize_articles(existing_articles)
+
+    def generate(contended):
+        existing_articles = ArticleResource.objects.filter(subtopic=subtopic)
+        if existing_articles.exists():
+            return serialize_articles(existing_articles)
+
+        # Generate new articles if not in database
+        articles_data = generate_items(
+            articles_item_request(topic.name, subtopic_name),
+            RESOURCE_ITEM_COUNT,
+            gemini_caller("articles"),
+            settings.OUTPUT_REPAIR_ATTEMPTS,
+        )
+        return store_articles(topic, subtopic, articles_data)
+
+    return single_flight(f"articles:{subtopic.id}", generate)
+
+def build_documentation_prompt(topic_name, subtopic_name, count=2):
+    return f"""
+        Generate {count} official or widely recognized documentation sources for {f'{topic_name} {subtopic_name}' if subtopic_name else topic_name}.
+        Return a JSON array with the following structure for each documentation:
+        {{
+            "title": "documentation title",
+            "url": "documentation url",
+            "type": "documentation type"
+        }}
         
-        if not use_database:
-            # Generate new questions using Gemini
-            prompt = f"""
-                Create a quiz on the {'subtopic of ' + subtopic + ' within the broader topic of ' if subtopic else 'topic of '}{topic_name}. 
-                The quiz should consist of {num_questions} questions. 
-                All questions should be of type '{question_type}'.
-                There should be only 4 options for mcq type and multiple-correct type questions and only 2 options for true-false type questions.
-                For each question, provide:
-                    type: string;
-                    question: string;
-                    options: string[];
-                    correct_answers: number[];
-                    explanation: string;
-                
-                Return the quiz in JSON format with a "quiz" key containing an array of questions.
-            """
-            
-            response_text = call_gemini_model(prompt)
-            quiz_data = eval(response_text)
-            
-            # Store new questions in database and collect their IDs
-            final_questions = []
-            with transaction.atomic():
-                for question in quiz_data["quiz"]:
-                    try:
-                        # Check if question already exists
-                        existing_question = QuizQuestion.objects.filter(
-                            topic=topic,
-                            subtopic=subtopic,
-                            question_type=question_type,
-                            question=question["question"]
-                        ).first()
-
-                        if existing_question:
-                            # Use existing question with its ID
-                            final_questions.append({
-                                "id": existing_question.id,
-                                "type": existing_question.question_type,
-                                "question": existing_question.question,
-                                "options": existing_question.options,
-                                "correct_answers": existing_question.correct_answers,
-                                "explanation": existing_question.explanation
-                            })
-                        else:
-                            # Create new question and get its ID
-                            new_question = QuizQuestion.objects.create(
-                                topic=topic,
-                                subtopic=subtopic,
-                                question_type=question_type,
-                                question=question["question"],
-                                options=question["options"],
-                                correct_answers=question["correct_answers"],
-                                explanation=question["explanation"],
-                                source="gemini"
-                            )
-                            final_questions.append({
-                                "id": new_question.id,
-                                "type": new_question.question_type,
-                                "question": new_question.question,
-                                "options": new_question.options,
-                                "correct_answers": new_question.correct_answers,
-                                "explanation": new_question.explanation
-                            })
-                    except Exception as e:
-                        logger.warning(f"Error processing question: {e}")
-                        continue
-            
-            return JsonResponse({'quiz': {"quiz": final_questions}})
+        Make sure all URLs are valid and accessible.
+    """
 
-    except Exception as e:
-        logger.error(f"Error generating quiz: {e}")
-        return JsonResponse({'error': str(e)}, status=400)
+def documentation_item_request(topic_name, subtopic_name):
+    return ItemRequest(
+        lambda count: build_documentation_prompt(topic_name, subtopic_name, count),
+        DOCUMENTATION_SCHEMA,
+        DOCUMENTATIONS_SCHEMA,
+        identity=lambda doc: doc['url'],
+        exclusion_label='documentation URLs',
+    )
+
+def store_documentation(topic, subtopic, docs_data):
+    """Store generated documentation for a Subtopic of topic and return it serialized."""
+    documentation = []
+    with transaction.atomic():
+        for doc_data in docs_data:
+            doc = DocumentationResource.objects.create(
+                topic=topic,
+                subtopic=subtopic,
+                title=doc_data['title'],
+                url=doc_data['url'],
+                doc_type=doc_data['type']
+            )
+            documentation.append(doc)
+    return serialize_documentation(documentation)
+
+def get_or_generate_documentation(topic, subtopic_name):
+    """Return stored documentation for topic/subtopic, asking Gemini once if there is none."""
+    subtopic = get_subtopic(topic, subtopic_name)
+    # Check if documentation already exists in database
+    existing_docs = DocumentationResource.objects.filter(subtopic=subtopic)
+    if existing_docs.exists():
+        return serialize_documentation(existing_docs)
+
+    def generate(contended):
+        existing_docs = DocumentationResource.objects.filter(subtopic=subtopic)
+        if existing_docs.exists():
+            return serialize_documentation(existing_docs)
+
+        # Generate new documentation if not in database
+        docs_data = generate_items(
+            documentation_item_request(topic.name, subtopic_name),
+            RESOURCE_ITEM_COUNT,
+            gemini_caller("documentation"),
+            settings.OUTPUT_REPAIR_ATTEMPTS,
+        )
+        return store_documentation(topic, subtopic, docs_data)
+
+    return single_flight(f"documentation:{subtopic.id}", generate)
+
+RESOURCE_KINDS = ('videos', 'articles', 'documentation')
+
+def _resource_rows(model, kind, topic, subtopic_name, detail, extra=None):
+    blank = Value('', output_field=CharField())
+    return model.objects.filter(
+        subtopic__topic=topic, subtopic__canonical_name=canonicalize_subtopic(subtopic_name)
+    ).annotate(
+        resource_kind=Value(kind, output_field=CharField()),
+        detail=F(detail),
+        extra=F(extra) if extra else blank,
+    ).values_list('resource_kind', 'id', 'title', 'url', 'detail', 'extra', 'updated_at')
+
+def read_topic_resources(topic, subtopic_name):
+    """
+    Stored videos, articles and documentation for topic/subtopic, read with a
+    single UNION query, and the latest updated_at among them (None if there
+    are no rows). Kinds with no stored rows map to None.
+    """
+    rows = _resource_rows(VideoResource, 'videos', topic, subtopic_name, 'duration', 'thumbnail').union(
+        _resource_rows(ArticleResource, 'articles', topic, subtopic_name, 'read_time'),
+        _resource_rows(DocumentationResource, 'documentation', topic, subtopic_name, 'doc_type'),
+        all=True,
+    )
+    grouped = {kind: [] for kind in RESOURCE_KINDS}
+    last_modified = None
+    for kind, pk, title, url, detail, extra, updated_at in sorted(rows, key=lambda row: row[1]):
+        grouped[kind].append((title, url, detail, extra))
+        last_modified = max(last_modified or updated_at, updated_at)
+
+    resources = {
+        'videos': serialize_videos([
+            VideoResource(title=title, url=url, duration=detail, thumbnail=extra)
+            for title, url, detail, extra in grouped['videos']
+        ]) or None,
+        'articles': serialize_articles([
+            ArticleResource(title=title, url=url, read_time=detail)
+            for title, url, detail, _ in grouped['articles']
+        ]) or None,
+        'documentation': serialize_documentation([
+            DocumentationResource(title=title, url=url, doc_type=detail)
+            for title, url, detail, _ in grouped['documentation']
+        ]) or None,
+    }
+    return resources, last_modified
+
+def load_topic_resources(topic, subtopic_name):
+    """Stored resources for topic/subtopic; see read_topic_resources."""
+    return read_topic_resources(topic, subtopic_name)[0]
+
+def _generate_resource(get_or_generate, topic, subtopic_name):
+    try:
+        return get_or_generate(topic, subtopic_name)
+    finally:
+        close_old_connections()
+
+def get_or_generate_resources(topic, subtopic_name):
+    """
+    Return videos, articles and documentation for topic/subtopic.
 
+    Stored resources are read in one query. Missing kinds are generated
+    concurrently (the YouTube search and the two Gemini calls overlap), each
+    through its own single-flight helper. Kinds that fail are returned empty
+    and their errors are listed under 'errors'.
+    """
+    resources = load_topic_resources(topic, subtopic_name)
+    generators = {
+        'videos': get_or_generate_videos,
+        'articles': get_or_generate_articles,
+        'documentation': get_or_generate_documentation,
+    }
+    missing = [kind for kind in RESOURCE_KINDS if resources[kind] is None]
+
+    errors = {}
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            futures = {kind: pool.submit(_generate_resource, generators[kind], topic, subtopic_name) for kind in missing}
+        for kind, future in futures.items():
+            try:
+                resources[kind] = future.result()
+            except Exception as e:
+                logger.error(f"Error generating {kind}: {e}")
+                resources[kind] = []
+                errors[kind] = str(e)
+
+    resources['errors'] = errors
+    return resources
+
+@interactive
+def generate_resources_for_topic(request):
+    """Return videos, articles and documentation for a topic or subtopic in one response."""
+    if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        try:
+            data = json.loads(request.body)
+            topic_name = data.get('topic_name', '')
+            subtopic_name = data.get('subtopic_name', '') or ''
+
+            if not topic_name:
+                return JsonResponse({'error': 'Topic name is required'}, status=400)
+
+            topic = get_or_create_topic(topic_name)
+            return JsonResponse(get_or_generate_resources(topic, subtopic_name))
+
+        except Exception as e:
+            logger.error(f"Error generating resources: {e}")
+            return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({'error': 'Invalid request'}, status=400)
+
+def conditional_json(request, data, etag, last_modified=None, complete=True):
+    """
+    JsonResponse for a GET read with ETag, Last-Modified and Cache-Control
+    headers, or 304 Not Modified when the client's copy is still current.
+    Incomplete data is only cached for HTTP_CACHE['incomplete_max_age'].
+    """
+    cache = settings.HTTP_CACHE
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(data)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    if complete:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=cache['max_age'],
+            s_maxage=cache['s_maxage'],
+            stale_while_revalidate=cache['stale_while_revalidate'],
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=cache['incomplete_max_age'])
+    return response
+
+def not_generated(message):
+    """404 for a GET read of content that has not been generated yet; never cached."""
+    response = JsonResponse({'error': message}, status=404)
+    patch_cache_control(response, no_store=True)
+    return response
+
+def topic_content(request):
+    """Cacheable read of stored topic content: GET ?name=<topic>. 404 until it has been generated."""
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    topic_name = request.GET.get('name', '')
+    if not topic_name:
+        return JsonResponse({'error': 'Topic name is required'}, status=400)
+
+    topic = find_topic(topic_name)
+    if topic is None or not topic.content:
+        return not_generated('Topic has not been generated yet')
+    return conditional_json(request, {'result': topic.content}, topic.content_hash, topic.updated_at)
+
+def topic_resources(request):
+    """
+    Cacheable read of stored resources: GET ?topic_name=<topic>&subtopic_name=<subtopic>.
+    404 until at least one kind has been generated; partial results are cached briefly.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    topic_name = request.GET.get('topic_name', '')
+    subtopic_name = request.GET.get('subtopic_name', '')
+    if not topic_name:
+        return JsonResponse({'error': 'Topic name is required'}, status=400)
+
+    topic = find_topic(topic_name)
+    resources, last_modified = read_topic_resources(topic, subtopic_name) if topic else ({}, None)
+    if not any(resources.values()):
+        return not_generated('Resources have not been generated yet')
+
+    resources['errors'] = {}
+    body = json.dumps(resources, sort_keys=True)
+    complete = all(resources[kind] for kind in RESOURCE_KINDS)
+    return conditional_json(request, resources, content_digest(body)[:32], last_modified, complete)
+
+def _search_limit(request, default, maximum=50):
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), maximum))
+    except ValueError:
+        return default
+
+def search_content(request):
+    """
+    Full-text search over generated topics, subtopics and quiz questions:
+    GET ?q=<query>[&kind=topic,subtopic,question][&limit=<n>].
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Query is required'}, status=400)
+    kinds = [kind.strip() for kind in request.GET.get('kind', '').split(',') if kind.strip()]
+
+    response = JsonResponse({'results': search(query, kinds or SEARCH_KINDS, _search_limit(request, 20))})
+    patch_cache_control(response, public=True, max_age=settings.HTTP_CACHE['search_max_age'])
+    return response
+
+def autocomplete_topics(request):
+    """Topic and subtopic names matching what has been typed so far: GET ?q=<prefix>[&limit=<n>]."""
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    prefix = request.GET.get('q', '').strip()
+    # One-letter prefixes match too much of the index to be useful
+    suggestions = autocomplete(prefix, _search_limit(request, 8, 20)) if len(prefix) >= 2 else []
+
+    response = JsonResponse({'suggestions': suggestions})
+    patch_cache_control(response, public=True, max_age=settings.HTTP_CACHE['search_max_age'])
+    return response
+
+@interactive
 def generate_videos_for_topic(request):
     """Generate YouTube videos for a specific topic or subtopic."""
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -358,50 +1219,9 @@ def generate_videos_for_topic(request):
                 return JsonResponse({'error': 'Topic name is required'}, status=400)
             
             # Get or create the Topic object
-            topic, _ = Topic.objects.get_or_create(name=topic_name)
-            
-            # Check if videos already exist in database
-            existing_videos = VideoResource.objects.filter(
-                topic=topic,
-                subtopic=subtopic_name if subtopic_name else ''
-            )
-            
-            if existing_videos.exists():
-                videos = [{
-                    'title': video.title,
-                    'url': video.url,
-                    'duration': video.duration,
-                    'thumbnail': video.thumbnail
-                } for video in existing_videos]
-                return JsonResponse({'videos': videos})
-            
-            # Generate new videos if not in database
-            youtube_prompt = f"{f'{topic_name} {subtopic_name}' if subtopic_name else topic_name} tutorial"
-            youtube_results = search_youtube(next(_youtube_api_key_cycle), youtube_prompt)
-            
-            videos = []
-            if youtube_results:
-                with transaction.atomic():
-                    for video in youtube_results[:2]:  # Get top 2 videos
-                        video_url = video.get('url', '')
-                        video_id = video_url.split('v=')[-1] if 'v=' in video_url else ''
-                        
-                        video_data = {
-                            'title': video.get('title', ''),
-                            'url': video_url,
-                            'duration': video.get('duration', ''),
-                            'thumbnail': f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg" if video_id else ''
-                        }
-                        
-                        # Save to database
-                        VideoResource.objects.create(
-                            topic=topic,
-                            subtopic=subtopic_name if subtopic_name else '',
-                            **video_data
-                        )
-                        
-                        videos.append(video_data)
+            topic = get_or_create_topic(topic_name)
             
+            videos = get_or_generate_videos(topic, subtopic_name if subtopic_name else '')
             return JsonResponse({'videos': videos})
             
         except Exception as e:
@@ -410,6 +1230,7 @@ def generate_videos_for_topic(request):
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+@interactive
 def generate_articles_for_topic(request):
     """Generate articles for a specific topic or subtopic."""
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -422,55 +1243,9 @@ def generate_articles_for_topic(request):
                 return JsonResponse({'error': 'Topic name is required'}, status=400)
             
             # Get or create the Topic object
-            topic, _ = Topic.objects.get_or_create(name=topic_name)
-            
-            # Check if articles already exist in database
-            existing_articles = ArticleResource.objects.filter(
-                topic=topic,
-                subtopic=subtopic_name if subtopic_name else ''
-            )
-            
-            if existing_articles.exists():
-                articles = [{
-                    'title': article.title,
-                    'url': article.url,
-                    'readTime': article.read_time
-                } for article in existing_articles]
-                return JsonResponse({'articles': articles})
-            
-            # Generate new articles if not in database
-            gemini_prompt = f"""
-                Generate 2 high-quality, beginner-friendly articles about {f'{topic_name} {subtopic_name}' if subtopic_name else topic_name}.
-                Return a JSON array with the following structure for each article:
-                {{
-                    "title": "article title",
-                    "url": "article url",
-                    "readTime": "estimated read time"
-                }}
-                
-                Make sure all URLs are valid and accessible.
-            """
-            
-            gemini_response = call_gemini_model(gemini_prompt)
-            articles_data = json.loads(gemini_response)
-            
-            # Save to database
-            articles = []
-            with transaction.atomic():
-                for article_data in articles_data:
-                    article = ArticleResource.objects.create(
-                        topic=topic,
-                        subtopic=subtopic_name if subtopic_name else '',
-                        title=article_data['title'],
-                        url=article_data['url'],
-                        read_time=article_data['readTime']
-                    )
-                    articles.append({
-                        'title': article.title,
-                        'url': article.url,
-                        'readTime': article.read_time
-                    })
+            topic = get_or_create_topic(topic_name)
             
+            articles = get_or_generate_articles(topic, subtopic_name if subtopic_name else '')
             return JsonResponse({'articles': articles})
             
         except Exception as e:
@@ -479,6 +1254,7 @@ def generate_articles_for_topic(request):
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+@interactive
 def generate_documentation_for_topic(request):
     """Generate documentation for a specific topic or subtopic."""
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -491,59 +1267,25 @@ def generate_documentation_for_topic(request):
                 return JsonResponse({'error': 'Topic name is required'}, status=400)
             
             # Get or create the Topic object
-            topic, _ = Topic.objects.get_or_create(name=topic_name)
-            
-            # Check if documentation already exists in database
-            existing_docs = DocumentationResource.objects.filter(
-                topic=topic,
-                subtopic=subtopic_name if subtopic_name else ''
-            )
-            
-            if existing_docs.exists():
-                documentation = [{
-                    'title': doc.title,
-                    'url': doc.url,
-                    'type': doc.doc_type
-                } for doc in existing_docs]
-                return JsonResponse({'documentation': documentation})
-            
-            # Generate new documentation if not in database
-            gemini_prompt = f"""
-                Generate 2 official or widely recognized documentation sources for {f'{topic_name} {subtopic_name}' if subtopic_name else topic_name}.
-                Return a JSON array with the following structure for each documentation:
-                {{
-                    "title": "documentation title",
-                    "url": "documentation url",
-                    "type": "documentation type"
-                }}
-                
-                Make sure all URLs are valid and accessible.
-            """
-            
-            gemini_response = call_gemini_model(gemini_prompt)
-            docs_data = json.loads(gemini_response)
-            
-            # Save to database
-            documentation = []
-            with transaction.atomic():
-                for doc_data in docs_data:
-                    doc = DocumentationResource.objects.create(
-                        topic=topic,
-                        subtopic=subtopic_name if subtopic_name else '',
-                        title=doc_data['title'],
-                        url=doc_data['url'],
-                        doc_type=doc_data['type']
-                    )
-                    documentation.append({
-                        'title': doc.title,
-                        'url': doc.url,
-                        'type': doc.doc_type
-                    })
+            topic = get_or_create_topic(topic_name)
             
+            documentation = get_or_generate_documentation(topic, subtopic_name if subtopic_name else '')
             return JsonResponse({'documentation': documentation})
             
         except Exception as e:
             logger.error(f"Error generating documentation: {e}")
             return JsonResponse({'error': str(e)}, status=500)
     
-    return JsonResponse({'error': 'Invalid request'}, status=400)
\ No newline at end of file
+    return JsonResponse({'error': 'Invalid request'}, status=400)
+
+def metrics(request):
+    """Cache counters for this worker process."""
+    prefetcher = get_prefetcher()
+    hedger = get_hedger()
+    return JsonResponse({
+        'llm_cache': get_llm_cache().stats(),
+        'prefetch': prefetcher.stats() if prefetcher else None,
+        'hedging': hedger.stats() if hedger else None,
+        'quiz_sourcing': get_quiz_sourcing().stats(),
+        'question_ingest': get_question_ingester().stats(),
+    })
\ No newline at end of file
@@ -1,10 +1,34 @@
+import asyncio
 import logging
+import threading
+import weakref
+import httpx
+from django.conf import settings
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import re
+from . import key_scheduler
+from .key_scheduler import KeyScheduler
 
 logger = logging.getLogger(__name__)
 
+YOUTUBE_API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+
+
+def youtube_api_root():
+    """Root URL of the YouTube API; the fake backend's when MODEL_BACKEND is 'fake'."""
+    if getattr(settings, 'MODEL_BACKEND', 'google') == 'fake':
+        return settings.FAKE_BACKEND_URL.rstrip('/') + '/'
+    return None
+
+# Quota units charged per search: search().list is 100, videos().list is 1
+SEARCH_QUOTA_COST = 101
+
+_key_scheduler = None
+_key_scheduler_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
 def format_duration(duration):
     """Convert ISO 8601 duration to human readable format."""
     # Extract hours, minutes, and seconds using regex
@@ -23,12 +47,119 @@ def format_duration(duration):
     else:
         return f"{m:02d}:{s:02d}"
 
-def search_youtube(api_key, query, max_results=5):
+def classify_youtube_error(error):
+    """Map an exception from a YouTube call onto a key_scheduler error kind."""
+    if isinstance(error, HttpError):
+        status, body = error.resp.status, str(error.content)
+    elif isinstance(error, httpx.HTTPStatusError):
+        status, body = error.response.status_code, error.response.text
+    elif isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return key_scheduler.SERVER
+    else:
+        return key_scheduler.OTHER
+
+    if 'quotaExceeded' in body or 'dailyLimitExceeded' in body:
+        return key_scheduler.QUOTA
+    if status == 429 or 'rateLimitExceeded' in body:
+        return key_scheduler.RATE_LIMIT
+    if status in (401, 403) or 'keyInvalid' in body:
+        return key_scheduler.AUTH
+    if status >= 500:
+        return key_scheduler.SERVER
+    return key_scheduler.OTHER
+
+def get_key_scheduler():
+    """Return the process-wide KeyScheduler for the configured YouTube keys."""
+    global _key_scheduler
+    with _key_scheduler_lock:
+        if _key_scheduler is None:
+            _key_scheduler = KeyScheduler(
+                'youtube',
+                settings.YOUTUBE_API_KEYS,
+                classify_youtube_error,
+                **settings.KEY_SCHEDULER.get('youtube', {}),
+            )
+        return _key_scheduler
+
+def collect_video_ids(search_response):
+    """Extract the video IDs from a search().list response."""
+    video_ids = []
+    for search_result in search_response.get('items', []):
+        try:
+            video_id = search_result['id']['videoId']
+            video_ids.append(video_id)
+        except KeyError as ke:
+            logger.warning(f"Missing video ID in response: {ke}")
+            continue
+    return video_ids
+
+def build_video_results(search_response, video_response):
+    """Combine search().list and videos().list responses into video dictionaries."""
+    # Create a map of video ID to duration
+    duration_map = {}
+    for video in video_response.get('items', []):
+        try:
+            video_id = video['id']
+            duration = video['contentDetails']['duration']
+            duration_map[video_id] = format_duration(duration)
+        except KeyError as ke:
+            logger.warning(f"Missing duration data: {ke}")
+
+    # Combine search results with duration
+    videos = []
+    for search_result in search_response.get('items', []):
+        try:
+            video_id = search_result['id']['videoId']
+            snippet = search_result['snippet']
+            video = {
+                'title': snippet.get('title', 'No Title'),
+                'description': snippet.get('description', 'No Description'),
+                'url': f'https://www.youtube.com/watch?v={video_id}',
+                'thumbnail': snippet.get('thumbnails', {}).get('default', {}).get('url', ''),
+                'channelTitle': snippet.get('channelTitle', 'Unknown Channel'),
+                'duration': duration_map.get(video_id, 'N/A')
+            }
+            videos.append(video)
+        except KeyError as ke:
+            logger.warning(f"Missing data in response: {ke}")
+    return videos
+
+def _search_youtube(api_key, query, max_results):
+    api_root = youtube_api_root()
+    youtube = build(
+        'youtube', 'v3',
+        developerKey=api_key,
+        client_options={'api_endpoint': api_root} if api_root else None,
+    )
+
+    # First, search for videos
+    search_response = youtube.search().list(
+        q=query,
+        part='snippet',
+        maxResults=max_results,
+        type='video'
+    ).execute()
+
+    # Get video details including duration
+    video_ids = collect_video_ids(search_response)
+    if not video_ids:
+        return []
+
+    video_response = youtube.videos().list(
+        part='contentDetails',
+        id=','.join(video_ids)
+    ).execute()
+
+    return build_video_results(search_response, video_response)
+
+def search_youtube(query, max_results=5):
     """
     Searches YouTube for videos based on a query.
 
+    The API key is chosen by the YouTube KeyScheduler, which skips keys that
+    are rate limited or out of daily quota and retries on another key.
+
     Args:
-        api_key: Your YouTube Data API v3 key.
         query: The search query string.
         max_results: The maximum number of results to return.
 
@@ -38,67 +169,71 @@ def search_youtube(api_key, query, max_results=5):
     """
     logger.info(f"search_youtube called with query: {query}")
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-
-        # First, search for videos
-        search_response = youtube.search().list(
-            q=query,
-            part='snippet',
-            maxResults=max_results,
-            type='video'
-        ).execute()
-
-        videos = []
-        video_ids = []
-        
-        # Collect video IDs
-        for search_result in search_response.get('items', []):
-            try:
-                video_id = search_result['id']['videoId']
-                video_ids.append(video_id)
-            except KeyError as ke:
-                logger.warning(f"Missing video ID in response: {ke}")
-                continue
-
-        # Get video details including duration
-        if video_ids:
-            video_response = youtube.videos().list(
-                part='contentDetails',
-                id=','.join(video_ids)
-            ).execute()
-
-            # Create a map of video ID to duration
-            duration_map = {}
-            for video in video_response.get('items', []):
-                try:
-                    video_id = video['id']
-                    duration = video['contentDetails']['duration']
-                    duration_map[video_id] = format_duration(duration)
-                except KeyError as ke:
-                    logger.warning(f"Missing duration data: {ke}")
-
-            # Combine search results with duration
-            for search_result in search_response.get('items', []):
-                try:
-                    video_id = search_result['id']['videoId']
-                    snippet = search_result['snippet']
-                    video = {
-                        'title': snippet.get('title', 'No Title'),
-                        'description': snippet.get('description', 'No Description'),
-                        'url': f'https://www.youtube.com/watch?v={video_id}',
-                        'thumbnail': snippet.get('thumbnails', {}).get('default', {}).get('url', ''),
-                        'channelTitle': snippet.get('channelTitle', 'Unknown Channel'),
-                        'duration': duration_map.get(video_id, 'N/A')
-                    }
-                    videos.append(video)
-                except KeyError as ke:
-                    logger.warning(f"Missing data in response: {ke}")
-
-        return videos
+        return get_key_scheduler().call(
+            lambda api_key: _search_youtube(api_key, query, max_results),
+            cost=SEARCH_QUOTA_COST,
+        )
 
     except HttpError as e:
         logger.error(f'An HTTP error {e.resp.status} occurred:\n{e.content}')
         return None
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _get_async_http_client():
+    # httpx.AsyncClient is bound to the loop it was first used on
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            api_root = youtube_api_root()
+            base_url = f"{api_root}youtube/v3" if api_root else YOUTUBE_API_BASE_URL
+            client = httpx.AsyncClient(base_url=base_url, timeout=30)
+            _async_clients[loop] = client
+    return client
+
+async def _search_youtube_async(api_key, query, max_results):
+    client = _get_async_http_client()
+    response = await client.get('/search', params={
+        'q': query,
+        'part': 'snippet',
+        'maxResults': max_results,
+        'type': 'video',
+        'key': api_key,
+    })
+    response.raise_for_status()
+    search_response = response.json()
+
+    video_ids = collect_video_ids(search_response)
+    if not video_ids:
+        return []
+
+    response = await client.get('/videos', params={
+        'part': 'contentDetails',
+        'id': ','.join(video_ids),
+        'key': api_key,
+    })
+    response.raise_for_status()
+
+    return build_video_results(search_response, response.json())
+
+async def search_youtube_async(query, max_results=5):
+    """
+    Async counterpart of search_youtube that talks to the Data API over httpx.
+
+    Returns the same list of video dictionaries, or None if an error occurs.
+    """
+    logger.info(f"search_youtube_async called with query: {query}")
+    try:
+        return await get_key_scheduler().acall(
+            lambda api_key: _search_youtube_async(api_key, query, max_results),
+            cost=SEARCH_QUOTA_COST,
+        )
+
+    except httpx.HTTPStatusError as e:
+        logger.error(f'An HTTP error {e.response.status_code} occurred:\n{e.response.text}')
+        return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        return None
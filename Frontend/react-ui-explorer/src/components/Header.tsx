@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -21,11 +21,14 @@ import {
 import QuizTypeSelector from '@/components/QuizTypeSelector';
 import { useAuth } from '@/hooks/useAuth';
 import ResourcesDialog from './ResourcesDialog';
-
-const API_URL = import.meta.env.VITE_BACKEND_API_URL_START;
+import { getTopicResources } from '@/data/getTopicResources';
+import { getSearchSuggestions, SearchSuggestion } from '@/data/getSearchSuggestions';
 
 const Header: React.FC = () => {
   const [searchQuery, setSearchQuery] = useState('');
+  const [suggestions, setSuggestions] = useState<SearchSuggestion[]>([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
+  const suggestionsRequest = useRef<AbortController | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [showQuizDialog, setShowQuizDialog] = useState(false);
   const [showAuthDialog, setShowAuthDialog] = useState(false);
@@ -61,6 +64,35 @@ const Header: React.FC = () => {
     };
   }, [location.pathname]);
 
+  // Suggest already generated topics while typing, so users can skip a cold generation
+  useEffect(() => {
+    const prefix = searchQuery.trim();
+    if (prefix.length < 2) {
+      setSuggestions([]);
+      return;
+    }
+    const timer = setTimeout(() => {
+      suggestionsRequest.current?.abort();
+      const controller = new AbortController();
+      suggestionsRequest.current = controller;
+      getSearchSuggestions(prefix, controller.signal)
+        .then(setSuggestions)
+        .catch(() => {});
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
+  const openTopic = (topic: string) => {
+    setShowSuggestions(false);
+    setSuggestions([]);
+    setShowQuizButton(false);
+    navigate('/');
+    setTimeout(() => {
+      navigate(`/topic/${encodeURIComponent(topic.toLowerCase())}`);
+      setSearchQuery('');
+    }, 100);
+  };
+
   const handleSearch = async (e: React.FormEvent) => {
     e.preventDefault();
     
@@ -70,6 +102,7 @@ const Header: React.FC = () => {
     }
     
     setIsLoading(true);
+    setShowSuggestions(false);
     setShowQuizButton(false); // Hide quiz button during new search
     
     // Clear existing content by navigating to a temporary route
@@ -114,70 +147,24 @@ const Header: React.FC = () => {
     }
 
     const topic = decodeURIComponent(topicMatch[1]);
-    const requestBody = {
-      topic_name: topic
-    };
 
-    // Load videos
-    fetch(API_URL + '/gemini-search/generate-topic-videos', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
+    // Load videos, articles and documentation in one request
+    getTopicResources(topic)
     .then(data => {
-      if (data.videos) setVideos(data.videos);
+      setVideos(data.videos);
+      setArticles(data.articles);
+      setDocumentation(data.documentation);
+      if (data.errors.videos) toast.error('Failed to load videos');
+      if (data.errors.articles) toast.error('Failed to load articles');
+      if (data.errors.documentation) toast.error('Failed to load documentation');
     })
     .catch(error => {
-      console.error('Error loading videos:', error);
-      toast.error('Failed to load videos');
+      console.error('Error loading resources:', error);
+      toast.error('Failed to load resources');
     })
     .finally(() => {
       setLoadingVideos(false);
-    });
-
-    // Load articles
-    fetch(API_URL + '/gemini-search/generate-topic-articles', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
-    .then(data => {
-      if (data.articles) setArticles(data.articles);
-    })
-    .catch(error => {
-      console.error('Error loading articles:', error);
-      toast.error('Failed to load articles');
-    })
-    .finally(() => {
       setLoadingArticles(false);
-    });
-
-    // Load documentation
-    fetch(API_URL + '/gemini-search/generate-topic-documentation', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
-    .then(data => {
-      if (data.documentation) setDocumentation(data.documentation);
-    })
-    .catch(error => {
-      console.error('Error loading documentation:', error);
-      toast.error('Failed to load documentation');
-    })
-    .finally(() => {
       setLoadingDocumentation(false);
     });
   };
@@ -224,10 +211,34 @@ const Header: React.FC = () => {
               type="text"
               placeholder="Search any technology..."
               value={searchQuery}
-              onChange={(e) => setSearchQuery(e.target.value)}
+              onChange={(e) => {
+                setSearchQuery(e.target.value);
+                setShowSuggestions(true);
+              }}
+              onFocus={() => setShowSuggestions(true)}
+              onBlur={() => setTimeout(() => setShowSuggestions(false), 150)}
               className={`w-full pl-10 ${isTopicPage ? 'lg:bg-react-secondary/80 lg:border-gray-600 lg:text-white lg:placeholder:text-gray-400 bg-white border-gray-200 text-react-secondary placeholder:text-gray-500' : 'bg-react-secondary/80 border-gray-600 text-white placeholder:text-gray-400'}`}
               disabled={isLoading}
             />
+            {showSuggestions && suggestions.length > 0 && (
+              <ul className="absolute z-50 mt-1 w-full rounded-md border border-gray-200 bg-white text-react-secondary shadow-lg">
+                {suggestions.map((suggestion) => (
+                  <li
+                    key={`${suggestion.kind}:${suggestion.topic}:${suggestion.title}`}
+                    className="cursor-pointer px-3 py-2 text-sm hover:bg-react-primary/10"
+                    onMouseDown={(e) => {
+                      e.preventDefault();
+                      openTopic(suggestion.topic);
+                    }}
+                  >
+                    <span className="font-medium">{suggestion.title}</span>
+                    {suggestion.kind === 'subtopic' && (
+                      <span className="ml-2 text-xs text-gray-500">in {suggestion.topic}</span>
+                    )}
+                  </li>
+                ))}
+              </ul>
+            )}
           </div>
           <Button 
             type="submit" 
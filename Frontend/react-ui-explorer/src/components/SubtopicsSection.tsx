@@ -24,8 +24,7 @@ import ResourcesDialog from './ResourcesDialog';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '@/hooks/useAuth';
 import { toast } from 'react-hot-toast';
-
-const API_URL = import.meta.env.VITE_BACKEND_API_URL_START;
+import { getTopicResources } from '@/data/getTopicResources';
 
 interface SubTopic {
   name: string;
@@ -116,71 +115,23 @@ const SubtopicsSection: React.FC<SubTopicsSectionProps> = ({ subTopics, topicNam
     setLoadingArticles(true);
     setLoadingDocumentation(true);
 
-    const requestBody = {
-      topic_name: topicName,
-      subtopic_name: selectedTopic?.name
-    };
-
-    // Load videos
-    fetch(API_URL + '/gemini-search/generate-topic-videos', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
+    // Load videos, articles and documentation in one request
+    getTopicResources(topicName, selectedTopic?.name)
     .then(data => {
-      if (data.videos) setVideos(data.videos);
+      setVideos(data.videos);
+      setArticles(data.articles);
+      setDocumentation(data.documentation);
+      if (data.errors.videos) toast.error('Failed to load videos');
+      if (data.errors.articles) toast.error('Failed to load articles');
+      if (data.errors.documentation) toast.error('Failed to load documentation');
     })
     .catch(error => {
-      console.error('Error loading videos:', error);
-      toast.error('Failed to load videos');
+      console.error('Error loading resources:', error);
+      toast.error('Failed to load resources');
     })
     .finally(() => {
       setLoadingVideos(false);
-    });
-
-    // Load articles
-    fetch(API_URL + '/gemini-search/generate-topic-articles', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
-    .then(data => {
-      if (data.articles) setArticles(data.articles);
-    })
-    .catch(error => {
-      console.error('Error loading articles:', error);
-      toast.error('Failed to load articles');
-    })
-    .finally(() => {
       setLoadingArticles(false);
-    });
-
-    // Load documentation
-    fetch(API_URL + '/gemini-search/generate-topic-documentation', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
-    .then(data => {
-      if (data.documentation) setDocumentation(data.documentation);
-    })
-    .catch(error => {
-      console.error('Error loading documentation:', error);
-      toast.error('Failed to load documentation');
-    })
-    .finally(() => {
       setLoadingDocumentation(false);
     });
   };
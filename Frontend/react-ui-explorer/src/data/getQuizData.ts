@@ -14,8 +14,8 @@ export interface QuizData {
   questions: QuizQuestion[];
 }
 
-// Get quiz data based on topic
-export const getQuizByTopic = async (topic: string, question_type: string, num_questions: number, subTopic: string): Promise<QuizData> => {
+// Get quiz data based on topic. With a userId, stored questions the user has already answered are skipped.
+export const getQuizByTopic = async (topic: string, question_type: string, num_questions: number, subTopic: string, userId?: number | string): Promise<QuizData> => {
   const lowerCaseTopic = topic.toLowerCase();
   
   try {
@@ -30,6 +30,7 @@ export const getQuizByTopic = async (topic: string, question_type: string, num_q
         num_questions: num_questions,
         question_type: question_type,
         subtopic: subTopic,
+        user_id: userId,
       }),
     });
     
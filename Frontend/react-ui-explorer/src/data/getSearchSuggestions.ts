@@ -0,0 +1,19 @@
+const API_URL = import.meta.env.VITE_BACKEND_API_URL_START;
+
+export interface SearchSuggestion {
+  kind: 'topic' | 'subtopic';
+  title: string;
+  topic: string;
+  subtopic: string;
+}
+
+// Topics and subtopics already generated whose names match what has been typed so far
+export const getSearchSuggestions = async (prefix: string, signal?: AbortSignal): Promise<SearchSuggestion[]> => {
+  const params = new URLSearchParams({ q: prefix });
+  const response = await fetch(API_URL + `/gemini-search/autocomplete?${params}`, { signal });
+  if (!response.ok) {
+    return [];
+  }
+  const data = await response.json();
+  return data.suggestions || [];
+};
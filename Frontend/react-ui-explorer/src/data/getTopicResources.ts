@@ -0,0 +1,51 @@
+const API_URL = import.meta.env.VITE_BACKEND_API_URL_START;
+
+export interface TopicResources {
+  videos: any[];
+  articles: any[];
+  documentation: any[];
+  // Error messages for resource kinds that could not be generated
+  errors: Record<string, string>;
+}
+
+// Get videos, articles and documentation for a topic or subtopic in one request
+export const getTopicResources = async (topicName: string, subtopicName?: string): Promise<TopicResources> => {
+  // Stored resources come from a cacheable GET
+  const params = new URLSearchParams({ topic_name: topicName, subtopic_name: subtopicName || '' });
+  const stored = await fetch(API_URL + `/gemini-search/topic-resources?${params}`);
+  if (stored.ok) {
+    const data = await stored.json();
+    if (data.videos && data.articles && data.documentation) {
+      return toTopicResources(data);
+    }
+  }
+
+  // Not generated yet, or some kinds are still missing
+  const response = await generateTopicResources(topicName, subtopicName);
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || `Error: ${response.status}`);
+  }
+
+  return toTopicResources(data);
+};
+
+const generateTopicResources = (topicName: string, subtopicName?: string) =>
+  fetch(API_URL + '/gemini-search/generate-topic-resources', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-Requested-With': 'XMLHttpRequest',
+    },
+    body: JSON.stringify({
+      topic_name: topicName,
+      subtopic_name: subtopicName,
+    }),
+  });
+
+const toTopicResources = (data: any): TopicResources => ({
+  videos: data.videos || [],
+  articles: data.articles || [],
+  documentation: data.documentation || [],
+  errors: data.errors || {},
+});
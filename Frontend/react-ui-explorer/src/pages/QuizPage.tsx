@@ -91,7 +91,7 @@ const QuizPage: React.FC = () => {
   
   useEffect(() => {
       if (topic) {
-        getQuizByTopic(topic, quizConfig.quizType, quizConfig.questionCount, subTopic).then(quiz => {
+        getQuizByTopic(topic, quizConfig.quizType, quizConfig.questionCount, subTopic, user?.user?.id).then(quiz => {
           // Ensure each question has the correct type and structure
           const typedQuiz = {
             ...quiz,
@@ -29,6 +29,7 @@ import {
   DropdownMenuTrigger,
 } from "@/components/ui/dropdown-menu";
 import ResourcesDialog from '@/components/ResourcesDialog';
+import { getTopicResources } from '@/data/getTopicResources';
 
 const API_URL = import.meta.env.VITE_BACKEND_API_URL_START;
 
@@ -88,6 +89,9 @@ const TopicPage = () => {
   const [loading, setLoading] = useState(true);
   const [topicData, setTopicData] = useState<TopicData | null>(null);
   const [error, setError] = useState<string | null>(null);
+  // Close matches for a name that is not stored yet, offered instead of generating it
+  const [suggestions, setSuggestions] = useState<Array<{ name: string; score: number }>>([]);
+  const [exactSearch, setExactSearch] = useState(false);
   const [formattedTopicName, setFormattedTopicName] = useState<string>(topicName ? topicName.charAt(0).toUpperCase() + topicName.slice(1) : '');
   const [activeSection, setActiveSection] = useState('introduction');
   const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
@@ -124,6 +128,7 @@ const TopicPage = () => {
     fetchTopicData()
     async function fetchTopicData() {
       setLoading(true);
+      setSuggestions([]);
       
       if (!topicName) {
         setError("No topic specified");
@@ -132,22 +137,32 @@ const TopicPage = () => {
       }
       
       try {
-        const response = await fetch(API_URL + '/gemini-search/search', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'X-Requested-With': 'XMLHttpRequest',
-          },
-          body: JSON.stringify({
-            search_query: topicName,
-          }),
-        });
+        // Stored topics come from a cacheable GET; a 404 means it still has to be generated
+        let response = await fetch(API_URL + `/gemini-search/topic?name=${encodeURIComponent(topicName)}`);
+        if (response.status === 404) {
+          response = await fetch(API_URL + '/gemini-search/search', {
+            method: 'POST',
+            headers: {
+              'Content-Type': 'application/json',
+              'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: JSON.stringify({
+              search_query: topicName,
+              exact: exactSearch,
+            }),
+          });
+        }
         
         if (!response.ok) {
           throw new Error(`Error: ${response.status}`);
         }
         
         const data = await response.json();
+        if (data.did_you_mean) {
+          setSuggestions(data.did_you_mean);
+          setLoading(false);
+          return;
+        }
         
         const resultData = await JSON.parse(data.result);
         setTopicData(resultData[resultData["topic"]]);
@@ -170,7 +185,7 @@ const TopicPage = () => {
         setLoading(false);
       }
     }
-  }, [topicName]);
+  }, [topicName, exactSearch]);
 
   useEffect(() => {
     const observerOptions = {
@@ -280,70 +295,23 @@ const TopicPage = () => {
     setLoadingTopicArticles(true);
     setLoadingTopicDocumentation(true);
 
-    const requestBody = {
-      topic_name: topicName
-    };
-
-    // Load videos
-    fetch(API_URL + '/gemini-search/generate-topic-videos', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
+    // Load videos, articles and documentation in one request
+    getTopicResources(topicName)
     .then(data => {
-      if (data.videos) setTopicVideos(data.videos);
+      setTopicVideos(data.videos);
+      setTopicArticles(data.articles);
+      setTopicDocumentation(data.documentation);
+      if (data.errors.videos) toast.error('Failed to load videos');
+      if (data.errors.articles) toast.error('Failed to load articles');
+      if (data.errors.documentation) toast.error('Failed to load documentation');
     })
     .catch(error => {
-      console.error('Error loading videos:', error);
-      toast.error('Failed to load videos');
+      console.error('Error loading resources:', error);
+      toast.error('Failed to load resources');
     })
     .finally(() => {
       setLoadingTopicVideos(false);
-    });
-
-    // Load articles
-    fetch(API_URL + '/gemini-search/generate-topic-articles', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
-    .then(data => {
-      if (data.articles) setTopicArticles(data.articles);
-    })
-    .catch(error => {
-      console.error('Error loading articles:', error);
-      toast.error('Failed to load articles');
-    })
-    .finally(() => {
       setLoadingTopicArticles(false);
-    });
-
-    // Load documentation
-    fetch(API_URL + '/gemini-search/generate-topic-documentation', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Requested-With': 'XMLHttpRequest',
-      },
-      body: JSON.stringify(requestBody),
-    })
-    .then(response => response.json())
-    .then(data => {
-      if (data.documentation) setTopicDocumentation(data.documentation);
-    })
-    .catch(error => {
-      console.error('Error loading documentation:', error);
-      toast.error('Failed to load documentation');
-    })
-    .finally(() => {
       setLoadingTopicDocumentation(false);
     });
   };
@@ -375,6 +343,33 @@ const TopicPage = () => {
     );
   }
 
+  if (suggestions.length > 0) {
+    return (
+      <div className="flex-grow flex items-center justify-center min-h-[calc(100vh-theme(spacing.16)-theme(spacing.16))] safe-top safe-bottom">
+        <div className="text-center max-w-md mx-auto px-4">
+          <h2 className="text-2xl font-semibold mb-4">Did you mean?</h2>
+          <div className="flex flex-col gap-2 mb-6">
+            {suggestions.map((suggestion) => (
+              <Button
+                key={suggestion.name}
+                variant="outline"
+                onClick={() => {
+                  setTopicName(suggestion.name);
+                  navigate(`/topic/${encodeURIComponent(suggestion.name.toLowerCase())}`);
+                }}
+              >
+                {suggestion.name}
+              </Button>
+            ))}
+          </div>
+          <Button variant="ghost" onClick={() => setExactSearch(true)}>
+            Generate "{formattedTopicName}" anyway
+          </Button>
+        </div>
+      </div>
+    );
+  }
+
   if (!topicData) {
     return (
       <div className="flex-grow flex items-center justify-center min-h-[calc(100vh-theme(spacing.16)-theme(spacing.16))] safe-top safe-bottom">